@@ -25,8 +25,14 @@ except ImportError:
     OCR_AVAILABLE = False
     print("Error: Install easyocr dengan: pip install easyocr")
 
+from plate_ocr import recognize_plate_lines
+
 app = Flask(__name__)
 
+# Recognizer sahaja (tanpa detector CRAFT) pada crop YOLO; readtext penuh jika confidence rendah
+OCR_RECOGNIZE_ONLY = True
+OCR_FAST_MIN_CONFIDENCE = 0.6
+
 # Cari model yang sudah di-train
 def find_trained_model():
     """Cari model YOLOv8 yang sudah di-train dalam folder anda"""
@@ -785,6 +791,14 @@ def perform_easyocr(image):
         # Apply thresholding
         _, binary = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         
+        # Fast path: crop YOLO sudah ketat, terus ke recognizer (setiap baris teks)
+        if OCR_RECOGNIZE_ONLY:
+            text, confidence, lines = recognize_plate_lines(ocr_reader, binary)
+            if text and confidence >= OCR_FAST_MIN_CONFIDENCE:
+                print(f"Recognizer sahaja: '{text}' ({confidence:.2f}, {lines} baris)")
+                return clean_text(text)
+            print(f"Recognizer confidence rendah ({confidence:.2f}), guna readtext penuh...")
+        
         # Convert back to RGB for EasyOCR
         rgb_image = cv2.cvtColor(binary, cv2.COLOR_GRAY2RGB)
         
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK: decode JPEG penuh vs decode resolusi rendah + crop plat resolusi penuh
+
+Untuk setiap gambar dalam plate.v8i.yolov8/test/images (di-encode semula pada
+saiz VGA dan UXGA seperti ESP32-CAM), bandingkan:
+  1. penuh   - cv2.imdecode(IMREAD_COLOR) saiz penuh, crop plat dari array penuh (cara lama)
+  2. reduced - UploadFrame (frame_decode.py): decode IMREAD_REDUCED_COLOR_* untuk detector,
+               kemudian kawasan plat sahaja pada resolusi penuh (PyTurboJPEG jika ada)
+  3. detector sahaja - decode resolusi rendah tanpa crop (frame yang YOLO tidak jumpa plat)
+Kotak plat diambil dari label dataset (poligon -> bbox), jadi model YOLO tidak diperlukan.
+Masa (ms) dan puncak memori (tracemalloc, buffer numpy) setiap frame dilaporkan.
+
+Contoh:
+    python bench_decode.py --sizes 640x480,1600x1200 --repeat 5
+"""
+
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from frame_decode import UploadFrame, TURBOJPEG_IMPORTED, turbojpeg_loaded
+
+DEFAULT_DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plate.v8i.yolov8", "test")
+
+def label_box(label_path):
+    """Label poligon YOLO (nilai 0-1) -> kotak (x1, y1, x2, y2) relatif. None jika tiada label."""
+    if not os.path.exists(label_path):
+        return None
+    with open(label_path) as f:
+        for line in f:
+            values = [float(v) for v in line.split()[1:]]
+            if len(values) >= 4:
+                xs, ys = values[0::2], values[1::2]
+                return min(xs), min(ys), max(xs), max(ys)
+    return None
+
+def load_samples(dataset_dir, width, height, quality):
+    """Pulangkan [(nama, bait_jpeg, kotak_piksel)] pada saiz width x height"""
+    samples = []
+    for path in sorted(glob.glob(os.path.join(dataset_dir, "images", "*.jpg"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        box = label_box(os.path.join(dataset_dir, "labels", name + ".txt"))
+        if box is None:
+            continue
+        img = cv2.resize(cv2.imread(path), (width, height))
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        x1, y1, x2, y2 = box
+        samples.append((name, buf.tobytes(), (int(x1 * width), int(y1 * height),
+                                              int(x2 * width), int(y2 * height))))
+    return samples
+
+def decode_full(jpeg, box):
+    img = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+    x1, y1, x2, y2 = box
+    return img, img[y1:y2, x1:x2].copy()
+
+def decode_reduced(jpeg, box, min_width):
+    frame = UploadFrame(jpeg, min_width)
+    detector = frame.detector_image()
+    return detector, frame.crop(box).copy()
+
+def decode_detector_only(jpeg, min_width):
+    return UploadFrame(jpeg, min_width).detector_image()
+
+def measure(fn, repeat):
+    """Pulangkan (purata ms, puncak memori MB) untuk fn()"""
+    fn()  # warmup
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed_ms = (time.perf_counter() - start) * 1000.0 / repeat
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed_ms, peak / (1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark decode JPEG penuh vs resolusi rendah + crop")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET_DIR, help="Folder dengan images/ dan labels/")
+    parser.add_argument("--sizes", default="640x480,1600x1200", help="Saiz frame, cth. 640x480,1600x1200")
+    parser.add_argument("--quality", type=int, default=90, help="Kualiti JPEG")
+    parser.add_argument("--repeat", type=int, default=5, help="Ulangan setiap gambar")
+    parser.add_argument("--min-width", type=int, default=640, help="Sama seperti DETECTOR_DECODE_MIN_WIDTH")
+    args = parser.parse_args()
+
+    if turbojpeg_loaded():
+        print("PyTurboJPEG: dimuat (crop ROI tanpa decode penuh)")
+    elif TURBOJPEG_IMPORTED:
+        print("PyTurboJPEG: import berjaya tetapi libturbojpeg tiada - crop guna decode penuh "
+              "(serverRUN.py tidak guna reduced decode)")
+    else:
+        print("PyTurboJPEG: tiada - crop guna decode penuh (serverRUN.py tidak guna reduced decode)")
+    for size in args.sizes.split(","):
+        width, height = (int(v) for v in size.lower().split("x"))
+        samples = load_samples(args.dataset, width, height, args.quality)
+        if not samples:
+            raise SystemExit(f"✗ Tiada gambar berlabel dalam {args.dataset}")
+
+        print("=" * 102)
+        print(f"Frame {width}x{height} | {len(samples)} gambar | ulangan {args.repeat}")
+        print(f"{'gambar':<28} | {'penuh ms':>9} {'MB':>6} | {'reduced ms':>10} {'MB':>6} | "
+              f"{'detector ms':>11} {'MB':>6} | {'saiz':>9}")
+        print("-" * 102)
+        totals = [0.0] * 6
+        for name, jpeg, box in samples:
+            full_ms, full_mb = measure(lambda: decode_full(jpeg, box), args.repeat)
+            red_ms, red_mb = measure(lambda: decode_reduced(jpeg, box, args.min_width), args.repeat)
+            det_ms, det_mb = measure(lambda: decode_detector_only(jpeg, args.min_width), args.repeat)
+            det = decode_detector_only(jpeg, args.min_width)
+            totals = [t + v for t, v in zip(totals, (full_ms, full_mb, red_ms, red_mb, det_ms, det_mb))]
+            print(f"{name[:28]:<28} | {full_ms:>9.2f} {full_mb:>6.2f} | {red_ms:>10.2f} {red_mb:>6.2f} | "
+                  f"{det_ms:>11.2f} {det_mb:>6.2f} | {det.shape[1]:>4}x{det.shape[0]:<4}")
+        avg = [t / len(samples) for t in totals]
+        print("-" * 102)
+        print(f"{'PURATA':<28} | {avg[0]:>9.2f} {avg[1]:>6.2f} | {avg[2]:>10.2f} {avg[3]:>6.2f} | "
+              f"{avg[4]:>11.2f} {avg[5]:>6.2f} |")
+    print("=" * 102)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK: backend detector plat - PyTorch (.pt) vs ONNX Runtime (FP32 / INT8)
+
+Untuk setiap gambar dalam plate.v8i.yolov8/test/images, setiap backend dijalankan
+dan kotak dibandingkan dengan label dataset (poligon -> bbox):
+  - recall@0.5     : plat berlabel yang dijumpai dengan IoU >= 0.5
+  - precision@0.5  : kotak ramalan yang padan dengan label
+  - IoU purata     : IoU kotak terbaik bagi setiap label
+  - setuju torch   : IoU kotak utama backend vs kotak utama PyTorch
+  - latensi        : ms setiap gambar (batch 1, selepas warmup)
+
+Contoh:
+    python bench_detector_backends.py --model best.pt --onnx best.onnx --onnx-int8 best.int8.onnx
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from plate_detector import OnnxDetector, TorchDetector
+
+DEFAULT_MODEL_PATH = "C:/Users/HP/Downloads/plate.v2i.yolov8/runs/detect/train/weights/best.pt"
+DEFAULT_DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plate.v8i.yolov8", "test")
+
+def label_boxes(label_path, width, height):
+    """Label YOLO (poligon atau xywh, nilai 0-1) -> senarai kotak piksel (x1, y1, x2, y2)"""
+    boxes = []
+    if not os.path.exists(label_path):
+        return boxes
+    with open(label_path) as f:
+        for line in f:
+            values = [float(v) for v in line.split()[1:]]
+            if len(values) == 4:
+                cx, cy, w, h = values
+                values = [cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2]
+            if len(values) >= 4:
+                xs, ys = values[0::2], values[1::2]
+                boxes.append((min(xs) * width, min(ys) * height, max(xs) * width, max(ys) * height))
+    return boxes
+
+def iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+def evaluate(detector, samples, repeat):
+    """Pulangkan (ramalan setiap gambar, senarai latensi ms)"""
+    detector.predict([samples[0][1]])  # warmup
+    predictions, latencies = [], []
+    for _, img, _ in samples:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            boxes = detector.predict([img])[0]
+        latencies.append((time.perf_counter() - start) * 1000.0 / repeat)
+        predictions.append(boxes)
+    return predictions, latencies
+
+def score(samples, predictions, reference=None):
+    labels_total = matched_labels = preds_total = matched_preds = 0
+    ious, agreement = [], []
+    for idx, (_, _, gt_boxes) in enumerate(samples):
+        preds = [p[:4] for p in predictions[idx]]
+        labels_total += len(gt_boxes)
+        preds_total += len(preds)
+        for gt in gt_boxes:
+            best = max((iou(gt, p) for p in preds), default=0.0)
+            ious.append(best)
+            matched_labels += best >= 0.5
+        for p in preds:
+            matched_preds += any(iou(gt, p) >= 0.5 for gt in gt_boxes)
+        if reference is not None and reference[idx] and predictions[idx]:
+            agreement.append(iou(reference[idx][0][:4], predictions[idx][0][:4]))
+    return {
+        "recall": matched_labels / labels_total if labels_total else 0.0,
+        "precision": matched_preds / preds_total if preds_total else 0.0,
+        "mean_iou": float(np.mean(ious)) if ious else 0.0,
+        "agree": float(np.mean(agreement)) if agreement else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandingkan ketepatan dan latensi backend detector")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Path ke best.pt (backend torch)")
+    parser.add_argument("--onnx", default=None, help="Path .onnx FP32 (default: sebelah best.pt)")
+    parser.add_argument("--onnx-int8", default=None, help="Path .onnx INT8 (pilihan)")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET_DIR, help="Folder dengan images/ dan labels/")
+    parser.add_argument("--repeat", type=int, default=3, help="Ulangan setiap gambar untuk latensi")
+    parser.add_argument("--threads", type=int, default=0, help="intra_op_num_threads ONNX Runtime (0 = auto)")
+    args = parser.parse_args()
+
+    samples = []
+    for path in sorted(glob.glob(os.path.join(args.dataset, "images", "*.jpg"))):
+        img = cv2.imread(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        gt = label_boxes(os.path.join(args.dataset, "labels", name + ".txt"), img.shape[1], img.shape[0])
+        samples.append((name, img, gt))
+    if not samples:
+        raise SystemExit(f"✗ Tiada gambar dalam {args.dataset}")
+
+    backends = [("torch", lambda: TorchDetector(args.model))]
+    onnx_path = args.onnx or os.path.splitext(args.model)[0] + ".onnx"
+    if os.path.exists(onnx_path):
+        backends.append(("onnx-fp32", lambda: OnnxDetector(onnx_path, threads=args.threads)))
+    else:
+        print(f"⚠️ {onnx_path} tiada - jalankan export_detector.py dahulu")
+    if args.onnx_int8:
+        backends.append(("onnx-int8", lambda: OnnxDetector(args.onnx_int8, threads=args.threads)))
+
+    results = []
+    reference = None
+    for name, make in backends:
+        print(f"🔍 Backend {name}...")
+        predictions, latencies = evaluate(make(), samples, args.repeat)
+        if reference is None:
+            reference = predictions
+        results.append((name, score(samples, predictions, reference), latencies))
+
+    print("=" * 96)
+    print(f"{len(samples)} gambar dari {args.dataset}")
+    print(f"{'backend':<10} | {'recall@0.5':>10} {'prec@0.5':>9} {'IoU':>6} {'setuju torch':>12} | "
+          f"{'p50 ms':>7} {'p90 ms':>7} {'purata ms':>9}")
+    print("-" * 96)
+    for name, metrics, latencies in results:
+        agree = f"{metrics['agree']:.3f}" if metrics["agree"] is not None else "-"
+        print(f"{name:<10} | {metrics['recall']:>10.3f} {metrics['precision']:>9.3f} {metrics['mean_iou']:>6.3f} "
+              f"{agree:>12} | {np.percentile(latencies, 50):>7.1f} {np.percentile(latencies, 90):>7.1f} "
+              f"{np.mean(latencies):>9.1f}")
+    print("=" * 96)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK: OCR crop plat - readtext penuh vs pass recognizer kanvas serverRUN.py
+
+Untuk setiap gambar dalam plate.v8i.yolov8/test/images, serverRUN.detect_plate_yolo
+cari plat dan serverRUN.preprocess_plate_crop proses crop, kemudian dibaca dengan:
+  1. readtext - detector CRAFT + recognizer bagi setiap crop (cara lama)
+  2. kanvas   - serverRUN.ocr_recognize_batch: semua baris semua crop frame itu dalam
+                satu pass recognizer, fallback ke readtext jika confidence < OCR_FAST_MIN_CONFIDENCE
+  3. hybrid   - serverRUN.ocr_hybrid hujung ke hujung (YOLO + ocr_batcher + fallback)
+Selepas itu crop dari --batch frame dibaca bersama dalam satu ocr_recognize_batch
+(seperti ocr_batcher bila beberapa upload tiba serentak). Masa (ms) dan teks dilaporkan.
+
+Model ikut konfigurasi serverRUN.py (YOLO_MODEL_PATH / DETECTOR_BACKEND).
+
+Contoh:
+    python bench_ocr_modes.py --batch 8
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import multiprocessing
+import os
+import time
+
+import cv2
+
+DEFAULT_IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plate.v8i.yolov8", "test", "images")
+
+def load_server():
+    """Import serverRUN sebagai proses worker: muat YOLO + OCR sahaja (tiada Firebase / thread background)"""
+    multiprocessing.current_process().name = "ocr-worker-bench"
+    import serverRUN
+    if serverRUN.yolo_model is None or serverRUN.reader is None:
+        raise SystemExit("✗ YOLO / EasyOCR gagal dimuat - semak konfigurasi serverRUN.py")
+    return serverRUN
+
+def best_text(valid_texts):
+    """Teks dengan confidence tertinggi dari serverRUN.filter_plate_texts"""
+    if not valid_texts:
+        return "", 0.0
+    best = max(valid_texts, key=lambda v: (v["confidence"], len(v["text"])))
+    return best["text"], float(best["confidence"])
+
+def timed(fn, *args, **kwargs):
+    # Log debug serverRUN tidak dicetak supaya jadual boleh dibaca
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR readtext vs pass recognizer kanvas serverRUN")
+    parser.add_argument("--images", default=DEFAULT_IMAGE_DIR, help="Folder gambar ujian")
+    parser.add_argument("--min-confidence", type=float, default=None,
+                        help="Ganti OCR_FAST_MIN_CONFIDENCE (lalai: nilai serverRUN.py)")
+    parser.add_argument("--batch", type=int, default=None, help="Frame setiap pass kanvas (lalai: OCR_BATCH_MAX)")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.images, "*.jpg")))
+    if not paths:
+        raise SystemExit(f"✗ Tiada gambar dalam {args.images}")
+
+    server = load_server()
+    if args.min_confidence is not None:
+        server.OCR_FAST_MIN_CONFIDENCE = args.min_confidence
+    min_confidence = server.OCR_FAST_MIN_CONFIDENCE
+    batch = args.batch or server.OCR_BATCH_MAX
+
+    # Warmup supaya masa muat model tidak dikira
+    warm = cv2.imread(paths[0])
+    timed(server.ocr_hybrid, warm.copy(), fallback=False)
+    server.reader.readtext(cv2.cvtColor(warm, cv2.COLOR_BGR2GRAY))
+
+    totals = {"yolo": 0.0, "preprocess": 0.0, "readtext": 0.0, "canvas": 0.0, "fallback": 0.0, "hybrid": 0.0}
+    crops_total = 0
+    fallbacks = 0
+    agree = 0
+    frame_binaries = []  # [[binary, ...] setiap frame] untuk pass kanvas berbilang frame
+
+    print("=" * 106)
+    print(f"{'gambar':<24} {'crop':>4} | {'readtext':<11} {'ms':>7} | {'kanvas':<11} {'ms':>7} {'fallback':>8} | "
+          f"{'hybrid':<11} {'ms':>7}")
+    print("-" * 106)
+    for path in paths:
+        img = cv2.imread(path)
+        (crops, boxes), yolo_ms = timed(server.detect_plate_yolo, img)
+        totals["yolo"] += yolo_ms
+        (hybrid_text, _, _), hybrid_ms = timed(server.ocr_hybrid, img.copy(), fallback=False)
+        totals["hybrid"] += hybrid_ms
+        if not crops:
+            continue
+
+        binaries, prep_ms = timed(lambda: [server.preprocess_plate_crop(crop) for crop in crops])
+        totals["preprocess"] += prep_ms
+        crops_total += len(crops)
+        frame_binaries.append(binaries)
+
+        # Mod 1: readtext penuh bagi setiap crop
+        rt_valid, rt_ms = [], 0.0
+        for binary, box in zip(binaries, boxes):
+            results, ms = timed(server.reader.readtext, binary, paragraph=False)
+            rt_ms += ms
+            rt_valid.extend(server.filter_plate_texts(results, box))
+        totals["readtext"] += rt_ms
+        rt_text, _ = best_text(rt_valid)
+
+        # Mod 2: satu pass recognizer kanvas untuk semua crop, fallback bagi crop tidak yakin
+        (canvas_results,), canvas_ms = timed(server.ocr_recognize_batch, [binaries])
+        totals["canvas"] += canvas_ms
+        canvas_valid, frame_fallbacks = [], 0
+        for binary, box, results in zip(binaries, boxes, canvas_results):
+            valid = server.filter_plate_texts(results, box)
+            if not valid or best_text(valid)[1] < min_confidence:
+                frame_fallbacks += 1
+                results, fb_ms = timed(server.reader.readtext, binary, paragraph=False)
+                totals["fallback"] += fb_ms
+                canvas_ms += fb_ms
+                valid = server.filter_plate_texts(results, box)
+            canvas_valid.extend(valid)
+        fallbacks += frame_fallbacks
+        canvas_text, _ = best_text(canvas_valid)
+
+        agree += int(canvas_text == rt_text)
+        name = os.path.basename(path)[:24]
+        print(f"{name:<24} {len(crops):>4} | {rt_text[:11]:<11} {rt_ms:>7.1f} | {canvas_text[:11]:<11} {canvas_ms:>7.1f} "
+              f"{frame_fallbacks or '-':>8} | {hybrid_text[:11]:<11} {hybrid_ms:>7.1f}")
+
+    print("=" * 106)
+    if not crops_total:
+        print("⚠️ Tiada plat dikesan oleh YOLO")
+        return
+
+    # Pass kanvas berbilang frame (seperti ocr_batcher dengan upload serentak)
+    multi_ms = 0.0
+    for i in range(0, len(frame_binaries), batch):
+        _, ms = timed(server.ocr_recognize_batch, frame_binaries[i:i + batch])
+        multi_ms += ms
+
+    readtext_mode = totals["preprocess"] + totals["readtext"]
+    canvas_mode = totals["preprocess"] + totals["canvas"] + totals["fallback"]
+    print(f"Gambar: {len(paths)} | Crop: {crops_total} | Fallback ke readtext: {fallbacks} | "
+          f"Teks sama: {agree}/{len(frame_binaries)} frame")
+    print(f"Purata setiap gambar  - YOLO:            {totals['yolo'] / len(paths):8.1f} ms")
+    print(f"                      - ocr_hybrid:      {totals['hybrid'] / len(paths):8.1f} ms")
+    print(f"Purata setiap crop    - preprocess:      {totals['preprocess'] / crops_total:8.1f} ms")
+    print(f"                      - readtext:        {totals['readtext'] / crops_total:8.1f} ms")
+    print(f"                      - kanvas 1 frame:  {totals['canvas'] / crops_total:8.1f} ms")
+    print(f"                      - kanvas {batch:>2} frame: {multi_ms / crops_total:8.1f} ms")
+    print(f"                      - fallback:        {totals['fallback'] / crops_total:8.1f} ms")
+    print(f"Jumlah OCR setiap crop - mod readtext: {readtext_mode / crops_total:.1f} ms | "
+          f"mod kanvas: {canvas_mode / crops_total:.1f} ms")
+
+if __name__ == "__main__":
+    main()
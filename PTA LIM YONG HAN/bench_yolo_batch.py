@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK: YOLO micro-batching - request serentak melalui MicroBatcher.submit (CPU)
+
+Guna gambar dari plate.v8i.yolov8/test/images (diubah saiz ke 640x480 seperti
+frame ESP32-CAM). Untuk setiap bilangan client serentak (thread request / kamera),
+setiap client hantar frame satu demi satu melalui serverRUN.MicroBatcher dengan
+serverRUN.yolo_predict_batch - jalan sama seperti detect_plate_yolo:
+  1. tanpa batching - max_batch 1 (inferens terus dalam thread request)
+  2. batched        - YOLO_BATCH_MAX / YOLO_BATCH_WAIT_MS dari serverRUN.py
+                      (atau --batch-max / --wait-ms untuk cuba nilai lain)
+Dilaporkan frames/sec, latency setiap request (purata / p95) dan purata saiz batch.
+
+Model dan backend ikut konfigurasi serverRUN.py (YOLO_MODEL_PATH / DETECTOR_BACKEND).
+
+Contoh:
+    python bench_yolo_batch.py --frames 64 --clients 1,4,8 --wait-ms 10
+"""
+
+import argparse
+import glob
+import multiprocessing
+import os
+import threading
+import time
+
+import cv2
+
+DEFAULT_IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plate.v8i.yolov8", "test", "images")
+
+def load_server():
+    """Import serverRUN sebagai proses worker: muat YOLO + OCR sahaja (tiada Firebase / thread background)"""
+    multiprocessing.current_process().name = "ocr-worker-bench"
+    import serverRUN
+    if serverRUN.yolo_model is None:
+        raise SystemExit("✗ YOLO model gagal dimuat - semak YOLO_MODEL_PATH dalam serverRUN.py")
+    return serverRUN
+
+def load_frames(image_dir, count):
+    """Muat gambar ujian sebagai frame VGA 640x480 BGR, ulang sehingga cukup `count`"""
+    paths = sorted(glob.glob(os.path.join(image_dir, "*.jpg")))
+    if not paths:
+        raise SystemExit(f"✗ Tiada gambar dalam {image_dir}")
+    images = [cv2.resize(cv2.imread(p), (640, 480)) for p in paths]
+    return [images[i % len(images)] for i in range(count)]
+
+def run_clients(batcher, frames, clients):
+    """Setiap client hantar bahagiannya melalui batcher.submit. Pulangkan (frames/sec, masa, [latency ms])"""
+    barrier = threading.Barrier(clients)
+    latencies = [[] for _ in range(clients)]
+
+    def client(index):
+        barrier.wait()
+        for frame in frames[index::clients]:
+            start = time.perf_counter()
+            batcher.submit(frame)
+            latencies[index].append((time.perf_counter() - start) * 1000.0)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return len(frames) / elapsed, elapsed, sorted(ms for per_client in latencies for ms in per_client)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YOLO micro-batching melalui MicroBatcher (CPU)")
+    parser.add_argument("--images", default=DEFAULT_IMAGE_DIR, help="Folder gambar ujian")
+    parser.add_argument("--frames", type=int, default=64, help="Jumlah frame untuk setiap bilangan client")
+    parser.add_argument("--clients", default="1,4,8", help="Bilangan request serentak, dipisah koma")
+    parser.add_argument("--batch-max", type=int, default=None, help="Ganti YOLO_BATCH_MAX (lalai: nilai serverRUN.py)")
+    parser.add_argument("--wait-ms", type=float, default=None, help="Ganti YOLO_BATCH_WAIT_MS (lalai: nilai serverRUN.py)")
+    args = parser.parse_args()
+
+    server = load_server()
+    batch_max = args.batch_max if args.batch_max is not None else server.YOLO_BATCH_MAX
+    wait_ms = args.wait_ms if args.wait_ms is not None else server.YOLO_BATCH_WAIT_MS
+    client_counts = [int(c) for c in args.clients.split(",") if c.strip()]
+    frames = load_frames(args.images, args.frames)
+
+    # Warmup supaya masa muat/compile tidak dikira
+    server.yolo_predict_batch(frames[:max(batch_max, 1)])
+
+    modes = [("tanpa batching", 1, 0), ("batched", batch_max, wait_ms)]
+    print(f"🔍 Detector: {server.yolo_model.model_path} (backend: {server.yolo_model.name})")
+    print("=" * 92)
+    print(f"{'client':>6} | {'mod':<14} | {'batch/wait':>10} | {'frames/sec':>10} | "
+          f"{'purata ms':>9} | {'p95 ms':>7} | {'saiz batch':>10}")
+    print("-" * 92)
+    for clients in client_counts:
+        for label, max_batch, max_wait_ms in modes:
+            batcher = server.MicroBatcher("bench-yolo", server.yolo_predict_batch, max_batch, max_wait_ms)
+            fps, _, latencies = run_clients(batcher, frames, clients)
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            avg_batch = batcher.stats()["avg_batch_size"]
+            print(f"{clients:>6} | {label:<14} | {f'{max_batch}/{max_wait_ms:g}ms':>10} | {fps:>10.2f} | "
+                  f"{sum(latencies) / len(latencies):>9.1f} | {p95:>7.1f} | {avg_batch:>10.2f}")
+    print("=" * 92)
+
+if __name__ == "__main__":
+    main()
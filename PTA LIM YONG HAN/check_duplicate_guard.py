@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+SEMAKAN: DuplicateGuard di bawah beban serentak (tanpa Firebase / model)
+
+Beberapa thread memanggil check_and_mark / touch serentak pada plat yang sama:
+  1. serentak - window panjang: setiap plat diterima TEPAT sekali, dan jumlah
+     rejected_count dalam guard sama dengan bilangan reject yang dilihat thread
+  2. luput    - window pendek (--window): plat diterima semula selepas luput, dan
+     dua penerimaan plat sama sentiasa sekurang-kurangnya window saat terpisah
+  3. touch    - plat di-touch berterusan (early exit) tidak diterima semula sehingga
+     window tamat selepas touch terakhir (touch dikemaskini paling kerap sekali sesaat)
+
+Contoh:
+    python check_duplicate_guard.py --threads 16 --plates 50 --window 2
+"""
+
+import argparse
+import collections
+import random
+import threading
+import time
+
+from plate_guard import DuplicateGuard
+
+def run_threads(count, target):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(index):
+        barrier.wait()
+        results[index] = target(index, barrier)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def check_concurrent(threads, plates, calls, seed):
+    guard = DuplicateGuard(3600)
+    names = [f"TST{i:04d}" for i in range(plates)]
+
+    def hammer(index, barrier):
+        # Setiap pusingan: semua thread baca plat baru yang sama serentak (beberapa
+        # kamera nampak kereta sama), kemudian check_and_mark / touch plat rawak
+        rng = random.Random(seed + index)
+        accepted, rejected = collections.Counter(), 0
+        for plate in names:
+            barrier.wait()
+            for _ in range(calls):
+                target = plate if rng.random() < 0.5 else rng.choice(names)
+                if rng.random() < 0.2:
+                    guard.touch(target)
+                    continue
+                ok, _, _ = guard.check_and_mark(target)
+                if ok:
+                    accepted[target] += 1
+                else:
+                    rejected += 1
+        return accepted, rejected
+
+    accepted, rejected = collections.Counter(), 0
+    for thread_accepted, thread_rejected in run_threads(threads, hammer):
+        accepted.update(thread_accepted)
+        rejected += thread_rejected
+
+    failures = [f"{plate} x{n}" for plate, n in sorted(accepted.items()) if n != 1]
+    failures += [f"{plate} tiada" for plate in names if plate not in accepted]
+    _, protected = guard.protected()
+    counted = sum(entry["rejected_count"] for _, entry in protected)
+    if counted != rejected:
+        failures.append(f"rejected_count {counted} != {rejected}")
+    return f"{sum(accepted.values())} terima / {rejected} tolak", failures
+
+def check_expiry(threads, plates, window, seed):
+    guard = DuplicateGuard(window)
+    names = [f"EXP{i:02d}" for i in range(plates)]
+    duration = window * 3
+    deadline = time.time() + duration
+
+    def hammer(index, barrier):
+        rng = random.Random(seed + index)
+        accepted = []
+        while time.time() < deadline:
+            plate = rng.choice(names)
+            ok, entry, _ = guard.check_and_mark(plate)
+            if ok:
+                accepted.append((plate, entry["timestamp"]))
+            time.sleep(0.001)
+        return accepted
+
+    by_plate = collections.defaultdict(list)
+    for thread_accepted in run_threads(threads, hammer):
+        for plate, timestamp in thread_accepted:
+            by_plate[plate].append(timestamp)
+
+    failures = []
+    for plate in names:
+        stamps = sorted(by_plate[plate])
+        if len(stamps) < 2:
+            failures.append(f"{plate} tidak luput ({len(stamps)}x)")
+        gaps = [(b - a).total_seconds() for a, b in zip(stamps, stamps[1:])]
+        if gaps and min(gaps) < window:
+            failures.append(f"{plate} diterima semula selepas {min(gaps):.3f}s")
+    total = sum(len(stamps) for stamps in by_plate.values())
+    return f"{total} terima / {plates} plat", failures
+
+def check_touch(threads, window):
+    guard = DuplicateGuard(window)
+    plate = "TCH0001"
+    guard.check_and_mark(plate)
+    touch_until = time.time() + window * 2
+    deadline = touch_until + window + 0.5
+    accepted_at = []
+    lock = threading.Lock()
+
+    def worker(index, barrier):
+        if index == 0:
+            while time.time() < touch_until:
+                guard.touch(plate)
+                time.sleep(0.1)
+            return
+        while time.time() < deadline:
+            ok, _, _ = guard.check_and_mark(plate)
+            if ok:
+                with lock:
+                    accepted_at.append(time.time())
+            time.sleep(0.005)
+
+    run_threads(max(threads, 2), worker)
+    failures = []
+    # Touch terakhir yang berkesan paling lewat 1 saat sebelum touch_until
+    earliest = touch_until - 1.0 + window
+    early = [t for t in accepted_at if t < earliest]
+    if early:
+        failures.append(f"diterima {earliest - early[0]:.2f}s sebelum window tamat")
+    if len(accepted_at) != 1:
+        failures.append(f"diterima {len(accepted_at)}x selepas touch (jangka 1)")
+    return f"{len(accepted_at)} terima", failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Semak DuplicateGuard dengan thread serentak")
+    parser.add_argument("--threads", type=int, default=16, help="Bilangan thread serentak")
+    parser.add_argument("--plates", type=int, default=50, help="Bilangan plat berbeza")
+    parser.add_argument("--calls", type=int, default=40, help="Panggilan setiap thread setiap pusingan plat (semakan serentak)")
+    parser.add_argument("--window", type=float, default=2.0, help="Window pendek (saat) untuk semakan luput/touch, >= 1.5")
+    parser.add_argument("--seed", type=int, default=42, help="Seed rawak")
+    args = parser.parse_args()
+    if args.window < 1.5:
+        raise SystemExit("✗ --window mesti >= 1.5 (touch dikemaskini paling kerap sekali sesaat)")
+
+    checks = [
+        ("serentak", lambda: check_concurrent(args.threads, args.plates, args.calls, args.seed)),
+        ("luput", lambda: check_expiry(args.threads, min(args.plates, 5), args.window, args.seed)),
+        ("touch", lambda: check_touch(args.threads, args.window)),
+    ]
+
+    rows = []
+    for name, check in checks:
+        start = time.perf_counter()
+        summary, failures = check()
+        rows.append((name, summary, time.perf_counter() - start, failures))
+
+    print("=" * 84)
+    print(f"{args.threads} thread | {args.plates} plat | window pendek {args.window:.1f}s")
+    print("-" * 84)
+    print(f"{'semakan':<10} | {'jumlah':>24} | {'saat':>6} | keputusan")
+    print("-" * 84)
+    for name, summary, elapsed, failures in rows:
+        result = "✅ OK" if not failures else f"❌ {len(failures)} gagal: {', '.join(failures[:3])}"
+        print(f"{name:<10} | {summary:>24} | {elapsed:>6.1f} | {result}")
+    print("=" * 84)
+
+    if any(failures for _, _, _, failures in rows):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
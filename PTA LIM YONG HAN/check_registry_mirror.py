@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+SEMAKAN: RegistryMirror melawan stream Firebase palsu (tanpa Firebase / model)
+
+Replay event 'put' dan 'patch' melalui FakeFirebaseEventSource ke RegistryMirror
+dan semak mirror sama dengan tree sumber selepas setiap event:
+  1. senario tetap (put root/anak/medan, patch berbilang kunci, padam dengan None)
+  2. --events event rawak (--seed untuk ulang)
+  3. --readers thread iterate get("plates") semasa event dihantar (tiada
+     "dictionary changed size during iteration")
+  4. delta_refresh selepas listener ditutup (event terlepas) menyamakan semula mirror
+
+Contoh:
+    python check_registry_mirror.py --events 2000 --readers 4
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from firebase_mirror import RegistryMirror, FakeFirebaseEventSource
+
+NODES = ["plates", "users"]
+
+SEED = {
+    "plates": {
+        "ABC1234": {"plate": "ABC1234", "user_id": "u1"},
+        "WXY9999": {"plate": "WXY9999", "user_id": "u2"},
+    },
+    "users": {
+        "u1": {"name": "Ali", "plate": "ABC1234"},
+        "u2": {"name": "Siti", "plate": "WXY9999"},
+    },
+}
+
+SCRIPTED = [
+    ("put", "plates", "/PKR5555", {"plate": "PKR5555", "user_id": "u3"}),
+    ("put", "users", "/u3", {"name": "Ravi", "plate": "PKR5555"}),
+    ("put", "users", "/u1/name", "Ali Bin Abu"),
+    ("patch", "users", "/u2", {"name": "Siti Aminah", "phone": "0123456789"}),
+    ("patch", "plates", "/", {"ABC1234/user_id": "u9", "JJJ1111": {"plate": "JJJ1111"}}),
+    ("put", "plates", "/WXY9999", None),
+    ("patch", "users", "/", {"u2": None, "u3/plate": None}),
+    ("put", "users", "/u404/name/first", "Ghost"),
+    ("put", "plates", "/", {"NEW0001": {"plate": "NEW0001", "user_id": "u1"}}),
+]
+
+def same(mirror, source, node):
+    return mirror.get(node) == (source.get(node) or {})
+
+def random_event(rng):
+    node = rng.choice(NODES)
+    key = f"K{rng.randrange(40):03d}"
+    field = rng.choice(["plate", "name", "user_id"])
+    value = rng.choice([None, f"V{rng.randrange(1000)}", {"plate": key, "name": f"N{rng.randrange(100)}"}])
+    roll = rng.random()
+    if roll < 0.4:
+        return "put", node, f"/{key}", value
+    if roll < 0.6:
+        return "put", node, f"/{key}/{field}", value if not isinstance(value, dict) else "x"
+    if roll < 0.95:
+        data = {}
+        for _ in range(rng.randint(1, 4)):
+            k = f"K{rng.randrange(40):03d}"
+            data[k if rng.random() < 0.5 else f"{k}/{field}"] = rng.choice([None, f"V{rng.randrange(1000)}"])
+        return "patch", node, "/", data
+    return "put", node, "/", {f"K{i:03d}": {"plate": f"K{i:03d}"} for i in range(rng.randint(0, 5))}
+
+def new_mirror(seed):
+    source = FakeFirebaseEventSource(seed=seed)
+    mirror = RegistryMirror(source, NODES, ready_timeout=1, refresh_interval=3600)
+    mirror.start()
+    return source, mirror
+
+def check_scripted():
+    source, mirror = new_mirror(SEED)
+    failures = [] if all(same(mirror, source, n) for n in NODES) else ["snapshot awal"]
+    for event_type, node, path, data in SCRIPTED:
+        source.emit(node, event_type, path, data)
+        if not same(mirror, source, node):
+            failures.append(f"{event_type} /{node}{path}")
+    return len(SCRIPTED), failures
+
+def check_random(events, seed):
+    rng = random.Random(seed)
+    source, mirror = new_mirror(SEED)
+    failures = []
+    for i in range(events):
+        event_type, node, path, data = random_event(rng)
+        source.emit(node, event_type, path, data)
+        if not same(mirror, source, node):
+            failures.append(f"#{i} {event_type} /{node}{path}")
+    return events, failures
+
+def check_concurrent_readers(events, readers, seed):
+    rng = random.Random(seed)
+    source, mirror = new_mirror(SEED)
+    stop = threading.Event()
+    errors = []
+    iterations = [0] * readers
+
+    def reader(index):
+        while not stop.is_set():
+            try:
+                for plate_key, record in mirror.get("plates").items():
+                    if isinstance(record, dict):
+                        record.get("plate")
+                    time.sleep(0)  # lepaskan GIL seperti kerja index setiap plat
+                iterations[index] += 1
+            except RuntimeError as e:
+                errors.append(str(e))
+                return
+
+    threads = [threading.Thread(target=reader, args=(i,), daemon=True) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for _ in range(events):
+        event_type, _, path, data = random_event(rng)
+        source.emit("plates", event_type, path, data)
+        time.sleep(0)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    failures = errors[:3]
+    if not same(mirror, source, "plates"):
+        failures.append("mirror /plates berbeza selepas event")
+    return sum(iterations), failures
+
+def check_delta_refresh(seed):
+    rng = random.Random(seed)
+    source, mirror = new_mirror(SEED)
+    for registration in mirror._registrations.values():
+        registration.close()  # listener terputus: event berikut terlepas
+    for _ in range(50):
+        event_type, node, path, data = random_event(rng)
+        source.emit(node, event_type, path, data)
+    for node in NODES:
+        mirror.delta_refresh(node)
+    failures = [f"/{node}" for node in NODES if not same(mirror, source, node)]
+    return mirror.delta_changes, failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Semak RegistryMirror dengan replay event Firebase palsu")
+    parser.add_argument("--events", type=int, default=1000, help="Bilangan event rawak")
+    parser.add_argument("--readers", type=int, default=4, help="Thread pembaca serentak")
+    parser.add_argument("--seed", type=int, default=42, help="Seed rawak")
+    args = parser.parse_args()
+
+    checks = [
+        ("senario tetap", "event", check_scripted),
+        ("event rawak", "event", lambda: check_random(args.events, args.seed)),
+        ("pembaca serentak", "iterasi", lambda: check_concurrent_readers(args.events, args.readers, args.seed)),
+        ("delta refresh", "perubahan", lambda: check_delta_refresh(args.seed)),
+    ]
+
+    rows = []
+    for name, unit, check in checks:
+        start = time.perf_counter()
+        count, failures = check()
+        rows.append((name, f"{count} {unit}", (time.perf_counter() - start) * 1000.0, failures))
+
+    print("=" * 78)
+    print(f"{'semakan':<18} | {'jumlah':>16} | {'ms':>8} | keputusan")
+    print("-" * 78)
+    for name, count, elapsed_ms, failures in rows:
+        result = "✅ OK" if not failures else f"❌ {len(failures)} gagal: {', '.join(failures[:3])}"
+        print(f"{name:<18} | {count:>16} | {elapsed_ms:>8.1f} | {result}")
+    print("=" * 78)
+
+    if any(failures for _, _, _, failures in rows):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ const char* WIFI_PASSWORD = "test1234";
 
 // ===== Flask server =====
 const char* FLASK_UPLOAD_URL = "http://192.168.245.172:5000/upload";
+// "/upload?async=1" balas 202 + job id segera, tetapi keputusan plat perlu dibaca dari
+// GET /jobs/<id> - sketch ini hanya cetak balasan POST, jadi kekalkan upload synchronous
 
 // ===== Camera pins (AI-Thinker) =====
 #define PWDN_GPIO_NUM     32
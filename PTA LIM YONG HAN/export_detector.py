@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+EXPORT: model plat YOLO (.pt) -> ONNX untuk DETECTOR_BACKEND = "onnx" dalam serverRUN.py
+
+1. Export ke ONNX (dynamic batch, supaya yolo_batcher boleh hantar beberapa frame sekali)
+2. Pilihan --int8: quantize_static ONNX Runtime (QDQ, INT8) dengan kalibrasi pada
+   gambar plate.v8i.yolov8/valid/images (letterbox sama seperti semasa inferens)
+
+Contoh:
+    python export_detector.py --model path/ke/best.pt
+    python export_detector.py --model path/ke/best.pt --int8
+Kemudian set DETECTOR_BACKEND = "onnx" dan DETECTOR_ONNX_PATH dalam serverRUN.py.
+"""
+
+import argparse
+import glob
+import os
+import shutil
+
+import cv2
+
+from plate_detector import DEFAULT_IMGSZ, letterbox, to_input_tensor
+
+DEFAULT_MODEL_PATH = "C:/Users/HP/Downloads/plate.v2i.yolov8/runs/detect/train/weights/best.pt"
+DEFAULT_CALIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plate.v8i.yolov8", "valid", "images")
+
+class ValidCalibrationReader:
+    """CalibrationDataReader: satu gambar valid (letterbox) setiap kali"""
+
+    def __init__(self, input_name, image_dir, imgsz, limit):
+        paths = sorted(glob.glob(os.path.join(image_dir, "*.jpg")))[:limit]
+        if not paths:
+            raise SystemExit(f"✗ Tiada gambar kalibrasi dalam {image_dir}")
+        print(f"🔍 Kalibrasi INT8 dengan {len(paths)} gambar dari {image_dir}")
+        self._items = iter(
+            {input_name: to_input_tensor([letterbox(cv2.imread(p), imgsz)[0]])} for p in paths
+        )
+
+    def get_next(self):
+        return next(self._items, None)
+
+def export_onnx(model_path, output, imgsz, opset):
+    from ultralytics import YOLO
+    print(f"🔍 Export {model_path} -> ONNX (imgsz {imgsz}, opset {opset})")
+    exported = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, opset=opset)
+    if os.path.abspath(exported) != os.path.abspath(output):
+        shutil.move(exported, output)
+    print(f"✅ ONNX FP32: {output} ({os.path.getsize(output) / 1e6:.1f} MB)")
+    return output
+
+def quantize_int8(fp32_path, output, calib_dir, imgsz, limit):
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    input_name = ort.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    reader = ValidCalibrationReader(input_name, calib_dir, imgsz, limit)
+    quantize_static(
+        fp32_path, output, reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax
+    )
+    print(f"✅ ONNX INT8: {output} ({os.path.getsize(output) / 1e6:.1f} MB)")
+    return output
+
+def main():
+    parser = argparse.ArgumentParser(description="Export model plat YOLO ke ONNX (pilihan INT8)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Path ke best.pt")
+    parser.add_argument("--output", default=None, help="Path .onnx (default: sebelah best.pt)")
+    parser.add_argument("--imgsz", type=int, default=DEFAULT_IMGSZ, help="Saiz input model")
+    parser.add_argument("--opset", type=int, default=17, help="ONNX opset")
+    parser.add_argument("--int8", action="store_true", help="Juga hasilkan model INT8 (quantize_static)")
+    parser.add_argument("--calib-dir", default=DEFAULT_CALIB_DIR, help="Gambar kalibrasi INT8")
+    parser.add_argument("--calib-limit", type=int, default=100, help="Bilangan maksimum gambar kalibrasi")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.model)[0] + ".onnx"
+    fp32_path = export_onnx(args.model, output, args.imgsz, args.opset)
+    if args.int8:
+        quantize_int8(fp32_path, os.path.splitext(fp32_path)[0] + ".int8.onnx",
+                      args.calib_dir, args.imgsz, args.calib_limit)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Mirror tempatan node registry Firebase (/plates, /users, /rfid_to_user, /rfid_cards)
+untuk serverRUN.py dan check_registry_mirror.py.
+
+RegistryMirror dikemaskini oleh listener Firebase (event 'put'/'patch'), dengan
+delta refresh berkala sebagai fallback. FakeFirebaseEventSource ialah stream palsu
+dalam memori (MIRROR_SOURCE = "fake") supaya mirror boleh diuji tanpa Firebase.
+"""
+
+import copy
+import threading
+import time
+
+class FirebaseEventSource:
+    """Sumber event sebenar: db.reference(path).listen() dan get()"""
+    name = "firebase"
+
+    def listen(self, path, callback):
+        from firebase_admin import db
+        return db.reference(path).listen(callback)
+
+    def get(self, path):
+        from firebase_admin import db
+        return db.reference(path).get()
+
+class FakeFirebaseEvent:
+    """Bentuk sama seperti firebase_admin.db.Event (event_type, path, data)"""
+
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+class FakeFirebaseRegistration:
+    def __init__(self, source, path, callback):
+        self._source = source
+        self._path = path
+        self._callback = callback
+
+    def close(self):
+        self._source.remove_listener(self._path, self._callback)
+
+class FakeFirebaseEventSource:
+    """
+    Stream event Firebase palsu dalam memori untuk ujian offline.
+    Guna emit() untuk hantar event 'put'/'patch' seperti Firebase sebenar.
+    """
+    name = "fake"
+
+    def __init__(self, seed=None):
+        self._lock = threading.Lock()
+        self._tree = {}
+        self._listeners = {}  # {node: [callback, ...]}
+        for node, data in (seed or {}).items():
+            self._tree[node] = data
+
+    def listen(self, path, callback):
+        node = path.strip("/")
+        with self._lock:
+            self._listeners.setdefault(node, []).append(callback)
+            initial = copy.deepcopy(self._tree.get(node))
+        # Firebase hantar snapshot penuh sebagai 'put' di "/" bila listener mula
+        callback(FakeFirebaseEvent("put", "/", initial))
+        return FakeFirebaseRegistration(self, node, callback)
+
+    def remove_listener(self, node, callback):
+        with self._lock:
+            if callback in self._listeners.get(node, []):
+                self._listeners[node].remove(callback)
+
+    def get(self, path):
+        with self._lock:
+            return copy.deepcopy(self._tree.get(path.strip("/")))
+
+    def emit(self, node, event_type, path, data):
+        """Apply event pada tree palsu dan hantar kepada semua listener node itu"""
+        with self._lock:
+            tree = {node: self._tree.get(node)}
+            apply_mirror_event(tree, node, event_type, path, data)
+            self._tree[node] = tree[node]
+            callbacks = list(self._listeners.get(node, []))
+        for callback in callbacks:
+            callback(FakeFirebaseEvent(event_type, path, copy.deepcopy(data)))
+
+def _mirror_set(tree, node, parts, value):
+    """Set/padam nilai dalam tree pada node/parts (value None = padam)"""
+    if not parts:
+        tree[node] = value if value is not None else {}
+        return
+    current = tree.get(node)
+    if not isinstance(current, dict):
+        current = {}
+        tree[node] = current
+    for part in parts[:-1]:
+        child = current.get(part)
+        if not isinstance(child, dict):
+            if value is None:
+                return
+            child = {}
+            current[part] = child
+        current = child
+    if value is None:
+        current.pop(parts[-1], None)
+    else:
+        current[parts[-1]] = value
+
+def apply_mirror_event(tree, node, event_type, path, data):
+    """Apply satu event Firebase ('put' atau 'patch') pada tree[node]"""
+    parts = [p for p in (path or "/").split("/") if p]
+    if event_type == "put":
+        _mirror_set(tree, node, parts, data)
+    elif event_type == "patch" and isinstance(data, dict):
+        for key, value in data.items():
+            _mirror_set(tree, node, parts + [p for p in key.split("/") if p], value)
+
+class RegistryMirror:
+    """
+    Salinan tempatan /plates, /users, /rfid_to_user dan /rfid_cards.
+    Dikemaskini oleh listener Firebase (streaming), dengan delta refresh
+    berkala sebagai fallback jika listener terputus.
+    """
+
+    def __init__(self, source, nodes, ready_timeout=10, refresh_interval=300):
+        self.source = source
+        self.nodes = list(nodes)
+        self.ready_timeout = ready_timeout
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._data = {node: {} for node in self.nodes}
+        self._loaded = set()
+        self._registrations = {}
+        self._on_change = []
+        self.event_count = 0
+        self.delta_refresh_count = 0
+        self.delta_changes = 0
+        self.last_update = None  # time.time() event/refresh terakhir
+        self.last_error = None
+
+    def on_change(self, callback):
+        """Daftar callback(node) yang dipanggil selepas node berubah"""
+        self._on_change.append(callback)
+
+    def _notify(self, node):
+        for callback in self._on_change:
+            try:
+                callback(node)
+            except Exception as e:
+                print(f"❌ [MIRROR] Callback error untuk /{node}: {e}")
+
+    def _handle_event(self, node, event):
+        with self._lock:
+            apply_mirror_event(self._data, node, event.event_type, event.path, event.data)
+            if not isinstance(self._data.get(node), dict):
+                self._data[node] = {}
+            self._loaded.add(node)
+            self.event_count += 1
+            self.last_update = time.time()
+        self._notify(node)
+
+    def start(self):
+        """Mula listener untuk setiap node; node yang gagal dimuat melalui delta refresh"""
+        for node in self.nodes:
+            try:
+                self._registrations[node] = self.source.listen(
+                    node, lambda event, node=node: self._handle_event(node, event)
+                )
+            except Exception as e:
+                self.last_error = f"listen /{node}: {e}"
+                print(f"⚠️ [MIRROR] Listener /{node} gagal: {e} - guna delta refresh")
+
+        # Tunggu snapshot awal dari listener
+        deadline = time.time() + self.ready_timeout
+        while not self.is_ready() and time.time() < deadline:
+            time.sleep(0.05)
+
+        for node in self.nodes:
+            if node not in self._loaded:
+                self.delta_refresh(node)
+
+        threading.Thread(target=self._refresh_loop, name="mirror-refresh", daemon=True).start()
+        print(f"🪞 [MIRROR] Sedia ({self.source.name}): {self.sizes()}")
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            for node in self.nodes:
+                self.delta_refresh(node)
+
+    def delta_refresh(self, node):
+        """Baca node dan apply hanya kunci yang berubah berbanding mirror"""
+        try:
+            remote = self.source.get(node)
+        except Exception as e:
+            self.last_error = f"refresh /{node}: {e}"
+            print(f"❌ [MIRROR] Delta refresh /{node} gagal: {e}")
+            return False
+        if not isinstance(remote, dict):
+            remote = {}
+
+        with self._lock:
+            local = self._data.get(node) or {}
+            changed = [k for k, v in remote.items() if local.get(k) != v]
+            removed = [k for k in local if k not in remote]
+            for key in changed:
+                local[key] = remote[key]
+            for key in removed:
+                del local[key]
+            self._data[node] = local
+            self._loaded.add(node)
+            self.delta_refresh_count += 1
+            self.delta_changes += len(changed) + len(removed)
+            self.last_update = time.time()
+
+        if changed or removed:
+            print(f"🪞 [MIRROR] Delta /{node}: {len(changed)} berubah, {len(removed)} dipadam")
+            self._notify(node)
+        return True
+
+    def is_ready(self):
+        with self._lock:
+            return all(node in self._loaded for node in self.nodes)
+
+    def get(self, node, key=None):
+        """
+        Baca dari mirror (tiada panggilan rangkaian). Pulangkan None jika tiada.
+        Salinan diambil dalam lock: listener dan delta refresh mengubah dict
+        dalaman semasa pemanggil (cth. PlateRegistryIndex) iterate hasilnya.
+        """
+        with self._lock:
+            data = self._data.get(node) or {}
+            return dict(data) if key is None else copy.deepcopy(data.get(key))
+
+    def sizes(self):
+        with self._lock:
+            return {node: len(self._data.get(node) or {}) for node in self.nodes}
+
+    def stats(self):
+        with self._lock:
+            age = round(time.time() - self.last_update, 1) if self.last_update else None
+        return {
+            "source": self.source.name,
+            "ready": self.is_ready(),
+            "age_seconds": age,
+            "size": self.sizes(),
+            "listeners": sorted(self._registrations.keys()),
+            "events": self.event_count,
+            "delta_refreshes": self.delta_refresh_count,
+            "delta_changes": self.delta_changes,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,166 @@
+"""
+Decode frame JPEG dari ESP32-CAM untuk serverRUN.py dan bench_decode.py.
+
+YOLO resize input ke 640 piksel, jadi frame besar (cth. UXGA 1600x1200) tidak
+perlu di-decode pada resolusi penuh untuk detector. UploadFrame decode pada
+skala 1/2, 1/4 atau 1/8 (IMREAD_REDUCED_COLOR_*), dan hanya kawasan sekitar
+kotak plat di-decode pada resolusi penuh untuk OCR - dengan PyTurboJPEG (crop JPEG
+tanpa decode penuh). Tanpa libturbojpeg, crop perlu decode penuh sekali lagi, jadi
+frame berplat kos decode rendah + penuh (lebih mahal dari decode penuh sahaja):
+serverRUN.py hanya guna UploadFrame bila turbojpeg_loaded() benar.
+"""
+
+import cv2
+import numpy as np
+
+# PyTurboJPEG pilihan: crop lossless pada sempadan MCU kemudian decode kawasan itu sahaja
+# (import berjaya tidak bermakna libturbojpeg ada dalam sistem - lihat turbojpeg_loaded)
+try:
+    from turbojpeg import TurboJPEG
+    TURBOJPEG_IMPORTED = True
+except ImportError:
+    TURBOJPEG_IMPORTED = False
+
+_turbo = None
+
+def _get_turbo():
+    global _turbo
+    if _turbo is None and TURBOJPEG_IMPORTED:
+        try:
+            _turbo = TurboJPEG()
+        except Exception:
+            _turbo = False  # libturbojpeg tiada dalam sistem
+    return _turbo or None
+
+def turbojpeg_loaded():
+    """True hanya jika libturbojpeg benar-benar dimuat (crop ROI tanpa decode penuh)"""
+    return _get_turbo() is not None
+
+REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+MCU_SIZE = 16  # Saiz MCU maksimum (4:2:0); koordinat crop JPEG mesti sejajar
+
+def jpeg_dimensions(data):
+    """
+    Baca (lebar, tinggi) dari marker SOF JPEG tanpa decode.
+    Pulangkan None jika bukan JPEG atau header rosak.
+    """
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    pos = 2
+    size = len(data)
+    while pos + 9 < size:
+        if data[pos] != 0xFF:
+            pos += 1
+            continue
+        marker = data[pos + 1]
+        if marker == 0xFF:  # padding
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # marker tanpa panjang
+            pos += 2
+            continue
+        length = (data[pos + 2] << 8) | data[pos + 3]
+        # SOF0..SOF15 kecuali DHT (C4), JPG (C8), DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = (data[pos + 5] << 8) | data[pos + 6]
+            width = (data[pos + 7] << 8) | data[pos + 8]
+            return (width, height) if width and height else None
+        if marker == 0xDA:  # mula data imej - tiada SOF dijumpai
+            return None
+        pos += 2 + length
+    return None
+
+def reduction_factor(width, min_width):
+    """Faktor skala terbesar (8/4/2/1) yang masih beri lebar >= min_width"""
+    for factor, flag in REDUCED_FLAGS:
+        if width // factor >= min_width:
+            return factor, flag
+    return 1, cv2.IMREAD_COLOR
+
+class UploadFrame:
+    """
+    Satu frame JPEG upload. detector_image() = decode resolusi rendah untuk YOLO,
+    crop(box) = kawasan resolusi penuh (koordinat asal) untuk OCR, full() = decode
+    penuh (lazy, sekali sahaja). Koordinat kotak dari detector ditukar dengan to_full().
+    """
+
+    def __init__(self, jpeg_bytes, min_width=640, detector_image=None):
+        self.jpeg = jpeg_bytes
+        self.min_width = min_width
+        self.size = jpeg_dimensions(jpeg_bytes)  # (lebar, tinggi) asal
+        self._detector = detector_image
+        self._full = None
+        self.full_decodes = 0
+        self.roi_decodes = 0
+        if self.size is None:
+            self.factor, self._flag = 1, cv2.IMREAD_COLOR
+        else:
+            self.factor, self._flag = reduction_factor(self.size[0], min_width)
+
+    def detector_image(self):
+        """Frame BGR untuk detector (resolusi rendah jika frame besar)"""
+        if self._detector is None:
+            if self.factor == 1:
+                self._detector = self.full()
+            else:
+                self._detector = cv2.imdecode(np.frombuffer(self.jpeg, np.uint8), self._flag)
+        return self._detector
+
+    @property
+    def scale(self):
+        """(skala_x, skala_y) dari koordinat detector ke koordinat asal"""
+        det = self.detector_image()
+        if det is None or self.size is None:
+            return 1.0, 1.0
+        return self.size[0] / det.shape[1], self.size[1] / det.shape[0]
+
+    @property
+    def reduced(self):
+        return self.factor > 1
+
+    def full(self):
+        """Decode resolusi penuh (sekali sahaja)"""
+        if self._full is None:
+            self._full = cv2.imdecode(np.frombuffer(self.jpeg, np.uint8), cv2.IMREAD_COLOR)
+            self.full_decodes += 1
+            if self.factor == 1 and self._detector is None:
+                self._detector = self._full
+        return self._full
+
+    def to_full(self, box):
+        """Kotak (x1, y1, x2, y2) koordinat detector -> koordinat asal (terhad dalam frame)"""
+        sx, sy = self.scale
+        x1, y1, x2, y2 = box
+        width, height = self.size if self.size else (int(x2 * sx), int(y2 * sy))
+        return (max(0, int(x1 * sx)), max(0, int(y1 * sy)),
+                min(width, int(round(x2 * sx))), min(height, int(round(y2 * sy))))
+
+    def to_detector(self, box):
+        """Kotak koordinat asal -> koordinat detector (untuk lukis atas detector_image)"""
+        sx, sy = self.scale
+        x1, y1, x2, y2 = box
+        return int(x1 / sx), int(y1 / sy), int(x2 / sx), int(y2 / sy)
+
+    def crop(self, box):
+        """Crop BGR resolusi penuh untuk kotak (x1, y1, x2, y2) dalam koordinat asal"""
+        x1, y1, x2, y2 = box
+        if self._full is None and self.reduced:
+            turbo = _get_turbo()
+            if turbo is not None:
+                try:
+                    # Crop JPEG mesti bermula pada sempadan MCU - besarkan kawasan, kemudian potong tepat
+                    ax, ay = (x1 // MCU_SIZE) * MCU_SIZE, (y1 // MCU_SIZE) * MCU_SIZE
+                    region = turbo.decode(turbo.crop(self.jpeg, ax, ay, x2 - ax, y2 - ay))
+                    self.roi_decodes += 1
+                    return region[y1 - ay:y2 - ay, x1 - ax:x2 - ax]
+                except Exception:
+                    pass  # cth. JPEG progresif - guna decode penuh
+        full = self.full()
+        if full is None:
+            return None
+        return full[y1:y2, x1:x2]
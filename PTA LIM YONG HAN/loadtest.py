@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+LOAD TEST: beberapa kamera + pembaca RFID serentak terhadap serverRUN.py yang sedang berjalan
+
+Setiap "kamera" ialah satu thread yang POST gambar dari plate.v8i.yolov8/test/images
+ke /upload (header X-Camera-Id sendiri) setiap --interval saat; setiap "pembaca RFID"
+POST {"uid": ...} ke /rfid. Di akhir, latensi p50/p99/max dan kod status bagi setiap
+endpoint dicetak - untuk bandingkan SERVER_MODE "dev" dan "waitress". Dengan
+--async-upload, latensi /upload ialah masa ack 202 (job diproses oleh ingest_jobs).
+
+Contoh:
+    python loadtest.py --url http://127.0.0.1:5000 --cameras 10 --rfid-readers 2 --duration 60
+"""
+
+import argparse
+import collections
+import glob
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+DEFAULT_IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plate.v8i.yolov8", "test", "images")
+
+class Results:
+    """Latensi (ms) dan kod status bagi setiap endpoint, dikongsi antara thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.codes = collections.defaultdict(collections.Counter)
+
+    def record(self, endpoint, code, elapsed_ms):
+        with self.lock:
+            self.latencies[endpoint].append(elapsed_ms)
+            self.codes[endpoint][code] += 1
+
+def post(url, body, headers, timeout):
+    """POST dan pulangkan kod status (0 = ralat sambungan/timeout)"""
+    request = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+def client_loop(results, endpoint, url, make_request, interval, deadline, timeout):
+    index = 0
+    while time.time() < deadline:
+        body, headers = make_request(index)
+        start = time.perf_counter()
+        code = post(url, body, headers, timeout)
+        results.record(endpoint, code, (time.perf_counter() - start) * 1000.0)
+        index += 1
+        time.sleep(interval)
+
+def wait_ready(base_url, timeout):
+    """Tunggu GET /ready pulangkan 200 (model + Firebase siap)"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + "/ready", timeout=5) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(1)
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /upload dan /rfid dengan beberapa kamera serentak")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="URL asas server")
+    parser.add_argument("--cameras", type=int, default=10, help="Bilangan kamera serentak")
+    parser.add_argument("--interval", type=float, default=0.5, help="Saat antara frame setiap kamera")
+    parser.add_argument("--async-upload", action="store_true", help="POST ke /upload?async=1 (ukur masa ack 202)")
+    parser.add_argument("--rfid-readers", type=int, default=2, help="Bilangan pembaca RFID serentak")
+    parser.add_argument("--rfid-interval", type=float, default=1.0, help="Saat antara tap setiap pembaca")
+    parser.add_argument("--uids", default="e4f77c05", help="UID RFID dipisahkan koma")
+    parser.add_argument("--duration", type=float, default=30, help="Tempoh ujian (saat)")
+    parser.add_argument("--timeout", type=float, default=30, help="Timeout setiap request (saat)")
+    parser.add_argument("--images", default=DEFAULT_IMAGE_DIR, help="Folder gambar JPEG untuk kamera")
+    parser.add_argument("--limit", type=int, default=50, help="Bilangan gambar maksimum dimuat")
+    args = parser.parse_args()
+
+    frames = []
+    for path in sorted(glob.glob(os.path.join(args.images, "*.jpg")))[:args.limit]:
+        with open(path, "rb") as f:
+            frames.append(f.read())
+    if not frames:
+        raise SystemExit(f"✗ Tiada gambar dalam {args.images}")
+    uids = [uid.strip() for uid in args.uids.split(",") if uid.strip()]
+
+    base_url = args.url.rstrip("/")
+    print(f"⏳ Tunggu {base_url}/ready...")
+    if not wait_ready(base_url, 120):
+        raise SystemExit("✗ Server tidak siap dalam 120 saat")
+
+    results = Results()
+    deadline = time.time() + args.duration
+    threads = []
+    upload_url = base_url + ("/upload?async=1" if args.async_upload else "/upload")
+    for cam in range(args.cameras):
+        camera_id = f"loadtest-cam-{cam + 1}"
+        make_request = lambda i, cam=cam, camera_id=camera_id: (
+            frames[(cam + i) % len(frames)],
+            {"Content-Type": "image/jpeg", "X-Camera-Id": camera_id}
+        )
+        threads.append(threading.Thread(
+            target=client_loop,
+            args=(results, "/upload", upload_url, make_request, args.interval, deadline, args.timeout),
+            daemon=True
+        ))
+    for reader in range(args.rfid_readers if uids else 0):
+        make_request = lambda i, reader=reader: (
+            json.dumps({"uid": uids[(reader + i) % len(uids)]}).encode(),
+            {"Content-Type": "application/json"}
+        )
+        threads.append(threading.Thread(
+            target=client_loop,
+            args=(results, "/rfid", base_url + "/rfid", make_request, args.rfid_interval, deadline, args.timeout),
+            daemon=True
+        ))
+
+    print(f"🚀 {args.cameras} kamera + {args.rfid_readers if uids else 0} pembaca RFID selama {args.duration:.0f}s")
+    started = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+
+    print("=" * 92)
+    print(f"{'endpoint':<8} | {'request':>7} {'req/s':>6} | {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} | status")
+    print("-" * 92)
+    for endpoint in sorted(results.latencies):
+        latencies = results.latencies[endpoint]
+        codes = ", ".join(f"{code or 'ralat'}: {n}" for code, n in sorted(results.codes[endpoint].items()))
+        print(f"{endpoint:<8} | {len(latencies):>7} {len(latencies) / elapsed:>6.1f} | "
+              f"{np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 99):>8.1f} "
+              f"{max(latencies):>8.1f} | {codes}")
+    print("=" * 92)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Backend detector plat untuk serverRUN.py, export_detector.py dan bench_detector_backends.py.
+
+Semua backend ada satu kaedah: predict(frames) -> bagi setiap frame BGR, senarai
+(x1, y1, x2, y2, confidence) dalam koordinat frame - sama seperti output
+yolo_predict_batch sebelum ini.
+  - "torch": model .pt melalui ultralytics (PyTorch CPU)
+  - "onnx":  model .onnx (FP32 atau INT8) melalui ONNX Runtime; provider boleh
+             ditukar, cth. OpenVINOExecutionProvider jika onnxruntime-openvino dipasang
+"""
+
+import cv2
+import numpy as np
+
+DEFAULT_CONF = 0.25  # Sama seperti default ultralytics
+DEFAULT_IOU = 0.7
+DEFAULT_IMGSZ = 640
+
+def letterbox(img, size=DEFAULT_IMGSZ, color=(114, 114, 114)):
+    """
+    Resize dengan nisbah asal dan padding ke size x size (sama seperti ultralytics).
+    Pulangkan (imej, skala, (pad_x, pad_y)).
+    """
+    h, w = img.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    if (new_w, new_h) != (w, h):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return img, scale, (left, top)
+
+def to_input_tensor(letterboxed):
+    """Senarai imej BGR letterbox -> tensor NCHW float32 RGB 0-1"""
+    batch = np.stack([img[:, :, ::-1] for img in letterboxed]).transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+def decode_output(pred, scale, pad, frame_shape, conf=DEFAULT_CONF, iou=DEFAULT_IOU):
+    """
+    Output YOLOv8 satu frame (4 + nc, anchors) -> [(x1, y1, x2, y2, conf)] selepas NMS,
+    dalam koordinat frame asal.
+    """
+    pred = pred.T  # (anchors, 4 + nc)
+    scores = pred[:, 4:].max(axis=1)
+    keep = scores > conf
+    if not keep.any():
+        return []
+    pred, scores = pred[keep], scores[keep]
+
+    cx, cy, w, h = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+    x1 = (cx - w / 2 - pad[0]) / scale
+    y1 = (cy - h / 2 - pad[1]) / scale
+    widths, heights = w / scale, h / scale
+
+    boxes_xywh = np.stack([x1, y1, widths, heights], axis=1)
+    indices = cv2.dnn.NMSBoxes(boxes_xywh.tolist(), scores.tolist(), conf, iou)
+    frame_h, frame_w = frame_shape[:2]
+    boxes = []
+    for i in np.array(indices).flatten():
+        bx, by, bw, bh = boxes_xywh[i]
+        boxes.append((
+            int(np.clip(bx, 0, frame_w)), int(np.clip(by, 0, frame_h)),
+            int(np.clip(bx + bw, 0, frame_w)), int(np.clip(by + bh, 0, frame_h)),
+            float(scores[i])
+        ))
+    boxes.sort(key=lambda box: box[4], reverse=True)
+    return boxes
+
+class TorchDetector:
+    """Model .pt melalui ultralytics (cara asal serverRUN.py)"""
+    name = "torch"
+
+    def __init__(self, model_path):
+        from ultralytics import YOLO
+        self.model_path = model_path
+        self.model = YOLO(model_path)
+
+    def predict(self, frames):
+        results = self.model(list(frames), verbose=False)
+        detections = []
+        for result in results:
+            frame_boxes = []
+            boxes = result.boxes
+            if boxes is not None and len(boxes) > 0:
+                for box in boxes:
+                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
+                    confidence = float(box.conf[0].cpu().numpy())
+                    frame_boxes.append((int(x1), int(y1), int(x2), int(y2), confidence))
+            detections.append(frame_boxes)
+        return detections
+
+class OnnxDetector:
+    """Model .onnx (export_detector.py) melalui ONNX Runtime"""
+    name = "onnx"
+
+    def __init__(self, model_path, providers=None, conf=DEFAULT_CONF, iou=DEFAULT_IOU, threads=0):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.model_path = model_path
+        self.session = ort.InferenceSession(model_path, sess_options=options,
+                                            providers=providers or ["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Input [N, 3, H, W]: N tetap (1) jika model tidak di-export dengan dynamic batch
+        self.imgsz = model_input.shape[2] if isinstance(model_input.shape[2], int) else DEFAULT_IMGSZ
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.conf = conf
+        self.iou = iou
+
+    def _run(self, frames):
+        boxed = [letterbox(frame, self.imgsz) for frame in frames]
+        outputs = self.session.run(None, {self.input_name: to_input_tensor([b[0] for b in boxed])})[0]
+        return [decode_output(pred, scale, pad, frame.shape, self.conf, self.iou)
+                for pred, (_, scale, pad), frame in zip(outputs, boxed, frames)]
+
+    def predict(self, frames):
+        frames = list(frames)
+        if self.dynamic_batch:
+            return self._run(frames)
+        detections = []
+        for frame in frames:
+            detections.extend(self._run([frame]))
+        return detections
+
+def load_detector(backend, model_path, onnx_path=None, providers=None, threads=0):
+    """Muat backend detector ikut config: "torch" (model_path .pt) atau "onnx" (onnx_path)"""
+    if backend == "onnx":
+        return OnnxDetector(onnx_path, providers=providers, threads=threads)
+    if backend == "torch":
+        return TorchDetector(model_path)
+    raise ValueError(f"Backend detector tidak dikenali: {backend}")
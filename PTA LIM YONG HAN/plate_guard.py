@@ -0,0 +1,99 @@
+"""
+Perlindungan duplicate plat untuk serverRUN.py dan check_duplicate_guard.py.
+
+Plat yang diterima dilindungi selama window saat: bacaan plat sama dalam tempoh
+itu ditolak, dari mana-mana kamera atau thread request (satu lock).
+"""
+
+import collections
+import datetime
+import threading
+
+class DuplicateGuard:
+    """
+    Reject plat sama dalam window saat (DUPLICATE_REJECT_WINDOW). Thread-safe (satu lock);
+    entry luput dibuang dari depan deque ikut masa (amortized O(1) setiap frame)
+    dan bukan dengan scan seluruh dict. Semantik sama seperti dict asal:
+    tetingkap dikira dari bacaan pertama yang diterima, reject tidak memanjangkannya.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._lock = threading.Lock()
+        self._entries = {}  # {plate: {"timestamp", "processed_count", "rejected_count", "last_processed"}}
+        self._expiry = collections.deque()  # (timestamp, plate) ikut susunan masa
+
+    def _expire(self, now):
+        while self._expiry and (now - self._expiry[0][0]).total_seconds() > self.window:
+            timestamp, plate = self._expiry.popleft()
+            entry = self._entries.get(plate)
+            # Abaikan rekod lama jika plat sudah ditanda semula selepas itu
+            if entry is not None and entry["timestamp"] == timestamp:
+                del self._entries[plate]
+                print(f"🧹 Cache expired untuk plat {plate} (lebih dari {self.window}s)")
+
+    def check_and_mark(self, plate):
+        """
+        Pulangkan (diterima, entry, elapsed). Diterima: plat ditanda dengan masa sekarang.
+        Ditolak: rejected_count ditambah; elapsed = saat sejak bacaan yang diterima.
+        """
+        with self._lock:
+            now = datetime.datetime.now()
+            self._expire(now)
+            entry = self._entries.get(plate)
+            if entry is not None:
+                elapsed = (now - entry["timestamp"]).total_seconds()
+                if elapsed < self.window:
+                    entry["rejected_count"] += 1
+                    return False, dict(entry), elapsed
+
+            entry = {
+                "timestamp": now,
+                "processed_count": (entry["processed_count"] if entry else 0) + 1,
+                "rejected_count": 0,
+                "last_processed": now.strftime("%Y-%m-%d %H:%M:%S")
+            }
+            self._entries[plate] = entry
+            self._expiry.append((now, plate))
+            return True, dict(entry), 0.0
+
+    def touch(self, plate):
+        """
+        Mulakan semula tetingkap plat dari sekarang - untuk early_exit: kenderaan masih
+        di depan kamera terkunci (atau baru beredar), jadi bacaan semula selepas lock
+        dilepaskan tidak menjadi attendance kedua. Pulangkan False jika plat tiada.
+        """
+        with self._lock:
+            now = datetime.datetime.now()
+            self._expire(now)
+            entry = self._entries.get(plate)
+            if entry is None:
+                return False
+            # Paling kerap sekali sesaat supaya deque luput tidak membesar setiap frame
+            if (now - entry["timestamp"]).total_seconds() >= 1.0:
+                entry["timestamp"] = now
+                self._expiry.append((now, plate))
+            return True
+
+    def protected(self):
+        """Senarai (plat, entry) yang masih dilindungi, terbaru dahulu"""
+        with self._lock:
+            now = datetime.datetime.now()
+            self._expire(now)
+            items = [(plate, dict(entry)) for plate, entry in self._entries.items()
+                     if (now - entry["timestamp"]).total_seconds() < self.window]
+        items.sort(key=lambda item: item[1]["timestamp"], reverse=True)
+        return now, items
+
+    def count(self):
+        """Bilangan plat dilindungi - selepas buang entry luput, tanpa scan"""
+        with self._lock:
+            self._expire(datetime.datetime.now())
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            cleared = len(self._entries)
+            self._entries = {}
+            self._expiry.clear()
+            return cleared
@@ -0,0 +1,88 @@
+"""
+Fungsi OCR plat yang dikongsi oleh serverRUN.py, A.py dan skrip benchmark.
+
+Bila YOLO sudah memberi kotak plat yang ketat, detector teks CRAFT dalam
+reader.readtext() tidak diperlukan - crop (atau setiap baris teksnya) boleh
+terus dihantar kepada recognizer EasyOCR melalui reader.recognize().
+"""
+
+def split_plate_lines(binary):
+    """
+    Cari baris teks dalam crop plat yang sudah di-threshold (teks gelap atas latar cerah).
+    Pulangkan senarai (y_top, y_bottom): satu untuk plat satu baris, dua untuk plat dua baris.
+    """
+    h = binary.shape[0]
+    if h < 20:
+        return [(0, h)]
+
+    # Nisbah piksel gelap bagi setiap baris (horizontal projection)
+    ink = (binary < 128).mean(axis=1)
+    threshold = max(0.02, float(ink.max()) * 0.2)
+    min_gap = max(1, int(h * 0.03))
+
+    # Cari jalur baris yang ada teks, gabung jalur yang dipisah oleh celah kecil
+    bands = []
+    start = None
+    for y, value in enumerate(ink):
+        if value > threshold and start is None:
+            start = y
+        elif value <= threshold and start is not None:
+            bands.append([start, y])
+            start = None
+    if start is not None:
+        bands.append([start, h])
+
+    merged = []
+    for band in bands:
+        if merged and band[0] - merged[-1][1] < min_gap:
+            merged[-1][1] = band[1]
+        else:
+            merged.append(band)
+
+    # Hanya jalur yang cukup tinggi dikira sebagai baris teks (buang border/noise)
+    lines = [band for band in merged if band[1] - band[0] >= h * 0.2]
+    if len(lines) != 2:
+        return [(0, h)]
+
+    # Bahagi pada tengah celah antara dua baris supaya tiada aksara terpotong
+    split = (lines[0][1] + lines[1][0]) // 2
+    return [(0, split), (split, h)]
+
+def join_line_results(line_results):
+    """
+    Gabung hasil recognizer bagi setiap baris (atas ke bawah) menjadi satu teks plat.
+    line_results: [(text, confidence), ...]. Confidence gabungan = paling rendah.
+    """
+    if not line_results:
+        return "", 0.0
+    text = "".join(text.strip() for text, _ in line_results)
+    confidence = min(float(confidence) for _, confidence in line_results)
+    return text, confidence
+
+def recognize_plate_lines(reader, binary):
+    """
+    Recognizer sahaja (tanpa detector) untuk satu crop plat grayscale/binary.
+    Pulangkan (text, confidence, bilangan_baris).
+    """
+    w = binary.shape[1]
+    lines = split_plate_lines(binary)
+    horizontal_list = [[0, w, y_top, y_bottom] for y_top, y_bottom in lines]
+    results = reader.recognize(binary, horizontal_list=horizontal_list, free_list=[],
+                               batch_size=len(horizontal_list), detail=1, paragraph=False)
+
+    # Susun ikut kedudukan y supaya baris atas dibaca dahulu
+    results = sorted(results, key=lambda res: res[0][0][1])
+    text, confidence = join_line_results([(res[1], res[2]) for res in results])
+    return text, confidence, len(lines)
+
+def plate_edit_distance(a, b):
+    """Jarak Levenshtein antara dua teks plat (cth. PBL666 vs PBL6G6 = 1)"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
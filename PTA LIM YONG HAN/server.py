@@ -5,12 +5,15 @@ from flask import Flask, request, jsonify
 import easyocr
 import firebase_admin
 from firebase_admin import credentials, db
+from serving import run_server
 import os
 import uuid
 
 # ==== Config ====
 HOST = "0.0.0.0"
 PORT = 5000
+SERVER_MODE = "waitress"  # "waitress" = server WSGI production, "dev" = Werkzeug app.run
+SERVER_THREADS = 8  # Bilangan thread request waitress
 DUPLICATE_REJECT_WINDOW = 30  # ⚠️ PERUBAHAN: 30 saat reject plat sama
 SAVE_DIR = "captured_plates"  # Direktori utama untuk simpan gambar
 
@@ -782,4 +785,4 @@ if __name__ == "__main__":
     print(f"📸 Struktur folder: {SAVE_DIR}/YYYY-MM-DD/PLATE_NUMBER/")
     print(f"   Contoh: {SAVE_DIR}/2025-12-09/MEDU89/MEDU89_11.56_54.jpg")
     print(f"📸 Hanya simpan gambar untuk plat REGISTERED sahaja")
-    app.run(host=HOST, port=PORT, threaded=True, debug=False)
\ No newline at end of file
+    run_server(app, HOST, PORT, mode=SERVER_MODE, threads=SERVER_THREADS)
\ No newline at end of file
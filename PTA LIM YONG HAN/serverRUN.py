@@ -7,123 +7,450 @@ import firebase_admin
 from firebase_admin import credentials, db
 import os
 import uuid
+import copy
 import traceback
-from ultralytics import YOLO  # Tambah YOLO
+import threading
+import time
+import queue
+import atexit
+import bisect
+import collections
+import json
+import sqlite3
+import multiprocessing
+from multiprocessing import shared_memory
+from plate_detector import load_detector  # Backend YOLO: torch (.pt) atau onnx
+from plate_ocr import split_plate_lines, join_line_results, plate_edit_distance
+from frame_decode import UploadFrame, jpeg_dimensions, turbojpeg_loaded
+from serving import run_server
+from plate_guard import DuplicateGuard
+from firebase_mirror import RegistryMirror, FirebaseEventSource, FakeFirebaseEventSource
+
+PROCESS_START_TIME = time.time()  # Untuk ukur masa startup dan masa ke /upload pertama
 
 # ==== Config ====
 HOST = "0.0.0.0"
 PORT = 5000
+SERVER_MODE = "waitress"  # "waitress" = server WSGI production (thread pool terhad), "dev" = Werkzeug app.run
+SERVER_THREADS = 16  # Bilangan thread request waitress (upload YOLO/OCR + RFID serentak)
+SERVER_CONNECTION_LIMIT = 64  # Sambungan terbuka maksimum; lebihan menunggu dalam backlog
+SERVER_BACKLOG = 128  # Saiz backlog socket listen
+SERVER_CHANNEL_TIMEOUT = 30  # Saat sambungan tidak aktif sebelum ditutup
+SERVER_MAX_BODY_BYTES = 16 * 1024 * 1024  # Saiz maksimum body request (frame JPEG)
 DUPLICATE_REJECT_WINDOW = 30  # 30 saat reject plat sama
 SAVE_DIR = "captured_plates"  # Direktori utama untuk simpan gambar
 YOLO_MODEL_PATH = "C:/Users/HP/Downloads/plate.v2i.yolov8/runs/detect/train/weights/best.pt"  # Path ke model YOLO
+DETECTOR_BACKEND = "torch"  # "torch" = ultralytics .pt, "onnx" = ONNX Runtime (export dengan export_detector.py)
+DETECTOR_ONNX_PATH = os.path.splitext(YOLO_MODEL_PATH)[0] + ".onnx"  # Atau best.int8.onnx untuk model INT8
+DETECTOR_ONNX_PROVIDERS = ["CPUExecutionProvider"]  # cth. ["OpenVINOExecutionProvider", "CPUExecutionProvider"]
+REGISTRY_REFRESH_INTERVAL = 300  # Saat antara delta refresh mirror registry (fallback kepada listener)
+MIRROR_SOURCE = "firebase"  # "firebase" = listener sebenar, "fake" = stream palsu untuk ujian offline
+MIRROR_NODES = ["plates", "users", "rfid_to_user", "rfid_cards"]  # Node yang disalin ke memori
+MIRROR_READY_TIMEOUT = 10  # Saat tunggu snapshot awal dari listener
+RFID_CACHE_TTL = 300  # Saat keputusan RFID -> user disimpan dalam cache
+RFID_CACHE_NEGATIVE_TTL = 10  # Saat kad yang tidak berdaftar disimpan dalam cache
+YOLO_BATCH_MAX = 4  # Bilangan frame maksimum dalam satu panggilan YOLO (1 = tiada batching)
+YOLO_BATCH_WAIT_MS = 5  # Masa maksimum (ms) tunggu frame lain sebelum batch dijalankan
+OCR_BATCH_MAX = 8  # Bilangan frame maksimum (semua crop) dalam satu pass recognizer EasyOCR
+OCR_BATCH_WAIT_MS = 5  # Masa maksimum (ms) tunggu frame lain sebelum pass OCR dijalankan
+OCR_RECOGNIZE_ONLY = True  # True = recognizer sahaja pada crop YOLO, False = readtext penuh (detector + recognizer)
+OCR_FAST_MIN_CONFIDENCE = 0.6  # Bawah nilai ini, crop dibaca semula dengan readtext penuh
+REGISTRY_MISS_REFRESH_COOLDOWN = 15  # Saat minimum antara refresh yang dicetuskan oleh plat tidak ditemui
+OCR_WORKER_COUNT = 0  # Bilangan proses worker untuk YOLO+OCR (0 = jalan dalam thread request)
+OCR_WORKER_SHM_BYTES = 1600 * 1200 * 3  # Saiz shared memory setiap worker (cukup untuk frame UXGA BGR)
+OCR_WORKER_TIMEOUT = 30  # Saat maksimum tunggu worker sebelum dianggap hang dan dimulakan semula
+OCR_WORKER_START_TIMEOUT = 300  # Saat maksimum worker baru import modul + muat model sebelum hantar "ready"
+OCR_WORKER_HEALTH_INTERVAL = 5  # Saat antara health check worker
+WRITE_BEHIND_DB = "attendance_outbox.db"  # Log SQLite (WAL) untuk tulisan Firebase yang belum dihantar
+WRITE_BEHIND_BATCH = 50  # Bilangan operasi maksimum dibaca dari log untuk setiap pusingan hantar
+WRITE_BEHIND_POLL_INTERVAL = 5  # Saat antara semakan log jika tiada tulisan baru
+WRITE_BEHIND_MAX_BACKOFF = 60  # Saat maksimum antara cubaan semula bila Firebase gagal
+WRITE_BEHIND_MAX_ATTEMPTS = 10  # Operasi yang gagal N kali sedangkan path lain berjaya dihantar dipindah ke jadual dead_letter
+ATTENDANCE_RELOAD_BACKOFF = 2  # Saat sebelum cuba muat semula attendance hari ini selepas gagal (berganda hingga WRITE_BEHIND_MAX_BACKOFF)
+ATTENDANCE_LOAD_WAIT = 10  # Saat maksimum event menunggu muat attendance yang sedang berjalan (thread lain)
+IMAGE_PERSIST_QUEUE_MAX = 32  # Bilangan gambar maksimum menunggu untuk ditulis; penuh = gambar dibuang
+THUMBNAIL_SIZE = (320, 240)  # Saiz thumbnail (lebar, tinggi)
+SNAPSHOT_CAPACITY = 5  # Bilangan snapshot terkini disimpan dalam memori (JPEG)
+SNAPSHOT_JPEG_QUALITY = 80  # Kualiti JPEG bila frame perlu di-encode (upload bukan JPEG)
+DETECTOR_REDUCED_DECODE = True  # Decode frame besar pada skala 1/2, 1/4, 1/8 untuk YOLO; crop OCR resolusi penuh (perlu libturbojpeg)
+DETECTOR_DECODE_MIN_WIDTH = 640  # Lebar minimum frame detector (saiz input YOLO)
+PREFILTER_ENABLED = True  # Tolak frame kosong/tiada perubahan sebelum YOLO+OCR
+PREFILTER_SIZE = (160, 120)  # Saiz frame grayscale untuk pre-filter (lebar, tinggi)
+PREFILTER_MOTION_THRESHOLD = 0.02  # Nisbah piksel berubah minimum berbanding latar belakang
+PREFILTER_PIXEL_DELTA = 25  # Beza nilai piksel (0-255) untuk dikira berubah
+PREFILTER_BG_ALPHA = 0.05  # Kadar kemaskini latar belakang (running average)
+PREFILTER_MIN_BRIGHTNESS = 20  # Purata kecerahan minimum (terlalu gelap = skip)
+PREFILTER_MAX_BRIGHTNESS = 245  # Purata kecerahan maksimum (overexposed = skip)
+PREFILTER_MIN_SHARPNESS = 5.0  # Varians Laplacian minimum (terlalu kabur = skip)
+FALLBACK_POLICY = "always"  # OCR imej penuh bila YOLO tiada plat: "always" (asal), "never", "only_if_motion", "rate_limited"
+FALLBACK_CAMERA_POLICIES = {}  # Mod khas setiap kamera, cth. {"gate-1": "never", "192.168.1.20": "always"}
+FALLBACK_RATE_LIMIT_SECONDS = 5  # rate_limited: sekali sahaja setiap N saat bagi setiap kamera
+FALLBACK_MOTION_THRESHOLD = 0.05  # only_if_motion: nisbah perubahan minimum dari pre-filter
+FALLBACK_ROI = None  # Kawasan (x1, y1, x2, y2 relatif 0-1) untuk OCR fallback, cth. (0.0, 0.25, 1.0, 1.0); None = seluruh frame (asal)
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)  # Had bucket histogram latensi
+PLATE_VOTING_ENABLED = True  # Undi bacaan beberapa frame bagi setiap kenderaan sebelum commit satu plat
+PLATE_TRACK_IOU = 0.3  # IoU minimum kotak plat supaya bacaan beza 1 aksara dikira kenderaan sama
+PLATE_TRACK_TIMEOUT = 2.0  # Saat tanpa bacaan sebelum track tamat (dan di-flush jika belum commit)
+PLATE_VOTE_MIN_VOTES = 2  # Commit bila plat pendahulu ada sekurang-kurangnya N undi...
+PLATE_VOTE_MIN_SHARE = 0.6  # ...dan sekurang-kurangnya nisbah ini daripada jumlah berat undi (confidence)
+PLATE_VOTE_COMMIT_CONFIDENCE = 0.9  # Satu bacaan dengan confidence ini terus di-commit
+EARLY_EXIT_ENABLED = True  # Selepas commit yakin, skip YOLO+OCR kamera itu sehingga scene berubah
+EARLY_EXIT_MIN_CONFIDENCE = 0.6  # Confidence OCR minimum plat yang di-commit untuk mengunci kamera
+EARLY_EXIT_SCENE_THRESHOLD = 0.10  # Nisbah piksel berubah berbanding frame commit untuk lepaskan lock
+EARLY_EXIT_MAX_LOCK = 60  # Saat maksimum lock sebelum inferens dijalankan semula untuk sahkan
+INGEST_QUEUE_MAX = 32  # /upload?async=1: slot (kamera) maksimum menunggu; penuh = 503 + Retry-After
+INGEST_LATEST_FRAME_WINS = True  # Satu slot setiap kamera: frame baru ganti frame lama yang belum diproses
+INGEST_WORKERS = 2  # Thread scheduler yang memproses frame async (guna ocr_pool jika OCR_WORKER_COUNT > 0)
+INGEST_JOB_RETENTION = 1000  # Bilangan rekod job maksimum disimpan untuk GET /jobs/<id>
+INGEST_JOB_TTL = 300  # Saat keputusan job disimpan selepas selesai
+INGEST_WAIT_MAX = 10  # Saat maksimum GET /jobs/<id>?wait=N boleh tunggu
+STARTUP_MODE = "background"  # "background" = HTTP terus hidup, model/Firebase dimuat selari; "blocking" = muat dahulu
+STARTUP_WARMUP = True  # Jalankan inferens warmup YOLO + EasyOCR selepas model dimuat
+STARTUP_WARMUP_SIZE = (640, 480)  # Saiz frame warmup (lebar, tinggi)
+
+# Proses worker OCR import modul ini semula - jangan init Firebase/mirror di sana
+IS_OCR_WORKER = multiprocessing.current_process().name.startswith("ocr-worker")
+
+# Reduced decode hanya berbaloi jika libturbojpeg dimuat: tanpanya setiap frame berplat
+# kos decode rendah + decode penuh untuk crop (lebih perlahan dari decode penuh sahaja)
+REDUCED_DECODE_ACTIVE = DETECTOR_REDUCED_DECODE and turbojpeg_loaded()
+if DETECTOR_REDUCED_DECODE and not REDUCED_DECODE_ACTIVE and not IS_OCR_WORKER:
+    print("⚠️ libturbojpeg tidak dimuat - DETECTOR_REDUCED_DECODE dimatikan (decode penuh)")
 
 # ==== Create main save directory if not exists ====
 if not os.path.exists(SAVE_DIR):
     os.makedirs(SAVE_DIR)
 
-# ==== Load YOLO Model ====
-print("🔍 Loading YOLO model...")
+# ==== Staged Startup ====
+class StartupManager:
+    """
+    Peringkat startup (YOLO, EasyOCR, Firebase + mirror, katalog gambar) yang
+    dimuat selari di background supaya server HTTP hidup serta-merta.
+    /ready dan gate /upload, /rfid guna status di sini.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = {}
+        self.stages = {}  # {name: {"status", "started", "seconds", "error"}}
+        self.first_upload_seconds = None
+
+    def _register(self, name):
+        with self._lock:
+            self._events[name] = threading.Event()
+            self.stages[name] = {"status": "pending", "started": None, "seconds": None, "error": None}
+
+    def run(self, name, fn):
+        with self._lock:
+            stage = self.stages[name]
+            stage["status"] = "loading"
+            stage["started"] = time.time()
+        print(f"⏳ [STARTUP] {name} dimuat...")
+        try:
+            fn()
+            status, error = "ready", None
+        except Exception as e:
+            status, error = "failed", str(e)
+            print(f"⚠️ [STARTUP] {name} gagal: {e}")
+            traceback.print_exc()
+        with self._lock:
+            stage["status"] = status
+            stage["error"] = error
+            stage["seconds"] = round(time.time() - stage["started"], 2)
+        self._events[name].set()
+        print(f"{'✅' if status == 'ready' else '⚠️'} [STARTUP] {name}: {status} dalam {stage['seconds']}s "
+              f"(sejak proses mula: {time.time() - PROCESS_START_TIME:.1f}s)")
+
+    def start(self, stages, background=True):
+        """stages: [(name, fn), ...] - thread berasingan setiap satu, atau berturutan jika background=False"""
+        for name, _ in stages:
+            self._register(name)
+        for name, fn in stages:
+            if background:
+                threading.Thread(target=self.run, args=(name, fn), name=f"startup-{name}", daemon=True).start()
+            else:
+                self.run(name, fn)
+
+    def finished(self, *names):
+        """True jika semua peringkat sudah selesai (ready atau failed)"""
+        return all(name in self._events and self._events[name].is_set() for name in names)
+
+    def wait(self, names, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        for name in names:
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            if name not in self._events or not self._events[name].wait(remaining):
+                return False
+        return True
+
+    def mark_first_upload(self):
+        """Rekod masa dari proses mula ke /upload pertama yang diterima"""
+        with self._lock:
+            if self.first_upload_seconds is not None:
+                return
+            self.first_upload_seconds = round(time.time() - PROCESS_START_TIME, 2)
+        print(f"⏱️ [STARTUP] /upload pertama diterima {self.first_upload_seconds}s selepas proses mula")
+
+    def stats(self):
+        with self._lock:
+            stages = {name: dict(stage) for name, stage in self.stages.items()}
+        for stage in stages.values():
+            stage.pop("started", None)
+        pending = [name for name, stage in stages.items() if stage["status"] in ("pending", "loading")]
+        return {
+            "mode": STARTUP_MODE,
+            "ready": not pending,
+            "pending": pending,
+            "degraded": [name for name, stage in stages.items() if stage["status"] == "failed"],
+            "stages": stages,
+            "uptime_seconds": round(time.time() - PROCESS_START_TIME, 1),
+            "first_upload_seconds": self.first_upload_seconds
+        }
+
+startup = StartupManager()
+
+# ==== Load YOLO Model (peringkat startup "yolo") ====
 yolo_model = None
-try:
-    yolo_model = YOLO(YOLO_MODEL_PATH)
-    print(f"✅ YOLO model loaded successfully from: {YOLO_MODEL_PATH}")
-    
-    # Test model dengan gambar kosong
-    test_img = np.zeros((480, 640, 3), dtype=np.uint8)
-    results = yolo_model(test_img, verbose=False)
-    print(f"✅ YOLO model test passed. Model ready for inference.")
-    
-except Exception as e:
-    print(f"⚠️ Failed to load YOLO model: {e}")
-    print("ℹ️ System akan menggunakan OCR sahaja (fallback mode)")
-    traceback.print_exc()
+
+def load_yolo_stage():
+    global yolo_model
+    print("🔍 Loading YOLO model...")
+    try:
+        model = load_detector(DETECTOR_BACKEND, YOLO_MODEL_PATH, DETECTOR_ONNX_PATH, DETECTOR_ONNX_PROVIDERS)
+        print(f"✅ YOLO model loaded successfully from: {model.model_path} (backend: {model.name})")
+        
+        if STARTUP_WARMUP:
+            # Test model dengan gambar kosong (warmup)
+            width, height = STARTUP_WARMUP_SIZE
+            model.predict([np.zeros((height, width, 3), dtype=np.uint8)])
+            print(f"✅ YOLO model test passed. Model ready for inference.")
+        yolo_model = model
+        
+    except Exception as e:
+        print(f"⚠️ Failed to load YOLO model: {e}")
+        print("ℹ️ System akan menggunakan OCR sahaja (fallback mode)")
+        raise
 
 # ==== Firebase Init ====
-try:
-    cred = credentials.Certificate(
-        r"C:\Users\HP\OneDrive\Documents\smart-attendance\Firebase-admin.json"
-    )
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': "https://drive-thru-smartattendance-default-rtdb.asia-southeast1.firebasedatabase.app"
-    })
-    print("✅ Firebase initialized successfully")
-    
-    # Test connection immediately
-    print("🔍 Testing Firebase connection...")
-    test_ref = db.reference("/")
-    test_data = test_ref.get()
-    if test_data:
-        print(f"✅ Firebase connection test PASSED")
-        print(f"📊 Root nodes: {list(test_data.keys())}")
-        
-        # Test access to plates
-        plates_ref = db.reference("plates")
-        plates_data = plates_ref.get()
-        if plates_data:
-            print(f"📋 Found {len(plates_data)} plates in database")
-            print(f"   Example plates: {list(plates_data.keys())[:5]}")
-    else:
-        print("⚠️ Firebase connected but no data at root")
+if not IS_OCR_WORKER:
+    try:
+        cred = credentials.Certificate(
+            r"C:\Users\HP\OneDrive\Documents\smart-attendance\Firebase-admin.json"
+        )
+        firebase_admin.initialize_app(cred, {
+            'databaseURL': "https://drive-thru-smartattendance-default-rtdb.asia-southeast1.firebasedatabase.app"
+        })
+        print("✅ Firebase initialized successfully")
+        # Ujian sambungan (shallow, tanpa muat turun root) dibuat dalam peringkat startup "firebase"
         
-except Exception as e:
-    print(f"❌ Firebase initialization failed: {e}")
-    print("🔍 Checking possible issues...")
-    print("1. Verify database URL is correct")
-    print("2. Check internet connection")
-    print("3. Verify Firebase service account file exists")
-    traceback.print_exc()
+    except Exception as e:
+        print(f"❌ Firebase initialization failed: {e}")
+        print("🔍 Checking possible issues...")
+        print("1. Verify database URL is correct")
+        print("2. Check internet connection")
+        print("3. Verify Firebase service account file exists")
+        traceback.print_exc()
 
 # ==== Flask App ====
 app = Flask(__name__)
-reader = easyocr.Reader(['en'])
+reader = None  # easyocr.Reader - dimuat dalam peringkat startup "ocr"
+
+def load_ocr_stage():
+    global reader
+    ocr_reader = easyocr.Reader(['en'])
+    if STARTUP_WARMUP:
+        # Warmup recognizer dengan satu baris kosong
+        blank = np.full((32, 100), 255, dtype=np.uint8)
+        ocr_reader.recognize(blank, horizontal_list=[[0, 100, 0, 32]], free_list=[], detail=1)
+    reader = ocr_reader
+
+# ==== Snapshot Ring Buffer ====
+class SnapshotRing:
+    """
+    Snapshot frame terkini dalam deque saiz tetap (thread-safe). Bait JPEG upload
+    disimpan by reference - tiada salinan array frame; memori terhad kepada
+    SNAPSHOT_CAPACITY JPEG walau berapa pun kadar frame.
+    """
+
+    def __init__(self, capacity):
+        self._lock = threading.Lock()
+        self._items = collections.deque(maxlen=capacity)
+        self._next_id = 1
+        self.capacity = capacity
+
+    def add(self, time_str, plate, jpeg_bytes=None, img_bgr=None):
+        """Simpan bait JPEG asal; jika tiada, encode img_bgr sekali (kualiti SNAPSHOT_JPEG_QUALITY)"""
+        if jpeg_bytes is None:
+            if img_bgr is None:
+                return None
+            ok, buf = cv2.imencode(".jpg", img_bgr, [cv2.IMWRITE_JPEG_QUALITY, SNAPSHOT_JPEG_QUALITY])
+            if not ok:
+                return None
+            jpeg_bytes = buf.tobytes()
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._items.appendleft({"id": snapshot_id, "time": time_str, "plate": plate, "jpeg": jpeg_bytes})
+        return snapshot_id
+
+    def list(self):
+        """Metadata snapshot, terbaru dahulu"""
+        with self._lock:
+            items = list(self._items)
+        return [{"id": item["id"], "time": item["time"], "plate": item["plate"],
+                 "bytes": len(item["jpeg"]), "url": f"/snapshots/{item['id']}"} for item in items]
+
+    def get(self, snapshot_id):
+        with self._lock:
+            for item in self._items:
+                if item["id"] == snapshot_id:
+                    return item
+        return None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
 last_result = {"plate": "-", "time": "-", "method": "none"}
-snapshots = []
+snapshots = SnapshotRing(SNAPSHOT_CAPACITY)
 
-# Sistem reject duplicate
-recently_processed = {}  # {plate: {"timestamp": waktu_proses, "count": jumlah_diproses}}
+# ==== Sistem reject duplicate ====
+duplicate_guard = DuplicateGuard(DUPLICATE_REJECT_WINDOW)
+
+# ==== Micro-batching Scheduler ====
+class MicroBatcher:
+    """
+    Kumpul item dari banyak request thread yang tiba dalam max_wait_ms,
+    jalankan batch_fn SEKALI untuk semua, dan pulangkan hasil kepada setiap thread.
+    """
+
+    def __init__(self, name, batch_fn, max_batch, max_wait_ms):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes = {}  # {saiz_batch: bilangan}
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, item):
+        """Hantar satu item dan tunggu hasilnya (blocking)"""
+        if self.max_batch == 1:
+            # Tiada batching - jalan terus dalam thread request
+            self._record(1)
+            return self.batch_fn([item])[0]
+
+        self._ensure_started()
+        slot = {"item": item, "done": threading.Event(), "result": None, "error": None}
+        self._queue.put(slot)
+        slot["done"].wait()
+        if slot["error"] is not None:
+            raise slot["error"]
+        return slot["result"]
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                results = self.batch_fn([slot["item"] for slot in batch])
+                for slot, result in zip(batch, results):
+                    slot["result"] = result
+            except Exception as e:
+                print(f"❌ [{self.name}] Batch error: {e}")
+                for slot in batch:
+                    slot["error"] = e
+            finally:
+                self._record(len(batch))
+                for slot in batch:
+                    slot["done"].set()
+
+    def _record(self, size):
+        with self._stats_lock:
+            self.batches += 1
+            self.items += size
+            self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+                "batch_sizes": {str(k): v for k, v in sorted(self.batch_sizes.items())}
+            }
+
+def yolo_predict_batch(frames):
+    """Jalankan detector sekali untuk senarai frame; pulangkan [(x1, y1, x2, y2, conf), ...] bagi setiap frame"""
+    return yolo_model.predict(frames)
+
+yolo_batcher = MicroBatcher("yolo", yolo_predict_batch, YOLO_BATCH_MAX, YOLO_BATCH_WAIT_MS)
 
 # ==== YOLO Plate Detection Function ====
-def detect_plate_yolo(img_bgr):
+def detect_plate_yolo(img_bgr, frame=None):
     """
     Detect plate using YOLO model
     Returns: List of plate regions (crops) and their bounding boxes
+    
+    frame: UploadFrame jika img_bgr adalah decode resolusi rendah - kotak ditukar ke
+    koordinat asal dan crop diambil pada resolusi penuh (hanya kawasan plat)
     """
     if yolo_model is None:
         print("⚠️ YOLO model not loaded, skipping detection")
         return [], []
     
     try:
-        # Run YOLO inference
-        results = yolo_model(img_bgr, verbose=False)
+        # Run YOLO inference (dikumpul bersama frame serentak lain oleh yolo_batcher)
+        detections = yolo_batcher.submit(img_bgr)
         
         plate_crops = []
         plate_boxes = []
         
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None and len(boxes) > 0:
-                for box in boxes:
-                    # Get bounding box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                    confidence = box.conf[0].cpu().numpy()
+        for (x1, y1, x2, y2, confidence) in detections:
+            # Only accept detections with confidence > 0.3
+            if confidence > 0.3:
+                # Ensure coordinates are within image bounds
+                h, w = img_bgr.shape[:2]
+                x1, y1 = max(0, x1), max(0, y1)
+                x2, y2 = min(w, x2), min(h, y2)
+                
+                # Crop plate region (resolusi penuh jika detector guna frame kecil)
+                if frame is not None and frame.reduced:
+                    x1, y1, x2, y2 = frame.to_full((x1, y1, x2, y2))
+                    plate_crop = frame.crop((x1, y1, x2, y2))
+                else:
+                    plate_crop = img_bgr[y1:y2, x1:x2]
+                
+                # Only add if crop is valid
+                if plate_crop is not None and plate_crop.size > 0 and plate_crop.shape[0] > 20 and plate_crop.shape[1] > 50:
+                    plate_crops.append(plate_crop)
+                    plate_boxes.append((x1, y1, x2, y2, confidence))
                     
-                    # Only accept detections with confidence > 0.3
-                    if confidence > 0.3:
-                        # Ensure coordinates are within image bounds
-                        h, w = img_bgr.shape[:2]
-                        x1, y1 = max(0, x1), max(0, y1)
-                        x2, y2 = min(w, x2), min(h, y2)
-                        
-                        # Crop plate region
-                        plate_crop = img_bgr[y1:y2, x1:x2]
-                        
-                        # Only add if crop is valid
-                        if plate_crop.size > 0 and plate_crop.shape[0] > 20 and plate_crop.shape[1] > 50:
-                            plate_crops.append(plate_crop)
-                            plate_boxes.append((x1, y1, x2, y2, confidence))
-                            
-                            print(f"✅ Plate detected: Box({x1},{y1},{x2},{y2}) Conf:{confidence:.2f}")
-                            print(f"   Crop size: {plate_crop.shape}")
+                    print(f"✅ Plate detected: Box({x1},{y1},{x2},{y2}) Conf:{confidence:.2f}")
+                    print(f"   Crop size: {plate_crop.shape}")
         
         if not plate_crops:
             print("⚠️ No plates detected by YOLO")
@@ -179,16 +506,120 @@ def ocr_easyocr(img_bgr):
         print(f"OCR Error: {e}")
         return "-"
 
+# ==== Batched OCR untuk crop plat YOLO ====
+def preprocess_plate_crop(plate_crop):
+    """Grayscale + CLAHE + adaptive threshold untuk crop plat"""
+    gray = cv2.cvtColor(plate_crop, cv2.COLOR_BGR2GRAY)
+    
+    # Apply CLAHE for better contrast
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    enhanced = clahe.apply(gray)
+    
+    # Apply adaptive thresholding
+    return cv2.adaptiveThreshold(enhanced, 255,
+                                 cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                 cv2.THRESH_BINARY, 11, 2)
+
+def ocr_recognize_batch(frames_crops):
+    """
+    Satu pass recognizer EasyOCR untuk SEMUA crop dari semua frame dalam batch.
+    Setiap baris teks crop (split_plate_lines) disusun menegak atas satu kanvas
+    dan dihantar sebagai satu kotak horizontal_list - detector CRAFT tidak
+    dijalankan sebab YOLO sudah cari plat.
+    Pulangkan, bagi setiap frame, senarai hasil [(bbox, text, conf)] bagi setiap crop.
+    """
+    placements = []  # (frame_idx, crop_idx, y_top, y_bottom, line_top): kedudukan setiap baris pada kanvas
+    gap = 8
+    total_h = 0
+    max_w = 1
+    for frame_idx, crops in enumerate(frames_crops):
+        for crop_idx, crop in enumerate(crops):
+            for line_top, line_bottom in split_plate_lines(crop):
+                placements.append((frame_idx, crop_idx, total_h, total_h + line_bottom - line_top, line_top))
+                total_h += line_bottom - line_top + gap
+            max_w = max(max_w, crop.shape[1])
+
+    output = [[[] for _ in crops] for crops in frames_crops]
+    if not placements:
+        return output
+
+    canvas = np.full((total_h, max_w), 255, dtype=np.uint8)
+    horizontal_list = []
+    for frame_idx, crop_idx, y_top, y_bottom, line_top in placements:
+        crop = frames_crops[frame_idx][crop_idx]
+        canvas[y_top:y_bottom, :crop.shape[1]] = crop[line_top:line_top + (y_bottom - y_top)]
+        horizontal_list.append([0, crop.shape[1], y_top, y_bottom])
+
+    results = reader.recognize(canvas, horizontal_list=horizontal_list, free_list=[],
+                               batch_size=len(horizontal_list), detail=1, paragraph=False)
+
+    # Hasil recognizer disusun ikut kedudukan y - padankan semula kepada baris/crop asal
+    line_results = {}  # {(frame_idx, crop_idx): [(y_top, text, conf), ...]}
+    for bbox, text, confidence in results:
+        y_center = (bbox[0][1] + bbox[2][1]) / 2.0
+        for frame_idx, crop_idx, y_top, y_bottom, _ in placements:
+            if y_top <= y_center <= y_bottom:
+                line_results.setdefault((frame_idx, crop_idx), []).append((y_top, text, confidence))
+                break
+
+    for (frame_idx, crop_idx), lines in line_results.items():
+        lines.sort(key=lambda line: line[0])
+        text, confidence = join_line_results([(text, conf) for _, text, conf in lines])
+        crop = frames_crops[frame_idx][crop_idx]
+        bbox = [[0, 0], [crop.shape[1], 0], [crop.shape[1], crop.shape[0]], [0, crop.shape[0]]]
+        output[frame_idx][crop_idx].append((bbox, text, confidence))
+    return output
+
+ocr_batcher = MicroBatcher("ocr", ocr_recognize_batch, OCR_BATCH_MAX, OCR_BATCH_WAIT_MS)
+
+ocr_path_counts = {"recognize_only": 0, "readtext_fallback": 0}
+ocr_path_lock = threading.Lock()
+
+def record_ocr_path(path):
+    with ocr_path_lock:
+        ocr_path_counts[path] += 1
+
+def get_ocr_path_stats():
+    with ocr_path_lock:
+        stats = dict(ocr_path_counts)
+    stats["recognize_only_enabled"] = OCR_RECOGNIZE_ONLY
+    stats["fast_min_confidence"] = OCR_FAST_MIN_CONFIDENCE
+    return stats
+
+def filter_plate_texts(results, bbox):
+    """Tapis hasil OCR crop: confidence > 0.5 dan panjang munasabah untuk plat"""
+    valid_texts = []
+    for res in results:
+        text = res[1].strip()
+        confidence = res[2]
+        
+        # Filter: confidence > 0.5 and reasonable length for plates
+        if confidence > 0.5 and 3 <= len(text) <= 12:
+            # Clean text - keep only alphanumeric
+            clean_text = ''.join(c for c in text if c.isalnum()).upper()
+            if len(clean_text) >= 3:
+                valid_texts.append({
+                    "text": clean_text,
+                    "confidence": confidence,
+                    "bbox": bbox
+                })
+    return valid_texts
+
 # ==== NEW: Hybrid OCR with YOLO + Fallback ====
-def ocr_hybrid(img_bgr):
+def ocr_hybrid(img_bgr, frame=None, fallback=True):
     """
     Try YOLO detection first, if fails use full image OCR
-    Returns: plate text and method used
+    Returns: plate text, method used and read info
+    (read: {"confidence", "box"} dengan box (x1, y1, x2, y2) relatif 0-1 kepada frame
+    penuh, untuk plate_tracker; None bila tiada bacaan YOLO)
+    
+    frame: UploadFrame bila img_bgr ialah decode resolusi rendah (lihat detect_plate_yolo)
+    fallback: False = jangan jalankan OCR imej penuh (keputusan fallback_policy)
     """
     method = "EasyOCR"
     
     # Try YOLO detection first
-    plate_crops, boxes = detect_plate_yolo(img_bgr)
+    plate_crops, boxes = detect_plate_yolo(img_bgr, frame)
     
     if plate_crops:
         method = "YOLO+EasyOCR"
@@ -196,44 +627,29 @@ def ocr_hybrid(img_bgr):
         
         all_ocr_results = []
         
-        for idx, plate_crop in enumerate(plate_crops):
+        # Semua crop frame ini (dan frame serentak lain) dibaca dalam satu pass recognizer
+        binaries = [preprocess_plate_crop(plate_crop) for plate_crop in plate_crops]
+        if OCR_RECOGNIZE_ONLY:
+            crop_results = ocr_batcher.submit(binaries)
+        else:
+            crop_results = [[] for _ in binaries]
+        
+        for idx, binary in enumerate(binaries):
             print(f"\n🔍 Processing plate crop {idx+1}/{len(plate_crops)}")
+            bbox = boxes[idx] if idx < len(boxes) else None
+            valid_texts = filter_plate_texts(crop_results[idx], bbox)
             
-            # Preprocess crop
-            gray = cv2.cvtColor(plate_crop, cv2.COLOR_BGR2GRAY)
-            
-            # Apply CLAHE for better contrast
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-            enhanced = clahe.apply(gray)
-            
-            # Apply adaptive thresholding
-            binary = cv2.adaptiveThreshold(enhanced, 255, 
-                                         cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                         cv2.THRESH_BINARY, 11, 2)
-            
-            # Run OCR on preprocessed image
-            results = reader.readtext(binary, paragraph=False)
-            
-            if not results:
-                print(f"   No text found in plate crop {idx+1}")
-                continue
-            
-            # Process OCR results
-            valid_texts = []
-            for res in results:
-                text = res[1].strip()
-                confidence = res[2]
-                
-                # Filter: confidence > 0.5 and reasonable length for plates
-                if confidence > 0.5 and 3 <= len(text) <= 12:
-                    # Clean text - keep only alphanumeric
-                    clean_text = ''.join(c for c in text if c.isalnum()).upper()
-                    if len(clean_text) >= 3:
-                        valid_texts.append({
-                            "text": clean_text,
-                            "confidence": confidence,
-                            "bbox": boxes[idx] if idx < len(boxes) else None
-                        })
+            if valid_texts and max(v["confidence"] for v in valid_texts) >= OCR_FAST_MIN_CONFIDENCE:
+                record_ocr_path("recognize_only")
+            else:
+                # Recognizer sahaja tidak yakin - baca semula crop dengan readtext penuh
+                if OCR_RECOGNIZE_ONLY:
+                    record_ocr_path("readtext_fallback")
+                results = reader.readtext(binary, paragraph=False)
+                if not results:
+                    print(f"   No text found in plate crop {idx+1}")
+                    continue
+                valid_texts = filter_plate_texts(results, bbox)
             
             all_ocr_results.extend(valid_texts)
             print(f"   Found {len(valid_texts)} valid text(s) in crop {idx+1}")
@@ -247,38 +663,607 @@ def ocr_hybrid(img_bgr):
             
             print(f"✅ YOLO+OCR success: '{plate_text}' (Confidence: {best_result['confidence']:.2f})")
             
+            read = {"confidence": float(best_result["confidence"]), "box": None}
+            
             # Draw bounding box for debugging
             if best_result["bbox"] is not None:
                 x1, y1, x2, y2, conf = best_result["bbox"]
+                if frame is not None and frame.reduced:
+                    full_w, full_h = frame.size
+                else:
+                    full_w, full_h = img_bgr.shape[1], img_bgr.shape[0]
+                read["box"] = (x1 / full_w, y1 / full_h, x2 / full_w, y2 / full_h)
+                if frame is not None and frame.reduced:
+                    x1, y1, x2, y2 = frame.to_detector((x1, y1, x2, y2))
                 cv2.rectangle(img_bgr, (x1, y1), (x2, y2), (0, 255, 0), 2)
                 cv2.putText(img_bgr, f"{plate_text} ({conf:.2f})", (x1, y1-10), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
             
-            return plate_text, method
+            return plate_text, method, read
+    
+    if not fallback:
+        print("⏭️ YOLO tiada plat - fallback OCR imej penuh tidak dibenarkan oleh policy")
+        return "-", "YOLO (Fallback skipped)", None
     
     # If YOLO fails or no plates detected, use original OCR
+    # (atas frame detector: >= DETECTOR_DECODE_MIN_WIDTH, tiada decode penuh untuk frame tanpa plat)
     print("🔍 YOLO failed or no plates detected. Falling back to full image OCR...")
-    plate_text = ocr_easyocr(img_bgr)
+    roi_img = img_bgr
+    if FALLBACK_ROI is not None:
+        # Hadkan OCR kepada kawasan lorong sahaja
+        h, w = img_bgr.shape[:2]
+        rx1, ry1, rx2, ry2 = FALLBACK_ROI
+        roi_img = img_bgr[int(ry1 * h):int(ry2 * h), int(rx1 * w):int(rx2 * w)]
+    plate_text = ocr_easyocr(roi_img)
     method = "EasyOCR (Fallback)"
     
-    return plate_text, method
+    return plate_text, method, None
+
+# ==== OCR Worker Pool (proses berasingan, lepasi GIL) ====
+def ocr_worker_main(shm_name, conn):
+    """
+    Gelung proses worker. Model YOLO dan EasyOCR sudah dimuat sekali semasa
+    modul ini di-import dalam proses worker; "ready" dihantar dahulu supaya pool
+    tahu masa import + muat model sudah tamat. Frame dibaca terus dari shared memory.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        conn.send(("ready", startup.stats()["degraded"]))
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            if message == "ping":
+                conn.send("pong")
+                continue
+            shape, jpeg_bytes, fallback = message
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            try:
+                # Bait JPEG dihantar bila frame dalam shared memory ialah decode resolusi rendah
+                upload_frame = None
+                if jpeg_bytes is not None:
+                    upload_frame = UploadFrame(jpeg_bytes, DETECTOR_DECODE_MIN_WIDTH, detector_image=frame)
+                plate, method, read = ocr_hybrid(frame, upload_frame, fallback)
+                conn.send(("ok", plate, method, read))
+            except Exception as e:
+                traceback.print_exc()
+                conn.send(("error", str(e), None, None))
+            del frame
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        shm.close()
+
+class OcrWorkerPool:
+    """
+    N proses worker, setiap satu dengan model YOLO + EasyOCR sendiri (proses utama
+    tidak memuat model dalam mod ini). Frame dihantar melalui shared memory (bukan
+    pickle), hanya bentuk array melalui Pipe. Worker baru hanya menerima frame dan
+    ping selepas menghantar "ready" (had OCR_WORKER_START_TIMEOUT, bukan
+    OCR_WORKER_TIMEOUT). Thread health check memulakan semula worker yang crash
+    atau tidak respon.
+    """
+
+    def __init__(self, count):
+        self.count = count
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots = []
+        self._free = queue.Queue()  # (slot, generation) worker yang sedia dan tidak sibuk
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._closed = False
+        self.tasks = 0
+        self.errors = 0
+        self.restarts = 0
+
+    def start(self):
+        for idx in range(self.count):
+            shm = shared_memory.SharedMemory(create=True, size=OCR_WORKER_SHM_BYTES)
+            slot = {"idx": idx, "shm": shm, "process": None, "conn": None, "lock": threading.Lock(),
+                    "generation": 0, "ready": False}
+            self._slots.append(slot)
+            self._spawn(slot)
+        threading.Thread(target=self._health_loop, name="ocr-worker-health", daemon=True).start()
+        atexit.register(self.shutdown)
+        print(f"🧵 [OCR POOL] {self.count} worker process dimulakan")
+
+    def shutdown(self):
+        """Hentikan semua worker dan lepaskan shared memory"""
+        self._closed = True  # Health check / _wait_ready tidak memulakan semula worker lagi
+        for slot in self._slots:
+            try:
+                slot["conn"].send(None)
+            except Exception:
+                pass
+            slot["process"].join(timeout=2)
+            if slot["process"].is_alive():
+                slot["process"].kill()
+            slot["shm"].close()
+            slot["shm"].unlink()
+        self._slots = []
+
+    def _spawn(self, slot):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=ocr_worker_main,
+            args=(slot["shm"].name, child_conn),
+            name=f"ocr-worker-{slot['idx']}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        slot["process"] = process
+        slot["conn"] = parent_conn
+        slot["ready"] = False
+        slot["generation"] += 1
+        threading.Thread(target=self._wait_ready, args=(slot, slot["generation"]),
+                         name=f"ocr-worker-{slot['idx']}-start", daemon=True).start()
+
+    def _wait_ready(self, slot, generation):
+        """Tunggu "ready" dari worker baru (import + muat model) sebelum ia menerima kerja"""
+        started = time.time()
+        with slot["lock"]:
+            if slot["generation"] != generation:
+                return
+            try:
+                if not slot["conn"].poll(OCR_WORKER_START_TIMEOUT):
+                    self._restart(slot, f"tidak sedia dalam {OCR_WORKER_START_TIMEOUT}s")
+                    return
+                status, degraded = slot["conn"].recv()
+            except (EOFError, BrokenPipeError, ConnectionResetError, OSError) as e:
+                self._restart(slot, f"gagal semasa dimulakan ({e})")
+                return
+            with self._ready:
+                slot["ready"] = True
+                self._ready.notify_all()
+            self._free.put((slot, generation))
+        print(f"✅ [OCR POOL] Worker {slot['idx']} sedia dalam {time.time() - started:.1f}s"
+              + (f" (degraded: {degraded})" if degraded else ""))
+
+    def wait_ready(self, timeout=OCR_WORKER_START_TIMEOUT):
+        """Peringkat startup: tunggu sekurang-kurangnya satu worker sedia"""
+        deadline = time.time() + timeout
+        with self._ready:
+            while not any(slot["ready"] for slot in self._slots):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise RuntimeError(f"Tiada OCR worker sedia dalam {timeout}s")
+                self._ready.wait(remaining)
+
+    def _restart(self, slot, reason):
+        if self._closed:
+            return
+        print(f"⚠️ [OCR POOL] Restart worker {slot['idx']}: {reason}")
+        try:
+            slot["conn"].close()
+        except Exception:
+            pass
+        if slot["process"].is_alive():
+            slot["process"].kill()
+        slot["process"].join(timeout=5)
+        self._spawn(slot)
+        with self._lock:
+            self.restarts += 1
+
+    def run(self, img_bgr, frame=None, fallback=True):
+        """Jalankan ocr_hybrid dalam worker. Pulangkan (plate, method, read)."""
+        if img_bgr.nbytes > OCR_WORKER_SHM_BYTES:
+            # Proses utama tidak memuat model dalam mod pool - tiada fallback dalam thread
+            raise RuntimeError(f"Frame {img_bgr.shape} melebihi OCR_WORKER_SHM_BYTES ({OCR_WORKER_SHM_BYTES})")
+        jpeg_bytes = frame.jpeg if frame is not None and frame.reduced else None
+
+        while True:
+            slot, generation = self._free.get()
+            if slot["generation"] == generation and slot["ready"]:
+                break  # Entri lama (worker sudah dimulakan semula) dibuang
+        try:
+            with slot["lock"]:
+                view = np.ndarray(img_bgr.shape, dtype=np.uint8, buffer=slot["shm"].buf)
+                view[...] = img_bgr
+                slot["conn"].send((img_bgr.shape, jpeg_bytes, fallback))
+
+                if not slot["conn"].poll(OCR_WORKER_TIMEOUT):
+                    self._restart(slot, f"tiada respon dalam {OCR_WORKER_TIMEOUT}s")
+                    raise RuntimeError("OCR worker timeout")
+                status, plate, method, read = slot["conn"].recv()
+
+                # Worker lukis kotak debug atas frame dalam shared memory - salin balik
+                img_bgr[...] = view
+                del view
+
+            with self._lock:
+                self.tasks += 1
+            if status != "ok":
+                raise RuntimeError(plate)
+            return plate, method, read
+
+        except (EOFError, BrokenPipeError, ConnectionResetError, OSError) as e:
+            self._restart(slot, f"worker crash ({e})")
+            with self._lock:
+                self.errors += 1
+            raise RuntimeError(f"OCR worker crash: {e}")
+        except RuntimeError:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            # Worker yang dimulakan semula masuk semula melalui _wait_ready bila sedia
+            if slot["generation"] == generation:
+                self._free.put((slot, generation))
+
+    def _health_loop(self):
+        while True:
+            time.sleep(OCR_WORKER_HEALTH_INTERVAL)
+            for slot in self._slots:
+                # Hanya periksa worker yang tidak sibuk
+                if not slot["lock"].acquire(blocking=False):
+                    continue
+                try:
+                    if not slot["ready"]:
+                        continue  # Masih dimulakan - had masa dalam _wait_ready
+                    if not slot["process"].is_alive():
+                        self._restart(slot, f"process mati (exitcode {slot['process'].exitcode})")
+                        continue
+                    slot["conn"].send("ping")
+                    if not slot["conn"].poll(OCR_WORKER_TIMEOUT) or slot["conn"].recv() != "pong":
+                        self._restart(slot, "tiada respon ping")
+                except (EOFError, BrokenPipeError, ConnectionResetError, OSError) as e:
+                    self._restart(slot, f"ping gagal ({e})")
+                finally:
+                    slot["lock"].release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.count,
+                "alive": sum(1 for slot in self._slots if slot["process"] and slot["process"].is_alive()),
+                "ready": sum(1 for slot in self._slots if slot["ready"]),
+                "idle": self._free.qsize(),
+                "tasks": self.tasks,
+                "errors": self.errors,
+                "restarts": self.restarts
+            }
+
+ocr_pool = None
+if OCR_WORKER_COUNT > 0 and not IS_OCR_WORKER:
+    ocr_pool = OcrWorkerPool(OCR_WORKER_COUNT)
+    ocr_pool.start()
+
+def run_ocr(img_bgr, frame=None, fallback=True):
+    """Detection + OCR: dalam worker pool jika diaktifkan, jika tidak dalam thread request"""
+    if ocr_pool is not None:
+        return ocr_pool.run(img_bgr, frame, fallback)
+    return ocr_hybrid(img_bgr, frame, fallback)
+
+# ==== Image Catalog Index (captured_plates tanpa os.listdir setiap request) ====
+class ImageCatalog:
+    """
+    Indeks gambar dalam SAVE_DIR: {date: {plate: info}}. Dikemaskini oleh
+    save_registered_plate_image setiap kali fail ditulis, supaya /status dan
+    /organized_images tidak perlu walk direktori. rebuild() bina semula dari cakera;
+    add() semasa rebuild direkod dan dimainkan semula atas indeks baru sebelum tukar.
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()  # Satu rebuild pada satu masa
+        self._adds_during_rebuild = None  # [(date, plate, filename, size, mtime)] semasa rebuild berjalan
+        self._dates = {}       # {date: {plate: {"count", "bytes", "latest_image", "latest_time", "images"}}}
+        self._date_order = []  # tarikh disusun menaik
+        self.total_images = 0
+        self.total_bytes = 0
+        self.rebuilds = 0
+        self.last_rebuild = None
+
+    def _add(self, date, plate, filename, size, mtime):
+        plates = self._dates.get(date)
+        if plates is None:
+            plates = self._dates[date] = {}
+            bisect.insort(self._date_order, date)
+        info = plates.get(plate)
+        if info is None:
+            info = plates[plate] = {"count": 0, "bytes": 0, "latest_image": None,
+                                    "latest_time": 0.0, "images": []}
+        info["count"] += 1
+        info["bytes"] += size
+        info["images"].append(filename)
+        if mtime >= info["latest_time"]:
+            info["latest_image"] = filename
+            info["latest_time"] = mtime
+        self.total_images += 1
+        self.total_bytes += size
+
+    def add(self, date, plate, filename, size, mtime=None):
+        """Daftar satu gambar baru (bukan thumbnail) yang baru ditulis"""
+        with self._lock:
+            entry = (date, plate, filename, size, mtime if mtime is not None else time.time())
+            self._add(*entry)
+            if self._adds_during_rebuild is not None:
+                self._adds_during_rebuild.append(entry)
+
+    def loaded(self):
+        """True selepas rebuild() pertama - sebelum itu indeks tidak lengkap"""
+        with self._lock:
+            return self.rebuilds > 0
+
+    def has(self, date, plate, filename):
+        with self._lock:
+            info = self._dates.get(date, {}).get(plate)
+            return bool(info) and filename in info["images"]
+
+    def rebuild(self):
+        """Bina semula indeks dengan walk SAVE_DIR sekali"""
+        with self._rebuild_lock:
+            return self._rebuild()
+
+    def _rebuild(self):
+        started = time.time()
+        with self._lock:
+            self._adds_during_rebuild = []
+        fresh = ImageCatalog(self.base_dir)
+        try:
+            if os.path.isdir(self.base_dir):
+                for date_entry in os.scandir(self.base_dir):
+                    if not date_entry.is_dir():
+                        continue
+                    for plate_entry in os.scandir(date_entry.path):
+                        if not plate_entry.is_dir():
+                            continue
+                        files = []
+                        for file_entry in os.scandir(plate_entry.path):
+                            if file_entry.name.endswith('.jpg') and not file_entry.name.startswith('thumb_'):
+                                st = file_entry.stat()
+                                files.append((st.st_mtime, file_entry.name, st.st_size))
+                        for mtime, name, size in sorted(files):
+                            fresh._add(date_entry.name, plate_entry.name, name, size, mtime)
+        except Exception:
+            with self._lock:
+                self._adds_during_rebuild = None  # Indeks lama (dengan add terkini) dikekalkan
+            raise
+
+        with self._lock:
+            # Gambar yang ditulis semasa walk (mungkin belum dilihat oleh scandir)
+            for date, plate, filename, size, mtime in self._adds_during_rebuild:
+                info = fresh._dates.get(date, {}).get(plate)
+                if not info or filename not in info["images"]:
+                    fresh._add(date, plate, filename, size, mtime)
+            self._adds_during_rebuild = None
+            self._dates = fresh._dates
+            self._date_order = fresh._date_order
+            self.total_images = fresh.total_images
+            self.total_bytes = fresh.total_bytes
+            self.rebuilds += 1
+            self.last_rebuild = time.time()
+        print(f"🗂️ [CATALOG] {self.total_images} gambar dalam {len(self._date_order)} tarikh "
+              f"({(time.time() - started) * 1000:.0f} ms)")
+        return self.stats()
+
+    def listing(self, max_dates=5, max_images=5):
+        """Struktur untuk /organized_images: tarikh terbaru dahulu"""
+        with self._lock:
+            structure = []
+            for date in reversed(self._date_order[-max_dates:]):
+                plates = self._dates[date]
+                plate_list = []
+                for plate in sorted(plates):
+                    info = plates[plate]
+                    plate_list.append({
+                        "plate": plate,
+                        "path": os.path.join(self.base_dir, date, plate),
+                        "image_count": info["count"],
+                        "total_bytes": info["bytes"],
+                        "latest_image": info["latest_image"],
+                        "images": info["images"][:max_images]
+                    })
+                structure.append({
+                    "date": date,
+                    "path": os.path.join(self.base_dir, date),
+                    "plates": plate_list,
+                    "total_images": sum(p["image_count"] for p in plate_list)
+                })
+            return structure
+
+    def recent_total(self, max_dates):
+        """Jumlah gambar dalam max_dates tarikh terbaru"""
+        with self._lock:
+            return sum(info["count"] for date in self._date_order[-max_dates:]
+                       for info in self._dates[date].values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "total_images": self.total_images,
+                "total_bytes": self.total_bytes,
+                "dates": len(self._date_order),
+                "rebuilds": self.rebuilds,
+                "last_rebuild": datetime.datetime.fromtimestamp(self.last_rebuild).strftime("%Y-%m-%d %H:%M:%S") if self.last_rebuild else None
+            }
+
+image_catalog = ImageCatalog(SAVE_DIR)  # Dibina dalam peringkat startup "catalog"
+
+# ==== Image Persistence Queue (encode + tulis cakera dalam background) ====
+def make_thumbnail_from_jpeg(jpeg_bytes, source_size):
+    """
+    Thumbnail dari decode resolusi rendah (IMREAD_REDUCED_COLOR_2/4/8) - decoder
+    JPEG hanya buat IDCT pada skala kecil, jadi tiada decode saiz penuh + resize besar.
+    source_size: (lebar, tinggi) gambar asal.
+    """
+    width, height = source_size
+    flag = cv2.IMREAD_COLOR
+    for factor, reduced_flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                 (2, cv2.IMREAD_REDUCED_COLOR_2)):
+        # Pilih skala paling kecil yang masih >= saiz thumbnail
+        if width // factor >= THUMBNAIL_SIZE[0] and height // factor >= THUMBNAIL_SIZE[1]:
+            flag = reduced_flag
+            break
+    small = cv2.imdecode(np.frombuffer(jpeg_bytes, np.uint8), flag)
+    if small is None:
+        return None
+    if (small.shape[1], small.shape[0]) == THUMBNAIL_SIZE:
+        return small
+    return cv2.resize(small, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+def is_jpeg_bytes(data):
+    """Semak SOI marker JPEG (FF D8) supaya hanya JPEG ditulis terus sebagai .jpg"""
+    return data is not None and len(data) > 2 and data[:2] == b"\xff\xd8"
+
+class ImagePersistQueue:
+    """
+    Queue terhad untuk simpan gambar plat. Request hanya tempah nama fail dan
+    masukkan kerja ke queue; thread background buat JPEG encode, thumbnail,
+    tulis fail dan kemaskini image_catalog. Bila queue penuh gambar dibuang
+    (back-pressure) dan dikira dalam stats.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._reserved = set()  # filepath yang sudah ditempah tapi belum ditulis
+        self._thread = None
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_error = None
+        self.write_ms_total = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="image-persist", daemon=True)
+            self._thread.start()
+            atexit.register(self.drain)
+
+    def reserve_filename(self, date_str, clean_plate, base_name):
+        """
+        Pilih nama fail unik: semak katalog + nama yang ditempah (tanpa os.path.exists).
+        Sebelum katalog dimuat, semak cakera terus supaya fail sedia ada tidak ditimpa.
+        """
+        plate_dir = os.path.join(SAVE_DIR, date_str, clean_plate)
+        filename = f"{base_name}.jpg"
+        counter = 1
+        if image_catalog.loaded():
+            exists = lambda name: image_catalog.has(date_str, clean_plate, name)
+        else:
+            exists = lambda name: os.path.exists(os.path.join(plate_dir, name))
+        with self._lock:
+            while exists(filename) or os.path.join(plate_dir, filename) in self._reserved:
+                filename = f"{base_name}_{counter}.jpg"
+                counter += 1
+            filepath = os.path.join(plate_dir, filename)
+            self._reserved.add(filepath)
+        return filename, filepath
+
+    def release(self, filepath):
+        with self._lock:
+            self._reserved.discard(filepath)
+
+    def submit(self, job):
+        """Masukkan kerja tanpa menunggu. Pulangkan False jika queue penuh."""
+        self.start()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            self.release(job["filepath"])
+            return False
+        with self._lock:
+            self.queued += 1
+        return True
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._write(job)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, job):
+        started = time.perf_counter()
+        filepath = job["filepath"]
+        try:
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            if job.get("jpeg") is not None:
+                # Bait JPEG asal dari ESP32 ditulis terus - tiada decode/encode semula
+                with open(filepath, "wb") as f:
+                    f.write(job["jpeg"])
+                thumbnail = make_thumbnail_from_jpeg(job["jpeg"], job["source_size"])
+            else:
+                success = cv2.imwrite(filepath, job["img"])
+                if not success:
+                    raise IOError(f"cv2.imwrite gagal: {filepath}")
+                thumbnail = cv2.resize(job["img"], THUMBNAIL_SIZE)
+
+            # Create thumbnail
+            if thumbnail is not None:
+                thumb_path = os.path.join(os.path.dirname(filepath), f"thumb_{job['filename']}")
+                cv2.imwrite(thumb_path, thumbnail)
+
+            # Get file info
+            file_size = os.path.getsize(filepath)
+            image_catalog.add(job["date"], job["plate_dir"], job["filename"], file_size)
+            with self._lock:
+                self.written += 1
+                self.write_ms_total += (time.perf_counter() - started) * 1000.0
+
+            print(f"✅ Gambar plat REGISTERED disimpan")
+            print(f"   📄 Fail: {filepath} ({file_size} bytes)")
+            print(f"   👤 Maklumat: {job['name']} | {job['plate']}")
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+                self.last_error = str(e)
+            print(f"❌ Error menyimpan gambar {filepath}: {e}")
+        finally:
+            self.release(filepath)
+
+    def drain(self, timeout=5.0):
+        """Tunggu gambar yang masih dalam queue ditulis (dipanggil semasa exit)"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_size": self.max_size,
+                "queued": self.queued,
+                "written": self.written,
+                "dropped_backpressure": self.dropped,
+                "failed": self.failed,
+                "avg_write_ms": round(self.write_ms_total / self.written, 1) if self.written else 0.0,
+                "last_error": self.last_error
+            }
+
+image_persist = ImagePersistQueue(IMAGE_PERSIST_QUEUE_MAX)
+if not IS_OCR_WORKER:
+    image_persist.start()
 
 # ==== Function to save image ONLY for registered plates ====
-def save_registered_plate_image(img_bgr, plate_number, timestamp, user_data):
+def save_registered_plate_image(img_bgr, plate_number, timestamp, user_data, jpeg_bytes=None):
     """
-    Save plate image ONLY if plate is registered and user data exists
+    Queue plate image for saving ONLY if plate is registered and user data exists.
+    Encode dan tulis fail dibuat oleh image_persist dalam background.
     
     Args:
-        img_bgr: OpenCV image in BGR format
+        img_bgr: OpenCV image in BGR format (tidak diubah selepas ini)
         plate_number: Detected plate number
         timestamp: Detection timestamp (format: "2024-12-18 14:30:25")
         user_data: User data from Firebase (None if not registered)
+        jpeg_bytes: Bait JPEG asal dari request - jika ada, ditulis terus tanpa encode semula
+    
+    Returns:
+        (filepath, status): status "queued", "dropped" (queue penuh) atau "skipped"
     """
     try:
         # ONLY save if plate is registered (user_data exists)
         if not user_data:
             print(f"⚠️ Plat {plate_number} tidak didaftarkan - Gambar TIDAK disimpan")
-            return None
+            return None, "skipped"
         
         # Parse timestamp
         dt = datetime.datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
@@ -293,235 +1278,245 @@ def save_registered_plate_image(img_bgr, plate_number, timestamp, user_data):
         hour_min = dt.strftime("%H.%M")         # 11.56
         seconds = dt.strftime("%S")             # 54
         
-        # Create directory structure: captured_plates/date/plate/
-        date_dir = os.path.join(SAVE_DIR, date_str)
-        plate_dir = os.path.join(date_dir, clean_plate)
-        
-        # Create directories if they don't exist
-        os.makedirs(plate_dir, exist_ok=True)
+        # NAMA FAIL: plate_hour.min_seconds.jpg (tambah _counter jika sama saat)
+        filename, filepath = image_persist.reserve_filename(
+            date_str, clean_plate, f"{clean_plate}_{hour_min}_{seconds}"
+        )
         
-        # NAMA FAIL: plate_hour.min_seconds.jpg
-        filename = f"{clean_plate}_{hour_min}_{seconds}.jpg"
-        filepath = os.path.join(plate_dir, filename)
-        
-        # Check if file already exists (same second)
-        counter = 1
-        while os.path.exists(filepath):
-            # Add counter if file exists
-            filename = f"{clean_plate}_{hour_min}_{seconds}_{counter}.jpg"
-            filepath = os.path.join(plate_dir, filename)
-            counter += 1
-        
-        # Save image
-        success = cv2.imwrite(filepath, img_bgr)
+        job = {
+            "img": None if is_jpeg_bytes(jpeg_bytes) else img_bgr,
+            "jpeg": jpeg_bytes if is_jpeg_bytes(jpeg_bytes) else None,
+            "source_size": (jpeg_dimensions(jpeg_bytes) if is_jpeg_bytes(jpeg_bytes) else None) or (img_bgr.shape[1], img_bgr.shape[0]),
+            "filepath": filepath,
+            "filename": filename,
+            "date": date_str,
+            "plate_dir": clean_plate,
+            "plate": plate_number,
+            "name": user_data.get('name', 'unknown')
+        }
+        if not image_persist.submit(job):
+            print(f"⚠️ Queue simpan gambar penuh ({IMAGE_PERSIST_QUEUE_MAX}) - Gambar {filename} DIBUANG")
+            return None, "dropped"
         
-        if success:
-            # Create thumbnail
-            thumbnail = cv2.resize(img_bgr, (320, 240))
-            thumb_filename = f"thumb_{filename}"
-            thumb_path = os.path.join(plate_dir, thumb_filename)
-            cv2.imwrite(thumb_path, thumbnail)
-            
-            # Get file info
-            file_size = os.path.getsize(filepath)
-            
-            print(f"✅ Gambar plat REGISTERED disimpan")
-            print(f"   📁 Lokasi: {plate_dir}")
-            print(f"   📄 Fail: {filename}")
-            print(f"   📏 Saiz: {file_size} bytes")
-            print(f"   👤 Maklumat: {user_data.get('name', 'unknown')} | {plate_number}")
-            print(f"   🗂️ Struktur: {SAVE_DIR}/{date_str}/{clean_plate}/{filename}")
-            
-            return filepath
-        else:
-            print(f"❌ Gagal menyimpan gambar: {filename}")
-            return None
+        print(f"🗂️ Gambar dijadualkan: {SAVE_DIR}/{date_str}/{clean_plate}/{filename}")
+        return filepath, "queued"
             
     except Exception as e:
         print(f"❌ Error menyimpan gambar: {e}")
         traceback.print_exc()
-        return None
+        return None, "error"
+
+# ==== Registry Mirror (/plates, /users, /rfid_to_user, /rfid_cards) ====
+registry_mirror = RegistryMirror(
+    FakeFirebaseEventSource() if MIRROR_SOURCE == "fake" else FirebaseEventSource(),
+    MIRROR_NODES,
+    ready_timeout=MIRROR_READY_TIMEOUT,
+    refresh_interval=REGISTRY_REFRESH_INTERVAL
+)
+
+# ==== Plate Registry Index (dalam memori) ====
+PLATE_FIELDS = ["plate", "plateNumber", "car_plate", "vehicle_plate", "number_plate", "registration", "car_number", "carNumber"]
+
+def normalize_plate(plate):
+    """Normalize plat ke kunci index: alphanumeric sahaja, uppercase"""
+    return ''.join(c for c in str(plate) if c.isalnum()).upper()
+
+class PlateRegistryIndex:
+    """
+    Index plat berdaftar dalam memori, dibina dari /plates dan /users sahaja.
+    Carian O(1) dengan kunci plat yang sudah di-normalize, tanpa panggilan rangkaian.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # {clean_plate: {"user_data": {...}, "user_id": ..., "source": "plates/PBL666"}}
+        self.hits = 0
+        self.misses = 0
+        self.refresh_count = 0
+        self.last_refresh = None  # time.time() refresh terakhir
+        self.last_miss_refresh = 0.0
+        self.last_error = None
+
+    def build(self, plates_data, users_data):
+        """Bina semula index dari data /plates dan /users"""
+        entries = {}
+
+        # /users dahulu - /plates akan override sebab /plates dicari dahulu dalam carian asal
+        if isinstance(users_data, dict):
+            for user_id, user_data in users_data.items():
+                if not isinstance(user_data, dict):
+                    continue
+                for field in PLATE_FIELDS:
+                    if not user_data.get(field):
+                        continue
+                    clean_plate = normalize_plate(user_data[field])
+                    if clean_plate and clean_plate not in entries:
+                        entries[clean_plate] = {
+                            "user_data": user_data,
+                            "user_id": user_id,
+                            "source": f"users/{user_id}/{field}"
+                        }
+
+        if isinstance(plates_data, dict):
+            plate_entries = {}
+            for stored_plate, data in plates_data.items():
+                if not isinstance(data, dict):
+                    continue
+                clean_plate = normalize_plate(stored_plate)
+                if not clean_plate:
+                    continue
+                # Kunci yang tepat (contoh: "PBL666") menang berbanding "PBL 666"
+                if clean_plate in plate_entries and stored_plate != clean_plate:
+                    continue
+                plate_entries[clean_plate] = {
+                    "user_data": data,
+                    "user_id": data.get("user_id") or data.get("uid"),
+                    "source": f"plates/{stored_plate}"
+                }
+            entries.update(plate_entries)
+
+        with self._lock:
+            self._entries = entries
+            self.refresh_count += 1
+            self.last_refresh = time.time()
+        return len(entries)
+
+    def refresh(self):
+        """Bina semula index dari mirror; baca /plates dan /users (bukan root) jika mirror belum sedia"""
+        try:
+            if registry_mirror.is_ready():
+                plates_data = registry_mirror.get("plates")
+                users_data = registry_mirror.get("users")
+            else:
+                plates_data = db.reference("plates").get()
+                users_data = db.reference("users").get()
+            count = self.build(plates_data, users_data)
+            self.last_error = None
+            print(f"📇 [REGISTRY] Index dikemaskini: {count} plat berdaftar")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"❌ [REGISTRY] Gagal refresh index: {e}")
+            return False
+
+    def lookup(self, plate):
+        """Cari entry index untuk plat (None jika tidak berdaftar)"""
+        clean_plate = normalize_plate(plate)
+        with self._lock:
+            entry = self._entries.get(clean_plate)
+            if entry is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry
+
+    def refresh_after_miss(self):
+        """Refresh index selepas miss, dihadkan oleh REGISTRY_MISS_REFRESH_COOLDOWN"""
+        if registry_mirror.is_ready():
+            return False  # Mirror sudah dikemaskini oleh listener, tiada gunanya baca semula
+        with self._lock:
+            now = time.time()
+            if now - self.last_miss_refresh < REGISTRY_MISS_REFRESH_COOLDOWN:
+                return False
+            self.last_miss_refresh = now
+        return self.refresh()
+
+    def put(self, plate, user_data, user_id, source):
+        """Tambah/kemaskini satu entry (contoh: selepas register_test_plate)"""
+        with self._lock:
+            self._entries[normalize_plate(plate)] = {
+                "user_data": user_data,
+                "user_id": user_id,
+                "source": source
+            }
+
+    def plates(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else None,
+                "refresh_count": self.refresh_count,
+                "last_refresh": datetime.datetime.fromtimestamp(self.last_refresh).strftime("%Y-%m-%d %H:%M:%S") if self.last_refresh else None,
+                "refresh_interval_seconds": REGISTRY_REFRESH_INTERVAL,
+                "last_error": self.last_error
+            }
+
+def on_registry_mirror_change(node):
+    """Bina semula index plat bila /plates atau /users berubah dalam mirror"""
+    if node in ("plates", "users") and registry_mirror.is_ready():
+        plate_registry.refresh()
+
+# Mula mirror (listener + delta refresh); index dibina semula setiap kali registry berubah
+plate_registry = PlateRegistryIndex()
+registry_mirror.on_change(on_registry_mirror_change)
+# registry_mirror.start() + plate_registry.refresh() dalam peringkat startup "firebase"
 
 # ==== IMPROVED: Function to get user info from plate ====
 def get_user_info_from_plate(plate):
-    """Get user info from plate - VERSION DIPERBAIKI"""
+    """Get user info from plate - guna index dalam memori (tiada muat turun root)"""
     try:
-        # Clean the plate number
-        clean_plate = ''.join(c for c in plate if c.isalnum()).upper()
+        clean_plate = normalize_plate(plate)
         print(f"\n🔍 [PLATE SEARCH] Mencari plat: '{plate}' -> '{clean_plate}'")
-        
-        # DEBUG: List semua cara plat mungkin disimpan
-        print(f"🔍 [PLATE DEBUG] Format kemungkinan untuk plat '{plate}':")
-        print(f"   1. Clean: '{clean_plate}' (alphanumeric only)")
-        print(f"   2. Original: '{plate}' (as detected)")
-        print(f"   3. With spaces variations:")
-        print(f"      - '{plate.replace(' ', '')}' (no spaces)")
-        print(f"      - '{' '.join(plate.split())}' (single spaces)")
-        print(f"      - '{plate.strip()}' (stripped)")
-        
-        # Get ALL data from Firebase for debugging
-        root_ref = db.reference("/")
-        all_data = root_ref.get()
-        
-        if not all_data:
-            print(f"❌ [PLATE SEARCH] Firebase kosong!")
+
+        entry = plate_registry.lookup(clean_plate)
+
+        # Plat baru didaftar selepas refresh terakhir? Refresh sekali (ada cooldown) dan cuba lagi
+        if entry is None and plate_registry.refresh_after_miss():
+            entry = plate_registry.lookup(clean_plate)
+
+        if entry is None:
+            print(f"❌ [PLATE SEARCH] Plat '{clean_plate}' tidak ditemui dalam index ({plate_registry.stats()['size']} plat)")
+            print(f"📋 [PLATE SEARCH] Cadangan: Pastikan plat didaftarkan di /plates/ atau /users/")
             return None
-        
-        # Debug: Print root structure
-        print(f"📊 [PLATE SEARCH] Struktur root: {list(all_data.keys())}")
-        
-        # OPTION 1: Check in dedicated "plates" directory
-        if "plates" in all_data and isinstance(all_data["plates"], dict):
-            print(f"📍 [PLATE SEARCH] Mencari di /plates/")
-            print(f"   Plat yang ada di /plates/: {list(all_data['plates'].keys())}")
-            
-            # Check exact match dengan berbagai format
-            possible_keys = [
-                clean_plate,                    # PBL666
-                plate.replace(" ", "").upper(), # PBL666 (no spaces)
-                plate.upper().strip(),          # PBL666 (uppercase, stripped)
-                ' '.join(plate.upper().split()), # P B L 6 6 6 (normalized spaces)
-            ]
-            
-            # Add variations with different spacing
-            if len(plate) >= 3:
-                # Try adding spaces: PBL666 -> PBL 666
-                if any(c.isdigit() for c in plate) and any(c.isalpha() for c in plate):
-                    # Find where numbers start
-                    for i in range(1, len(plate)):
-                        if plate[i].isdigit() and plate[i-1].isalpha():
-                            spaced = plate[:i] + " " + plate[i:]
-                            possible_keys.append(spaced.upper().replace(" ", ""))
-                            possible_keys.append(spaced.upper())
-                            break
-            
-            # Remove duplicates
-            possible_keys = list(set([k for k in possible_keys if k]))
-            
-            print(f"🔍 [PLATE DEBUG] Mencari dengan keys: {possible_keys}")
-            
-            for test_key in possible_keys:
-                if test_key in all_data["plates"]:
-                    user_data = all_data["plates"][test_key]
-                    print(f"✅ [PLATE SEARCH] Ditemui di /plates/{test_key}")
-                    print(f"   Data: {user_data}")
-                    return user_data
-            
-            # Check partial match (remove spaces, case insensitive)
-            for stored_plate, data in all_data["plates"].items():
-                if not isinstance(data, dict):
-                    continue
-                    
-                stored_clean = ''.join(c for c in stored_plate if c.isalnum()).upper()
-                if clean_plate == stored_clean:
-                    print(f"✅ [PLATE SEARCH] Ditemui (partial match): {stored_plate} -> {clean_plate}")
-                    print(f"   Data: {data}")
-                    return data
-            
-            print(f"⚠️ [PLATE SEARCH] Plat tidak ditemui di /plates/")
-        
-        # OPTION 2: Search in "users" directory
-        if "users" in all_data and isinstance(all_data["users"], dict):
-            print(f"📍 [PLATE SEARCH] Mencari di /users/")
-            
-            for user_id, user_data in all_data["users"].items():
-                if not isinstance(user_data, dict):
-                    continue
-                    
-                # Check various plate field names
-                plate_fields = ["plate", "plateNumber", "car_plate", "vehicle_plate", "number_plate", "registration", "car_number"]
-                
-                for field in plate_fields:
-                    if field in user_data:
-                        user_plate = user_data.get(field, "")
-                        if not user_plate:
-                            continue
-                            
-                        user_plate_str = str(user_plate)
-                        user_plate_clean = ''.join(c for c in user_plate_str if c.isalnum()).upper()
-                        
-                        print(f"   🔍 Checking {user_id}/{field}: '{user_plate_str}' -> '{user_plate_clean}'")
-                        
-                        if clean_plate == user_plate_clean:
-                            print(f"✅ [PLATE SEARCH] Ditemui di /users/{user_id}/{field}")
-                            print(f"   Nama: {user_data.get('name', 'Unknown')}")
-                            print(f"   Plat asal: '{user_plate_str}' -> Clean: '{user_plate_clean}'")
-                            return user_data
-        
-        # OPTION 3: Deep search in entire database
-        print(f"📍 [PLATE SEARCH] Melakukan deep search...")
-        
-        found_data = None
-        found_path = ""
-        
-        def deep_search(data, current_path=""):
-            nonlocal found_data, found_path
-            
-            if found_data:  # Already found
-                return
-            
-            if isinstance(data, dict):
-                # Check for plate fields in this node
-                for field in ["plate", "plateNumber", "car_plate", "vehicle_plate", "number_plate", "registration", "carNumber"]:
-                    if field in data:
-                        field_value = str(data.get(field, ""))
-                        if field_value:
-                            field_clean = ''.join(c for c in field_value if c.isalnum()).upper()
-                            if clean_plate == field_clean:
-                                found_data = data
-                                found_path = f"{current_path}/{field}"
-                                return
-                
-                # Search recursively in children
-                for key, value in data.items():
-                    if isinstance(value, (dict, list)):
-                        deep_search(value, f"{current_path}/{key}")
-            
-            elif isinstance(data, list):
-                for i, item in enumerate(data):
-                    if isinstance(item, (dict, list)):
-                        deep_search(item, f"{current_path}[{i}]")
-        
-        deep_search(all_data, "")
-        
-        if found_data:
-            print(f"✅ [PLATE SEARCH] Ditemui di {found_path}")
-            print(f"   Data: {found_data}")
-            return found_data
-        
-        # OPTION 4: Check "rfid_to_user" for plate mappings
-        print(f"📍 [PLATE SEARCH] Mencari di rfid_to_user/")
-        
-        # If we have RFID data, check if any user has this plate
-        if "rfid_to_user" in all_data and isinstance(all_data["rfid_to_user"], dict):
-            for rfid_uid, user_id in all_data["rfid_to_user"].items():
-                if not user_id or not isinstance(user_id, str):
-                    continue
-                    
-                # Get user data
-                user_ref = db.reference(f"users/{user_id}")
-                user_data = user_ref.get()
-                
-                if user_data and isinstance(user_data, dict):
-                    # Check plate in user data
-                    user_plate = user_data.get("plate", "")
-                    if user_plate:
-                        user_plate_clean = ''.join(c for c in str(user_plate) if c.isalnum()).upper()
-                        if clean_plate == user_plate_clean:
-                            print(f"✅ [PLATE SEARCH] Ditemui melalui rfid_to_user/{rfid_uid}")
-                            print(f"   User: {user_data.get('name', 'Unknown')}")
-                            return user_data
-        
-        print(f"❌ [PLATE SEARCH] Plat '{clean_plate}' tidak ditemui di mana-mana!")
-        print(f"📋 [PLATE SEARCH] Cadangan: Pastikan plat didaftarkan di /plates/ atau /users/")
-        
-        return None
-        
+
+        print(f"✅ [PLATE SEARCH] Ditemui di /{entry['source']}")
+        print(f"   Nama: {entry['user_data'].get('name', 'Unknown')}")
+        return entry["user_data"]
+
     except Exception as e:
         print(f"❌ [PLATE SEARCH] ERROR: {e}")
         traceback.print_exc()
         return None
 
+# ==== Resolution context: satu carian registry untuk setiap bacaan plat ====
+resolution_stats = {"accepted_reads": 0, "plate_resolutions": 0}
+resolution_stats_lock = threading.Lock()
+
+def resolve_plate(plate):
+    """
+    Cari plat dalam registry SEKALI dan pulangkan context yang dikongsi oleh
+    simpan gambar, save_attendance dan update /latestPlate
+    """
+    user_data = get_user_info_from_plate(plate)
+    with resolution_stats_lock:
+        resolution_stats["plate_resolutions"] += 1
+
+    user_id = None
+    if user_data:
+        # Sama seperti sebelum ini: user_id dari data atau buat berdasarkan plat
+        user_id = user_data.get("user_id") or user_data.get("uid") or f"user_{plate}"
+
+    return {
+        "plate": plate,
+        "clean_plate": normalize_plate(plate),
+        "user_data": user_data,
+        "user_id": user_id
+    }
+
+def get_resolution_stats():
+    with resolution_stats_lock:
+        stats = dict(resolution_stats)
+    reads = stats["accepted_reads"]
+    stats["resolutions_per_read"] = round(stats["plate_resolutions"] / reads, 3) if reads else None
+    return stats
+
 # ==== NEW: Debug function untuk check plate spacing ====
 def debug_plate_spacing(plate):
     """Debug function untuk lihat semua kemungkinan format plat"""
@@ -560,12 +1555,528 @@ def debug_plate_spacing(plate):
     
     return clean
 
+# ==== Frame Pre-filter (skip frame kosong / tiada perubahan sebelum YOLO) ====
+def get_camera_id():
+    """ID kamera untuk request semasa: header X-Camera-Id, jika tiada guna IP ESP32"""
+    return request.headers.get("X-Camera-Id") or request.remote_addr or "unknown"
+
+def prefilter_gray(jpeg_bytes=None, img_bgr=None):
+    """
+    Frame grayscale kecil (PREFILTER_SIZE) untuk pre-filter. Dari JPEG terus guna
+    IMREAD_REDUCED_GRAYSCALE_8 - tiada decode warna penuh untuk frame yang akan diskip.
+    """
+    gray = None
+    if jpeg_bytes is not None:
+        gray = cv2.imdecode(np.frombuffer(jpeg_bytes, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gray is None and img_bgr is not None:
+        gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+    if gray is None:
+        return None
+    return cv2.resize(gray, PREFILTER_SIZE, interpolation=cv2.INTER_AREA)
+
+class FramePrefilter:
+    """
+    Model latar belakang (running average) bagi setiap kamera. Frame terlalu
+    gelap/terang/kabur, atau tanpa perubahan berbanding latar belakang, ditolak
+    sebelum YOLO/OCR. Frame pertama setiap kamera sentiasa diproses.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cameras = {}  # {camera_id: {"background", "frames", "skipped", "reasons", "last_seen"}}
+
+    def _camera(self, camera_id):
+        cam = self._cameras.get(camera_id)
+        if cam is None:
+            cam = self._cameras[camera_id] = {
+                "background": None, "frames": 0, "passed": 0, "skipped": 0,
+                "reasons": {"dark": 0, "overexposed": 0, "blur": 0, "no_motion": 0},
+                "last_motion": None, "last_seen": None
+            }
+        return cam
+
+    def check(self, camera_id, gray):
+        """
+        Pulangkan (proses, sebab, info). sebab: None, "dark", "overexposed", "blur", "no_motion".
+        """
+        started = time.perf_counter()
+        brightness = float(gray.mean())
+        sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+        reason = None
+        if brightness < PREFILTER_MIN_BRIGHTNESS:
+            reason = "dark"
+        elif brightness > PREFILTER_MAX_BRIGHTNESS:
+            reason = "overexposed"
+        elif sharpness < PREFILTER_MIN_SHARPNESS:
+            reason = "blur"
+
+        with self._lock:
+            cam = self._camera(camera_id)
+            cam["frames"] += 1
+            cam["last_seen"] = time.time()
+            motion = None
+            if reason is None:
+                frame = gray.astype(np.float32)
+                if cam["background"] is None or cam["background"].shape != frame.shape:
+                    cam["background"] = frame
+                    motion = 1.0
+                else:
+                    diff = cv2.absdiff(frame, cam["background"])
+                    motion = float((diff > PREFILTER_PIXEL_DELTA).mean())
+                    # Latar belakang ikut perubahan cahaya perlahan-lahan
+                    cv2.accumulateWeighted(frame, cam["background"], PREFILTER_BG_ALPHA)
+                    if motion < PREFILTER_MOTION_THRESHOLD:
+                        reason = "no_motion"
+                cam["last_motion"] = motion
+
+            if reason is None:
+                cam["passed"] += 1
+            else:
+                cam["skipped"] += 1
+                cam["reasons"][reason] += 1
+
+        info = {
+            "camera_id": camera_id,
+            "brightness": round(brightness, 1),
+            "sharpness": round(sharpness, 1),
+            "motion": round(motion, 4) if motion is not None else None,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 2)
+        }
+        return reason is None, reason, info
+
+    def stats(self):
+        with self._lock:
+            frames = sum(cam["frames"] for cam in self._cameras.values())
+            skipped = sum(cam["skipped"] for cam in self._cameras.values())
+            return {
+                "enabled": PREFILTER_ENABLED,
+                "frames": frames,
+                "skipped": skipped,
+                "skip_ratio": round(skipped / frames, 3) if frames else 0.0,
+                "cameras": {
+                    camera_id: {
+                        "frames": cam["frames"],
+                        "skipped": cam["skipped"],
+                        "skip_ratio": round(cam["skipped"] / cam["frames"], 3) if cam["frames"] else 0.0,
+                        "reasons": dict(cam["reasons"]),
+                        "last_motion": cam["last_motion"]
+                    }
+                    for camera_id, cam in self._cameras.items()
+                }
+            }
+
+frame_prefilter = FramePrefilter()
+
+# ==== Fallback Policy (OCR imej penuh bila YOLO tiada plat) ====
+FALLBACK_MODES = ("never", "always", "only_if_motion", "rate_limited")
+
+class FallbackPolicy:
+    """
+    Tentukan sama ada ocr_easyocr imej penuh boleh dijalankan bila YOLO tidak jumpa
+    plat, ikut mod kamera: never / always / only_if_motion / rate_limited.
+    """
+
+    def __init__(self, default_mode, camera_modes=None):
+        self.default_mode = default_mode
+        self.camera_modes = dict(camera_modes or {})
+        self._lock = threading.Lock()
+        self._last_used = {}  # {camera_id: masa fallback terakhir}
+        self._counts = {}  # {camera_id: {"allowed": n, "denied": n}} - hanya frame yang YOLO tiada plat
+
+    def mode_for(self, camera_id):
+        mode = self.camera_modes.get(camera_id, self.default_mode)
+        return mode if mode in FALLBACK_MODES else "always"
+
+    def allow(self, camera_id, motion=None):
+        """
+        Pulangkan (dibenarkan, mod). motion: nisbah perubahan dari pre-filter (None = tidak diketahui).
+        Dipanggil sebelum YOLO (keputusan dihantar ke worker) - tidak dikira; lihat record().
+        """
+        mode = self.mode_for(camera_id)
+        now = time.time()
+        with self._lock:
+            if mode == "never":
+                allowed = False
+            elif mode == "only_if_motion":
+                allowed = motion is None or motion >= FALLBACK_MOTION_THRESHOLD
+            elif mode == "rate_limited":
+                allowed = now - self._last_used.get(camera_id, 0) >= FALLBACK_RATE_LIMIT_SECONDS
+            else:
+                allowed = True
+        return allowed, mode
+
+    def record(self, camera_id, used):
+        """
+        YOLO tiada plat, jadi fallback dipertimbangkan: kira keputusan.
+        used = fallback benar-benar dijalankan - mula tempoh rate limit.
+        """
+        with self._lock:
+            counts = self._counts.setdefault(camera_id, {"allowed": 0, "denied": 0})
+            counts["allowed" if used else "denied"] += 1
+            if used:
+                self._last_used[camera_id] = time.time()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "default_mode": self.default_mode,
+                "camera_modes": dict(self.camera_modes),
+                "rate_limit_seconds": FALLBACK_RATE_LIMIT_SECONDS,
+                "motion_threshold": FALLBACK_MOTION_THRESHOLD,
+                "roi": FALLBACK_ROI,
+                "cameras": {camera_id: dict(counts) for camera_id, counts in self._counts.items()}
+            }
+
+fallback_policy = FallbackPolicy(FALLBACK_POLICY, FALLBACK_CAMERA_POLICIES)
+
+class LatencyHistogram:
+    """Histogram latensi (ms) bagi setiap laluan pemprosesan frame"""
+
+    def __init__(self, buckets_ms):
+        self.buckets_ms = tuple(buckets_ms)
+        self._lock = threading.Lock()
+        self._paths = {}  # {path: {"count", "total_ms", "max_ms", "buckets": [n, ...]}}
+
+    def record(self, path, elapsed_ms):
+        with self._lock:
+            entry = self._paths.get(path)
+            if entry is None:
+                entry = self._paths[path] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                             "buckets": [0] * (len(self.buckets_ms) + 1)}
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["buckets"][bisect.bisect_left(self.buckets_ms, elapsed_ms)] += 1
+
+    def stats(self):
+        labels = [f"<={b}ms" for b in self.buckets_ms] + [f">{self.buckets_ms[-1]}ms"]
+        with self._lock:
+            return {
+                path: {
+                    "count": entry["count"],
+                    "avg_ms": round(entry["total_ms"] / entry["count"], 1),
+                    "max_ms": round(entry["max_ms"], 1),
+                    # Senarai [label, bilangan] - jsonify susun semula kunci dict
+                    "histogram": [[label, n] for label, n in zip(labels, entry["buckets"])]
+                }
+                for path, entry in self._paths.items()
+            }
+
+frame_latency = LatencyHistogram(LATENCY_BUCKETS_MS)
+
+# ==== Plate Vote Tracker (undian beberapa frame bagi setiap kenderaan) ====
+def box_iou(a, b):
+    """IoU dua kotak (x1, y1, x2, y2)"""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+class PlateVoteTracker:
+    """
+    Track jangka pendek bagi setiap kamera: bacaan YOLO+OCR frame berturut-turut
+    untuk kenderaan sama (teks sama, atau beza 1 aksara dengan IoU kotak plat
+    >= PLATE_TRACK_IOU) dikumpul sebagai undian; teks yang jauh berbeza sentiasa
+    memulakan track baru. Satu plat di-commit bila undian konvergen (PLATE_VOTE_MIN_VOTES
+    dan PLATE_VOTE_MIN_SHARE) atau satu bacaan sangat yakin; track yang tamat
+    (PLATE_TRACK_TIMEOUT tanpa bacaan) hanya di-flush jika pendahulu memenuhi syarat
+    yang sama - selain itu track dibuang (satu bacaan lemah tidak ditulis sebagai kehadiran).
+    Selepas commit, bacaan lain dalam track diserap - tiada carian registry/tulisan kedua.
+    """
+
+    def __init__(self, iou_threshold, timeout, min_votes, min_share, commit_confidence):
+        self.iou_threshold = iou_threshold
+        self.timeout = timeout
+        self.min_votes = min_votes
+        self.min_share = min_share
+        self.commit_confidence = commit_confidence
+        self._lock = threading.Lock()
+        self._tracks = {}  # camera_id -> [track, ...]
+        self._next_id = 1
+        self.counts = {
+            "reads": 0,
+            "tracks_created": 0,
+            "committed_converged": 0,
+            "committed_confident": 0,
+            "committed_on_expiry": 0,
+            "discarded_on_expiry": 0,
+            "reads_absorbed": 0,
+            "misreads_outvoted": 0
+        }
+
+    def _leader(self, track):
+        votes = track["votes"]
+        plate = max(votes, key=lambda p: (votes[p]["weight"], votes[p]["count"]))
+        total = sum(v["weight"] for v in votes.values())
+        return plate, votes[plate], (votes[plate]["weight"] / total if total else 0.0)
+
+    def _commit_reason(self, track):
+        # Pulangkan (pendahulu, sebab) jika undian cukup untuk commit, atau (pendahulu, None)
+        leader, leader_vote, share = self._leader(track)
+        if leader_vote["count"] >= self.min_votes and share >= self.min_share:
+            return leader, "committed_converged"
+        if leader_vote["best_conf"] >= self.commit_confidence:
+            return leader, "committed_confident"
+        return leader, None
+
+    def _match(self, camera_id, plate, box, now):
+        # Panggil dengan self._lock; track aktif paling padan untuk bacaan ini.
+        # Teks mesti sentiasa hampir sama (beza <= 1 aksara): di pagar semua plat berada
+        # di kedudukan yang lebih kurang sama, jadi IoU sahaja akan menyerap kereta
+        # seterusnya ke dalam track kereta sebelumnya.
+        best, best_score = None, -1.0
+        for track in self._tracks.get(camera_id, []):
+            if now - track["last_seen"] > self.timeout:
+                continue
+            candidates = [track["committed"]] if track["committed"] is not None else track["votes"]
+            distance = min(plate_edit_distance(plate, voted) for voted in candidates)
+            if distance > 1:
+                continue
+            score = box_iou(box, track["box"])
+            # Bacaan tersalah 1 aksara mesti di kedudukan sama; teks tepat sama boleh
+            # padan walaupun kenderaan bergerak jauh antara frame (IoU rendah)
+            if distance == 1 and score < self.iou_threshold:
+                continue
+            if score > best_score:
+                best, best_score = track, score
+        return best
+
+    def _summary(self, track):
+        return {
+            "track_id": track["id"],
+            "frames": track["frames"],
+            "committed": track["committed"],
+            "votes": {plate: round(v["weight"], 2) for plate, v in track["votes"].items()}
+        }
+
+    def observe(self, camera_id, plate, read, method, jpeg_bytes, img_bgr):
+        """
+        Tambah satu bacaan. Pulangkan (tindakan, ringkasan track, bukti):
+          "commit"  - commit plat bukti["plate"] sekarang (bukti = frame terbaik plat itu)
+          "pending" - undian belum konvergen
+          "tracked" - track sudah di-commit; bacaan ini diserap
+        """
+        now = time.time()
+        with self._lock:
+            self.counts["reads"] += 1
+            track = self._match(camera_id, plate, read["box"], now)
+            if track is None:
+                track = {
+                    "id": self._next_id,
+                    "camera_id": camera_id,
+                    "first_seen": datetime.datetime.now(),
+                    "frames": 0,
+                    "votes": {},
+                    "evidence": {},  # plat -> bacaan paling yakin (untuk gambar + method)
+                    "committed": None
+                }
+                self._next_id += 1
+                self._tracks.setdefault(camera_id, []).append(track)
+                self.counts["tracks_created"] += 1
+            track["box"] = read["box"]
+            track["last_seen"] = now
+            track["frames"] += 1
+            vote = track["votes"].setdefault(plate, {"count": 0, "weight": 0.0, "best_conf": 0.0})
+            vote["count"] += 1
+            vote["weight"] += read["confidence"]
+            if read["confidence"] >= vote["best_conf"]:
+                vote["best_conf"] = read["confidence"]
+                track["evidence"][plate] = {"plate": plate, "method": method, "confidence": read["confidence"],
+                                            "jpeg_bytes": jpeg_bytes, "img_bgr": img_bgr}
+
+            if track["committed"] is not None:
+                self.counts["reads_absorbed"] += 1
+                if plate != track["committed"]:
+                    self.counts["misreads_outvoted"] += 1
+                return "tracked", self._summary(track), None
+
+            leader, reason = self._commit_reason(track)
+            if reason is None:
+                return "pending", self._summary(track), None
+            track["committed"] = leader
+            self.counts[reason] += 1
+            self.counts["misreads_outvoted"] += sum(v["count"] for p, v in track["votes"].items() if p != leader)
+            evidence = dict(track["evidence"][leader], first_seen=track["first_seen"], reason=reason)
+            return "commit", self._summary(track), evidence
+
+    def end_committed(self, camera_id):
+        """Tutup track kamera yang sudah di-commit (scene berubah: kenderaan sudah beredar)"""
+        with self._lock:
+            tracks = [t for t in self._tracks.get(camera_id, []) if t["committed"] is None]
+            if tracks:
+                self._tracks[camera_id] = tracks
+            else:
+                self._tracks.pop(camera_id, None)
+
+    def expire(self):
+        """
+        Buang track tamat. Pulangkan [(ringkasan, bukti)] untuk track belum di-commit yang
+        memenuhi syarat commit; track lain (cth. satu bacaan bawah PLATE_VOTE_COMMIT_CONFIDENCE)
+        dibuang dan dikira dalam discarded_on_expiry.
+        """
+        now = time.time()
+        flushed = []
+        with self._lock:
+            for camera_id in list(self._tracks):
+                active = []
+                for track in self._tracks[camera_id]:
+                    if now - track["last_seen"] <= self.timeout:
+                        active.append(track)
+                        continue
+                    if track["committed"] is not None:
+                        continue
+                    leader, reason = self._commit_reason(track)
+                    if reason is None:
+                        self.counts["discarded_on_expiry"] += 1
+                        print(f"🗑️ [TRACK {track['id']}] Tamat tanpa undian cukup - dibuang "
+                              f"({track['frames']} frame, undi {self._summary(track)['votes']})")
+                        continue
+                    track["committed"] = leader
+                    self.counts["committed_on_expiry"] += 1
+                    self.counts["misreads_outvoted"] += sum(
+                        v["count"] for p, v in track["votes"].items() if p != leader)
+                    evidence = dict(track["evidence"][leader], first_seen=track["first_seen"],
+                                    reason="committed_on_expiry")
+                    flushed.append((self._summary(track), evidence))
+                if active:
+                    self._tracks[camera_id] = active
+                else:
+                    del self._tracks[camera_id]
+        return flushed
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, active_tracks=sum(len(t) for t in self._tracks.values()),
+                        cameras=len(self._tracks))
+
+plate_tracker = PlateVoteTracker(PLATE_TRACK_IOU, PLATE_TRACK_TIMEOUT, PLATE_VOTE_MIN_VOTES,
+                                 PLATE_VOTE_MIN_SHARE, PLATE_VOTE_COMMIT_CONFIDENCE)
+
+def plate_tracker_loop():
+    """Flush track yang tamat tanpa commit (kenderaan sudah lalu, tiada frame baru)"""
+    while True:
+        time.sleep(max(0.1, PLATE_TRACK_TIMEOUT / 4))
+        try:
+            for summary, evidence in plate_tracker.expire():
+                print(f"🗳️ [TRACK {summary['track_id']}] Tamat - commit {evidence['plate']} "
+                      f"({summary['frames']} frame, undi {summary['votes']})")
+                commit_plate(evidence["plate"], evidence["method"], evidence["first_seen"],
+                             jpeg_bytes=evidence["jpeg_bytes"], img_bgr=evidence["img_bgr"],
+                             vote=dict(summary, reason=evidence["reason"]))
+        except Exception as e:
+            print(f"❌ [TRACK] Flush error: {e}")
+            traceback.print_exc()
+
+if PLATE_VOTING_ENABLED and not IS_OCR_WORKER:
+    threading.Thread(target=plate_tracker_loop, name="plate-tracker", daemon=True).start()
+
+# ==== Early-exit Lock (tiada inferens selagi kenderaan yang sudah di-commit masih di situ) ====
+class EarlyExitLock:
+    """
+    Selepas plat di-commit dengan yakin, kamera dikunci dengan frame grayscale
+    (PREFILTER_SIZE) ketika commit sebagai rujukan. Frame seterusnya dari kamera itu
+    hanya dibandingkan dengan rujukan (tiada YOLO/OCR); lock dilepaskan bila nisbah
+    piksel berubah > EARLY_EXIT_SCENE_THRESHOLD (kotak beredar / gerakan baru) atau
+    selepas EARLY_EXIT_MAX_LOCK saat (inferens semula untuk sahkan).
+    """
+
+    def __init__(self, scene_threshold, max_lock_seconds):
+        self.scene_threshold = scene_threshold
+        self.max_lock_seconds = max_lock_seconds
+        self._lock = threading.Lock()
+        self._cameras = {}  # camera_id -> {"plate", "reference", "locked_at", "frames_skipped"}
+        self.counts = {"locks": 0, "frames_skipped": 0, "released_scene_change": 0, "released_timeout": 0}
+
+    def engage(self, camera_id, plate, gray):
+        with self._lock:
+            current = self._cameras.get(camera_id)
+            if current is None or current["plate"] != plate:
+                self.counts["locks"] += 1
+            self._cameras[camera_id] = {
+                "plate": plate,
+                "reference": gray.astype(np.float32),
+                "locked_at": time.time(),
+                "frames_skipped": 0
+            }
+
+    def check(self, camera_id, gray):
+        """
+        Pulangkan (keadaan, plat, perubahan). keadaan: "locked" (skip inferens),
+        "scene_change" / "timeout" (lock baru dilepaskan - proses frame ini) atau None (tiada lock).
+        """
+        with self._lock:
+            entry = self._cameras.get(camera_id)
+            if entry is None:
+                return None, None, None
+            change = 1.0
+            if entry["reference"].shape == gray.shape:
+                diff = cv2.absdiff(gray.astype(np.float32), entry["reference"])
+                change = float((diff > PREFILTER_PIXEL_DELTA).mean())
+            if change > self.scene_threshold:
+                del self._cameras[camera_id]
+                self.counts["released_scene_change"] += 1
+                return "scene_change", entry["plate"], change
+            if time.time() - entry["locked_at"] > self.max_lock_seconds:
+                del self._cameras[camera_id]
+                self.counts["released_timeout"] += 1
+                return "timeout", entry["plate"], change
+            entry["frames_skipped"] += 1
+            self.counts["frames_skipped"] += 1
+            return "locked", entry["plate"], change
+
+    def clear(self):
+        with self._lock:
+            cleared = len(self._cameras)
+            self._cameras = {}
+            return cleared
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            return dict(self.counts, enabled=EARLY_EXIT_ENABLED, cameras={
+                camera_id: {
+                    "plate": entry["plate"],
+                    "locked_seconds": round(now - entry["locked_at"], 1),
+                    "frames_skipped": entry["frames_skipped"]
+                }
+                for camera_id, entry in self._cameras.items()
+            })
+
+early_exit = EarlyExitLock(EARLY_EXIT_SCENE_THRESHOLD, EARLY_EXIT_MAX_LOCK)
+
+def engage_early_exit(camera_id, plate, jpeg_bytes=None, img_bgr=None):
+    """Kunci kamera pada frame commit (bait upload diutamakan - tanpa kotak debug)"""
+    if not EARLY_EXIT_ENABLED:
+        return
+    gray = prefilter_gray(jpeg_bytes=jpeg_bytes, img_bgr=img_bgr)
+    if gray is not None:
+        early_exit.engage(camera_id, plate, gray)
+
 # ==== UPDATED: Main detection function with Hybrid approach ====
-def detect_and_ocr(img_bgr):
-    global last_result, snapshots, recently_processed
+def detect_and_ocr(img_bgr, jpeg_bytes=None, frame=None, camera_id="unknown", motion=None):
+    """
+    jpeg_bytes: bait asal upload (jika ada) untuk disimpan terus tanpa encode semula
+    frame: UploadFrame bila img_bgr ialah decode resolusi rendah untuk detector
+    camera_id / motion: untuk fallback_policy (motion dari pre-filter, None jika tiada)
+    """
+    global last_result
     
-    # Gunakan OCR hybrid (YOLO + Fallback)
-    plate, method = ocr_hybrid(img_bgr)
+    # Gunakan OCR hybrid (YOLO + Fallback) - dalam worker process jika OCR_WORKER_COUNT > 0
+    fallback_allowed, _ = fallback_policy.allow(camera_id, motion)
+    started = time.perf_counter()
+    plate, method, read = run_ocr(img_bgr, frame, fallback_allowed)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    if method == "EasyOCR (Fallback)":
+        fallback_policy.record(camera_id, True)
+        frame_latency.record("fallback_ocr", elapsed_ms)
+    elif method == "YOLO+EasyOCR":
+        frame_latency.record("yolo_ocr", elapsed_ms)
+    else:
+        if method == "YOLO (Fallback skipped)":
+            fallback_policy.record(camera_id, False)
+        frame_latency.record("yolo_no_plate", elapsed_ms)
     now = datetime.datetime.now()
     now_str = now.strftime("%Y-%m-%d %H:%M:%S")
 
@@ -574,72 +2085,97 @@ def detect_and_ocr(img_bgr):
         last_result = {"plate": "-", "time": now_str, "method": method, "status": "No plate detected"}
         return last_result
 
-    current_time = datetime.datetime.now()
-    
     # Debug plate spacing
     debug_plate_spacing(plate)
     
-    # PERUBAHAN: REJECT DUPLICATE DALAM 30 SAAT
-    # 1. Clean old entries from recently_processed (> 30 seconds)
-    expired_plates = []
-    for plate_key, data in recently_processed.items():
-        processed_time = data.get("timestamp", current_time)
-        if (current_time - processed_time).total_seconds() > DUPLICATE_REJECT_WINDOW:
-            expired_plates.append(plate_key)
-            print(f"🧹 Cache expired untuk plat {plate_key} (lebih dari {DUPLICATE_REJECT_WINDOW}s)")
+    # Undian beberapa frame: hanya bacaan YOLO (ada kotak); fallback OCR terus di-commit
+    if PLATE_VOTING_ENABLED and read is not None and read["box"] is not None:
+        action, summary, evidence = plate_tracker.observe(camera_id, plate, read, method, jpeg_bytes, img_bgr)
+        if action == "pending":
+            last_result = {"plate": plate, "time": now_str, "method": method,
+                           "status": "Tracking - menunggu undian frame seterusnya", "track": summary}
+            return last_result
+        if action == "tracked":
+            # Kenderaan sama masih di situ selepas lock tamat - kunci semula (hanya bila
+            # bacaan ini sendiri ialah plat yang di-commit)
+            if plate == summary["committed"]:
+                engage_early_exit(camera_id, summary["committed"], jpeg_bytes, img_bgr)
+            last_result = {"plate": summary["committed"], "time": now_str, "method": method,
+                           "status": "Tracked - kenderaan sudah di-commit", "read": plate, "track": summary}
+            return last_result
+        print(f"🗳️ [TRACK {summary['track_id']}] Commit {evidence['plate']} ({evidence['reason']}, undi {summary['votes']})")
+        result = commit_plate(evidence["plate"], evidence["method"], evidence["first_seen"],
+                              jpeg_bytes=evidence["jpeg_bytes"], img_bgr=evidence["img_bgr"],
+                              vote=dict(summary, reason=evidence["reason"]))
+        if evidence["confidence"] >= EARLY_EXIT_MIN_CONFIDENCE:
+            engage_early_exit(camera_id, evidence["plate"], jpeg_bytes, img_bgr)
+        return result
     
-    for expired_plate in expired_plates:
-        if expired_plate in recently_processed:
-            del recently_processed[expired_plate]
+    result = commit_plate(plate, method, now, jpeg_bytes=jpeg_bytes, img_bgr=img_bgr)
+    # Termasuk bacaan yang ditolak duplicate: kenderaan masih di depan kamera
+    if read is not None and read["confidence"] >= EARLY_EXIT_MIN_CONFIDENCE:
+        engage_early_exit(camera_id, plate, jpeg_bytes, img_bgr)
+    return result
+
+def commit_plate(plate, method, seen_at, jpeg_bytes=None, img_bgr=None, vote=None):
+    """
+    Satu plat muktamad untuk satu kenderaan: duplicate protection, carian registry,
+    simpan gambar (registered sahaja) dan attendance.
+    seen_at: datetime bacaan (untuk track: frame pertama kenderaan)
+    vote: ringkasan track plate_tracker (None jika tanpa undian)
+    """
+    global last_result
+    now_str = seen_at.strftime("%Y-%m-%d %H:%M:%S")
     
-    # 2. Check if this plate was recently processed (within 30 seconds)
-    if plate in recently_processed:
-        elapsed = (current_time - recently_processed[plate]["timestamp"]).total_seconds()
-        
-        if elapsed < DUPLICATE_REJECT_WINDOW:
-            # DUPLICATE DETECTED WITHIN 30 SECONDS - REJECT!
-            reject_count = recently_processed[plate].get("rejected_count", 0) + 1
-            recently_processed[plate]["rejected_count"] = reject_count
-            
-            print(f"❌ GAMBAR DITOLAK: Plat {plate} sudah diproses {elapsed:.1f} saat lepas")
-            print(f"   📊 Reject count untuk plat ini: {reject_count}")
-            print(f"   ⏰ Tunggu {DUPLICATE_REJECT_WINDOW - elapsed:.1f} saat untuk plat sama")
-            
-            last_result = {
-                "plate": plate, 
-                "time": now_str, 
-                "method": method, 
-                "status": f"REJECTED - Plat sama dalam {DUPLICATE_REJECT_WINDOW}s",
-                "image_saved": False,
-                "registered": False,
-                "reject_reason": f"Duplicate plate detected ({elapsed:.1f}s ago)",
-                "reject_count": reject_count,
-                "wait_seconds": DUPLICATE_REJECT_WINDOW - elapsed
-            }
-            
-            snapshots.insert(0, {"time": now_str, "plate": f"REJECTED_{plate}", "img": img_bgr.copy()})
-            snapshots = snapshots[:5]
-            
-            # GAMBAR DIBUANG/DELETE - tidak disimpan ke folder
-            print(f"🗑️ Gambar untuk plat {plate} DIBUANG (tidak disimpan)")
-            return last_result
+    # PERUBAHAN: REJECT DUPLICATE DALAM 30 SAAT
+    # Semak + tanda secara atomik (duplicate_guard: lock, entry luput dibuang ikut queue masa)
+    accepted, protection, elapsed = duplicate_guard.check_and_mark(plate)
     
-    # 3. Plat belum diproses dalam 30 saat terakhir - PROCESS NORMAL
-    # Update recently_processed
-    recently_processed[plate] = {
-        "timestamp": current_time,
-        "processed_count": recently_processed.get(plate, {}).get("processed_count", 0) + 1,
-        "rejected_count": 0,
-        "last_processed": now_str
-    }
+    if not accepted:
+        # DUPLICATE DETECTED WITHIN 30 SECONDS - REJECT!
+        reject_count = protection["rejected_count"]
+        
+        print(f"❌ GAMBAR DITOLAK: Plat {plate} sudah diproses {elapsed:.1f} saat lepas")
+        print(f"   📊 Reject count untuk plat ini: {reject_count}")
+        print(f"   ⏰ Tunggu {DUPLICATE_REJECT_WINDOW - elapsed:.1f} saat untuk plat sama")
+        
+        last_result = {
+            "plate": plate, 
+            "time": now_str, 
+            "method": method, 
+            "status": f"REJECTED - Plat sama dalam {DUPLICATE_REJECT_WINDOW}s",
+            "image_saved": False,
+            "registered": False,
+            "reject_reason": f"Duplicate plate detected ({elapsed:.1f}s ago)",
+            "reject_count": reject_count,
+            "wait_seconds": DUPLICATE_REJECT_WINDOW - elapsed
+        }
+        if vote is not None:
+            last_result["vote"] = vote
+        
+        snapshots.add(now_str, f"REJECTED_{plate}", jpeg_bytes=jpeg_bytes, img_bgr=img_bgr)
+        
+        # GAMBAR DIBUANG/DELETE - tidak disimpan ke folder
+        print(f"🗑️ Gambar untuk plat {plate} DIBUANG (tidak disimpan)")
+        return last_result
+    
+    # Plat belum diproses dalam 30 saat terakhir - PROCESS NORMAL
 
-    # ==== CHECK IF PLATE IS REGISTERED ====
-    user_data = get_user_info_from_plate(plate)
+    # ==== CHECK IF PLATE IS REGISTERED (sekali sahaja untuk bacaan ini) ====
+    with resolution_stats_lock:
+        resolution_stats["accepted_reads"] += 1
+    context = resolve_plate(plate)
+    user_data = context["user_data"]
     
     # ==== SAVE IMAGE ONLY IF REGISTERED ====
     image_path = None
+    image_persist_status = "skipped"
     if user_data:
-        image_path = save_registered_plate_image(img_bgr.copy(), plate, now_str, user_data)
+        # Bait JPEG asal disimpan terus (tanpa kotak debug); salin array hanya jika perlu encode
+        image_path, image_persist_status = save_registered_plate_image(
+            img_bgr if is_jpeg_bytes(jpeg_bytes) else img_bgr.copy(), plate, now_str, user_data,
+            jpeg_bytes=jpeg_bytes
+        )
     
     # ==== Update last_result ====
     last_result = {
@@ -649,59 +2185,536 @@ def detect_and_ocr(img_bgr):
         "status": "Processing",
         "registered": user_data is not None,
         "image_saved": True if image_path else False,
+        "image_persist": image_persist_status,  # queued / dropped (queue penuh) / skipped
         "image_path": image_path if image_path else None,
         "filename": os.path.basename(image_path) if image_path else None,
         "folder_structure": f"{SAVE_DIR}/{now_str[:10]}/{''.join(c for c in plate if c.isalnum())}/" if image_path else None,
         "duplicate_protection": {  # Info protection
             "window_seconds": DUPLICATE_REJECT_WINDOW,
-            "processed_count": recently_processed[plate].get("processed_count", 1),
-            "rejected_count": recently_processed[plate].get("rejected_count", 0),
+            "processed_count": protection["processed_count"],
+            "rejected_count": protection["rejected_count"],
             "protection_active": True
         }
     }
+    if vote is not None:
+        last_result["vote"] = vote
     
-    snapshots.insert(0, {"time": now_str, "plate": plate, "img": img_bgr.copy()})
-    snapshots = snapshots[:5]
+    snapshots.add(now_str, plate, jpeg_bytes=jpeg_bytes, img_bgr=img_bgr)
 
-    # Call save_attendance function
-    save_attendance("plate", plate, now_str)
+    # Call save_attendance function - guna context yang sama (tiada carian kedua)
+    last_result["attendance"] = save_attendance("plate", plate, now_str, context=context)
     
     print(f"[{now_str}] Plate {plate} processed - Registered: {user_data is not None}")
     print(f"🛡️ Duplicate protection: Plat ini dilindungi untuk {DUPLICATE_REJECT_WINDOW}s")
     return last_result
 
+# ==== Firebase Write-Behind Queue (SQLite WAL) ====
+def merge_write_ops(ops):
+    """
+    Gabung operasi berturutan pada path yang sama menjadi satu.
+    ops: [("set"|"update", data), ...] ikut susunan. Pulangkan (op, data).
+    """
+    merged_op, merged_data = ops[0]
+    for op, data in ops[1:]:
+        if op == "set":
+            merged_op, merged_data = "set", data
+        elif merged_op == "set" and isinstance(merged_data, dict):
+            merged_data = {**merged_data, **data}
+        elif merged_op == "set":
+            merged_op, merged_data = "update", data
+        else:
+            merged_data = {**merged_data, **data}
+    return merged_op, merged_data
+
+def apply_write_ops(value, ops):
+    """Apply operasi tertunda atas nilai semasa (untuk baca data yang belum dihantar)"""
+    for op, data in ops:
+        if op == "set":
+            value = copy.deepcopy(data)
+        else:
+            value = {**(value if isinstance(value, dict) else {}), **copy.deepcopy(data)}
+    return value
+
+class FirebaseWriteBehindQueue:
+    """
+    Tulisan Firebase disimpan dahulu dalam log SQLite (WAL) dan request terus
+    dipulangkan. Thread background hantar ke Firebase, gabung operasi ikut path,
+    dan cuba semula dengan backoff bila Firebase tidak dapat dihubungi.
+
+    Path yang gagal tidak menyekat path lain dalam batch. Kegagalan hanya dikira
+    dalam kolum attempts bila path lain berjaya dalam pusingan sama (Firebase boleh
+    dihubungi - operasi itu sendiri bermasalah); selepas WRITE_BEHIND_MAX_ATTEMPTS
+    operasi dipindah ke jadual dead_letter untuk disemak secara manual.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " op TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letter ("
+            " id INTEGER PRIMARY KEY,"
+            " op TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " attempts INTEGER NOT NULL,"
+            " error TEXT,"
+            " failed_at REAL NOT NULL)"
+        )
+        self.sent = 0
+        self.dead_lettered = 0
+        self.merged = 0
+        self.retries = 0
+        self.last_error = None
+        self.last_sent = None
+
+    def enqueue(self, op, path, data):
+        """Simpan satu operasi ("set"/"update") secara durable, kemudian kejutkan worker"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox (op, path, payload, created) VALUES (?, ?, ?, ?)",
+                (op, path, json.dumps(data), time.time())
+            )
+        self._wake.set()
+
+    def pending_ops(self, path):
+        """Operasi yang belum dihantar untuk path, ikut susunan"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT op, payload FROM outbox WHERE path = ? ORDER BY id", (path,)
+            ).fetchall()
+        return [(op, json.loads(payload)) for op, payload in rows]
+
+    def pending_ops_under(self, prefix):
+        """Operasi tertunda untuk semua path di bawah prefix: {path: [(op, data), ...]}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, op, payload FROM outbox WHERE substr(path, 1, ?) = ? ORDER BY id",
+                (len(prefix), prefix)
+            ).fetchall()
+        pending = {}
+        for path, op, payload in rows:
+            pending.setdefault(path, []).append((op, json.loads(payload)))
+        return pending
+
+    def depth(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def start(self):
+        threading.Thread(target=self._run, name="firebase-write-behind", daemon=True).start()
+        pending = self.depth()
+        if pending:
+            print(f"📮 [WRITE-BEHIND] {pending} operasi tertunda dari sesi lepas akan dihantar")
+            self._wake.set()
+
+    def _run(self):
+        backoff = 1
+        while True:
+            self._wake.wait(timeout=WRITE_BEHIND_POLL_INTERVAL)
+            self._wake.clear()
+            try:
+                while self._flush_batch():
+                    pass
+                backoff = 1
+            except Exception as e:
+                self.last_error = str(e)
+                self.retries += 1
+                print(f"❌ [WRITE-BEHIND] Gagal hantar ke Firebase: {e} - cuba semula dalam {backoff}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, WRITE_BEHIND_MAX_BACKOFF)
+                self._wake.set()
+
+    def _flush_batch(self):
+        """Hantar satu batch (digabung ikut path). Pulangkan True jika ada lagi untuk dihantar."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, op, path, payload FROM outbox ORDER BY id LIMIT ?", (WRITE_BEHIND_BATCH,)
+            ).fetchall()
+        if not rows:
+            return False
+
+        groups = {}  # {path: {"ids": [...], "ops": [...]}} - dict kekalkan susunan path pertama
+        for row_id, op, path, payload in rows:
+            group = groups.setdefault(path, {"ids": [], "ops": []})
+            group["ids"].append(row_id)
+            group["ops"].append((op, json.loads(payload)))
+
+        failed = []  # [(path, group, exception)]
+        succeeded = False
+        for path, group in groups.items():
+            op, data = merge_write_ops(group["ops"])
+            try:
+                if op == "set":
+                    db.reference(path).set(data)
+                else:
+                    db.reference(path).update(data)
+            except Exception as e:
+                failed.append((path, group, e))
+                if not succeeded and len(failed) >= 2:
+                    break  # Dua kegagalan tanpa satu pun berjaya - Firebase tidak dapat dihubungi
+                continue
+
+            with self._lock:
+                self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in group["ids"]])
+            succeeded = True
+            self.sent += 1
+            self.merged += len(group["ids"]) - 1
+            self.last_sent = time.time()
+
+        if failed and not succeeded:
+            raise failed[0][2]
+        for path, group, error in failed:
+            self.last_error = f"{path}: {error}"
+            print(f"⚠️ [WRITE-BEHIND] Gagal hantar {path} (path lain berjaya): {error}")
+            self._record_failure(path, group["ids"], error)
+
+        return len(rows) == WRITE_BEHIND_BATCH
+
+    def _record_failure(self, path, ids, error):
+        """Tambah attempts; pindah ke dead_letter bila sudah WRITE_BEHIND_MAX_ATTEMPTS"""
+        params = [(row_id,) for row_id in ids]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("UPDATE outbox SET attempts = attempts + 1 WHERE id = ?", params)
+                moved = self._conn.execute(
+                    f"INSERT INTO dead_letter (id, op, path, payload, created, attempts, error, failed_at)"
+                    f" SELECT id, op, path, payload, created, attempts, ?, ? FROM outbox"
+                    f" WHERE id IN ({','.join('?' * len(ids))}) AND attempts >= ?",
+                    (str(error), time.time(), *ids, WRITE_BEHIND_MAX_ATTEMPTS)
+                ).rowcount
+                if moved:
+                    self._conn.execute(
+                        f"DELETE FROM outbox WHERE id IN ({','.join('?' * len(ids))}) AND attempts >= ?",
+                        (*ids, WRITE_BEHIND_MAX_ATTEMPTS)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if moved:
+            self.dead_lettered += moved
+            print(f"🪦 [WRITE-BEHIND] {moved} operasi untuk {path} dipindah ke dead_letter "
+                  f"selepas {WRITE_BEHIND_MAX_ATTEMPTS} cubaan")
+
+    def stats(self):
+        with self._lock:
+            depth, oldest = self._conn.execute("SELECT COUNT(*), MIN(created) FROM outbox").fetchone()
+            max_attempts = self._conn.execute("SELECT MAX(attempts) FROM outbox").fetchone()[0]
+            dead_letter = self._conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+        return {
+            "queue_depth": depth,
+            "max_attempts_pending": max_attempts or 0,
+            "dead_letter": dead_letter,
+            "dead_lettered": self.dead_lettered,
+            "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest else None,
+            "sent": self.sent,
+            "merged": self.merged,
+            "retries": self.retries,
+            "last_sent": datetime.datetime.fromtimestamp(self.last_sent).strftime("%Y-%m-%d %H:%M:%S") if self.last_sent else None,
+            "last_error": self.last_error,
+            "log_file": os.path.abspath(self.db_path)
+        }
+
+write_queue = FirebaseWriteBehindQueue(WRITE_BEHIND_DB)
+if not IS_OCR_WORKER:
+    write_queue.start()
+
+# ==== Attendance State Cache (hari ini, dalam memori) ====
+class AttendanceNotLoaded(RuntimeError):
+    """Attendance hari itu belum dimuat dan user tiada rekod tempatan - event tidak boleh diputuskan"""
+
+class AttendanceStateCache:
+    """
+    Rekod attendance hari ini dalam memori: dimuat semasa startup dan bila hari
+    bertukar, kemudian dikemaskini pada setiap tulisan. Keputusan check-in /
+    check-out tidak perlu lagi GET attendance/{today}/{user_id} dari Firebase.
+
+    GET Firebase dibuat di luar lock; event lain yang perlukan hari sama menunggu
+    muat itu selesai (sehingga ATTENDANCE_LOAD_WAIT). Jika gagal, rekod yang sudah
+    ada dikekalkan dan cubaan semula dibuat dengan backoff; user tanpa rekod tempatan
+    tidak boleh diputuskan (get() raise AttendanceNotLoaded) supaya check-in baru
+    tidak menimpa rekod yang mungkin sudah ada di Firebase - event itu ditangguhkan
+    dalam deferred_attendance.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._user_locks = {}
+        self.date = None
+        self.records = {}  # {user_id: rekod attendance}
+        self.loaded = False  # False = muat dari Firebase gagal, cuba lagi selepas backoff
+        self.loads = 0
+        self.failed_loads = 0
+        self.last_load = None
+        self.last_error = None
+        self._loading = False
+        self._load_done = threading.Condition(self._lock)
+        self._retry_at = 0.0
+        self._backoff = ATTENDANCE_RELOAD_BACKOFF
+
+    def user_lock(self, user_id):
+        """Lock untuk satu user supaya dua event serentak tidak sama-sama buat check-in"""
+        with self._lock:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+
+    def ensure_day(self, date):
+        """
+        Muat attendance/{date} + tulisan yang masih dalam write-behind queue bila hari
+        bertukar (atau jika muat sebelum ini gagal dan backoff sudah tamat).
+        """
+        with self._lock:
+            # Muat sedang berjalan dalam thread lain - tunggu keputusannya
+            deadline = time.time() + ATTENDANCE_LOAD_WAIT
+            while self._loading and time.time() < deadline:
+                self._load_done.wait(timeout=deadline - time.time())
+            if self.date == date and self.loaded:
+                return
+            if self._loading or (self.date == date and time.time() < self._retry_at):
+                return
+            self._loading = True
+
+        try:
+            # Operasi tertunda diambil DAHULU: jika ia dihantar semasa GET, Firebase sudah
+            # ada nilai itu dan apply sekali lagi tidak mengubah apa-apa
+            pending = write_queue.pending_ops_under(f"attendance/{date}/")
+            remote = db.reference(f"attendance/{date}").get()
+            error = None
+        except Exception as e:
+            pending, remote, error = {}, None, e
+
+        with self._lock:
+            try:
+                self._apply_load(date, pending, remote, error)
+            finally:
+                self._loading = False
+                self._load_done.notify_all()
+
+    def _apply_load(self, date, pending, remote, error):
+        # Panggil dengan self._lock
+        local = self.records if self.date == date else {}
+        if error is None:
+            records = dict(remote) if isinstance(remote, dict) else {}
+            for path, ops in pending.items():
+                user_id = path.rsplit("/", 1)[-1]
+                records[user_id] = apply_write_ops(records.get(user_id), ops)
+            # Event tempatan semasa GET (belum dalam snapshot di atas) dikekalkan
+            for user_id, record in local.items():
+                records.setdefault(user_id, record)
+            self.records = records
+            self.loaded = True
+            self.last_error = None
+            self.loads += 1
+            self.last_load = time.time()
+            self._backoff = ATTENDANCE_RELOAD_BACKOFF
+            print(f"📅 [ATTENDANCE] State {date} dimuat: {len(records)} rekod")
+        else:
+            # Kekalkan rekod yang sudah dimuat / ditulis hari ini - jangan ganti dengan {}
+            records = dict(local)
+            if self.date != date:
+                for path, ops in pending.items():
+                    user_id = path.rsplit("/", 1)[-1]
+                    records[user_id] = apply_write_ops(records.get(user_id), ops)
+            self.records = records
+            self.loaded = False
+            self.last_error = str(error)
+            self.failed_loads += 1
+            self._retry_at = time.time() + self._backoff
+            print(f"⚠️ [ATTENDANCE] Gagal muat attendance/{date}: {error} - "
+                  f"{len(records)} rekod tempatan dikekalkan, cuba lagi dalam {self._backoff}s")
+            self._backoff = min(self._backoff * 2, WRITE_BEHIND_MAX_BACKOFF)
+        self.date = date
+
+    def get(self, date, user_id):
+        """
+        Rekod user hari ini. Raise AttendanceNotLoaded jika state hari ini belum dimuat
+        dan user tiada rekod tempatan - tidak pasti sama ada dia sudah check-in.
+        """
+        self.ensure_day(date)
+        with self._lock:
+            record = self.records.get(user_id) if self.date == date else None
+            if record:
+                return copy.deepcopy(record)
+            if self.date != date or not self.loaded:
+                raise AttendanceNotLoaded(f"attendance/{date} belum dimuat dari Firebase ({self.last_error}) - "
+                                          f"tidak pasti sama ada {user_id} sudah check-in")
+            return None
+
+    def apply(self, date, user_id, op, data):
+        """Kemaskini state tempatan selepas operasi dihantar ke write-behind queue"""
+        with self._lock:
+            if self.date == date:
+                self.records[user_id] = apply_write_ops(self.records.get(user_id), [(op, data)])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "date": self.date,
+                "records": len(self.records),
+                "loaded_from_firebase": self.loaded,
+                "loads": self.loads,
+                "failed_loads": self.failed_loads,
+                "retry_in_seconds": round(max(0.0, self._retry_at - time.time()), 1) if not self.loaded else 0.0,
+                "last_load": datetime.datetime.fromtimestamp(self.last_load).strftime("%Y-%m-%d %H:%M:%S") if self.last_load else None,
+                "last_error": self.last_error
+            }
+
+attendance_state = AttendanceStateCache()  # Dimuat dalam peringkat startup "firebase"
+
+class DeferredAttendanceQueue:
+    """
+    Event attendance yang belum boleh diputuskan (AttendanceNotLoaded) disimpan dalam
+    log SQLite yang sama dengan write_queue dan dimainkan semula ikut susunan bila
+    attendance hari itu berjaya dimuat - scan tidak hilang semasa Firebase terputus.
+    Selagi ada event tertangguh untuk satu hari, event baru hari itu turut
+    ditangguhkan supaya check-in / check-out kekal ikut susunan masa.
+    """
+
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS deferred_attendance ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " mode TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " timestamp TEXT NOT NULL,"
+            " created REAL NOT NULL)"
+        )
+        self.deferred = 0
+        self.replayed = 0
+        self.failed = 0
+        self.last_error = None
+
+    def defer(self, mode, key, timestamp):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO deferred_attendance (mode, key, timestamp, created) VALUES (?, ?, ?, ?)",
+                (mode, key, timestamp, time.time())
+            )
+            self.deferred += 1
+        self._wake.set()
+
+    def pending(self, date):
+        """Bilangan event tertangguh untuk tarikh itu (YYYY-MM-DD)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM deferred_attendance WHERE substr(timestamp, 1, 10) = ?", (date,)
+            ).fetchone()[0]
+
+    def start(self):
+        threading.Thread(target=self._run, name="attendance-replay", daemon=True).start()
+        with self._lock:
+            pending = self._conn.execute("SELECT COUNT(*) FROM deferred_attendance").fetchone()[0]
+        if pending:
+            print(f"📮 [ATTENDANCE] {pending} event tertangguh dari sesi lepas akan diputuskan")
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=ATTENDANCE_RELOAD_BACKOFF)
+            self._wake.clear()
+            if not startup.finished("firebase"):
+                continue  # Registry belum dimuat - plat/RFID belum boleh dicari
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, mode, key, timestamp FROM deferred_attendance ORDER BY timestamp, id"
+                ).fetchall()
+            for row_id, mode, key, timestamp in rows:
+                status = save_attendance(mode, key, timestamp, replay=True)
+                if status == "deferred":
+                    break  # Hari itu masih belum dimuat - cuba lagi selepas backoff
+                if status == "error":
+                    self.failed += 1
+                    self.last_error = f"{mode} {key} @ {timestamp}"
+                else:
+                    self.replayed += 1
+                with self._lock:
+                    self._conn.execute("DELETE FROM deferred_attendance WHERE id = ?", (row_id,))
+
+    def stats(self):
+        with self._lock:
+            depth, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(created) FROM deferred_attendance"
+            ).fetchone()
+        return {
+            "pending": depth,
+            "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest else None,
+            "deferred": self.deferred,
+            "replayed": self.replayed,
+            "failed": self.failed,
+            "last_error": self.last_error
+        }
+
+deferred_attendance = DeferredAttendanceQueue(WRITE_BEHIND_DB)
+if not IS_OCR_WORKER:
+    deferred_attendance.start()
+
 # ==== Modified save_attendance - with improved user lookup ====
-def save_attendance(mode, key, timestamp):
+def save_attendance(mode, key, timestamp, context=None, replay=False):
+    """
+    Simpan attendance. Context dari resolve_plate() / resolve_rfid() boleh
+    dihantar supaya registry tidak dicari sekali lagi.
+    Pulangkan "saved", "unregistered", "deferred" (attendance hari ini belum dimuat -
+    event disimpan dalam deferred_attendance dan diputuskan kemudian) atau "error".
+    replay: dipanggil oleh deferred_attendance (event sudah dalam log, jangan tangguh lagi).
+    """
     today = timestamp.split(" ")[0]
     time_now = timestamp.split(" ")[1]
     time_dt = datetime.datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
 
+    # Event lebih awal hari ini masih tertangguh - ikut giliran supaya susunan masa kekal
+    if not replay and deferred_attendance.pending(today):
+        deferred_attendance.defer(mode, key, timestamp)
+        print(f"📮 {mode.upper()} {key}: event lebih awal masih tertangguh - event ini ditangguhkan juga")
+        return "deferred"
+
     try:
         # Get user data based on mode
         if mode == "plate":
-            user_data = get_user_info_from_plate(key)
+            if context is None:
+                context = resolve_plate(key)
+            user_data = context["user_data"]
             identifier = key
         else:  # rfid mode
-            user_data = get_user_info_from_rfid(key)
+            if context is None:
+                context = resolve_rfid(key)
+            user_data = context["user_data"]
             identifier = key
 
         if not user_data:
             print(f"❌ {mode.upper()} {key} tidak didaftarkan. Tiada data disimpan.")
-            return
+            return "unregistered"
 
-        # Untuk RFID, GUNA USER ID YANG SUDAH DITEMUI
+        # Untuk RFID, GUNA USER ID YANG SUDAH DITEMUI (dari context, tiada bacaan mapping kedua)
         if mode == "rfid":
-            mapping_ref = db.reference(f"rfid_to_user/{key}")
-            user_id = mapping_ref.get()
+            user_id = context["user_id"]
             
             if not user_id:
                 print(f"❌ RFID {key}: User ID tidak ditemui dalam mapping")
-                return
+                return "unregistered"
                 
             print(f"✅ [RFID] Using User ID from mapping: {user_id}")
         else:
-            # Untuk plate, gunakan user_id dari data atau buat berdasarkan plat
-            user_id = user_data.get("user_id") or user_data.get("uid") or f"user_{identifier}"
+            # Untuk plate, user_id sudah ditentukan dalam resolution context
+            user_id = context["user_id"]
             print(f"✅ [PLATE] User ID: {user_id}")
 
         name = user_data.get("name", "-")
@@ -718,92 +2731,103 @@ def save_attendance(mode, key, timestamp):
         shift_name, punctuality = determine_shift_and_punctuality(time_dt)
 
         # Check existing attendance - GUNA USER_ID YANG KONSISTEN
-        att_ref = db.reference(f"attendance/{today}/{user_id}")
-        att_data = att_ref.get()
-
-        print(f"🔍 Checking attendance at: attendance/{today}/{user_id}")
-        print(f"🔍 Existing attendance data: {att_data}")
-
-        if not att_data:
-            # First check-in
-            attendance_record = {
-                "user_uid": user_id,
-                "name": name,
-                "jabatan": jabatan,
-                "plate": plate,
-                "checkin_plate": plate if mode == "plate" else "-",
-                "checkin_method": mode,
-                "shift": shift_name,
-                "punctuality": punctuality,
-                "checkin": time_now,
-                "checkout": None,
-                "date": today,
-                "status": "Checked In",
-                "workedHours": "0 hour 0 min",
-                "timestamp": timestamp
-            }
-            att_ref.set(attendance_record)
-            print(f"✅ CHECK-IN: {name} at {time_now} | Plate: {plate} | Method: {mode.upper()}")
-            
-        else:
-            # CHECK-OUT PROCESS - Sentiasa update checkout time
-            checkin_time_str = att_data.get('checkin', '00:00:00')
+        # State hari ini dalam memori (tiada GET Firebase); lock per user untuk
+        # elak dua event serentak sama-sama dikira check-in
+        att_path = f"attendance/{today}/{user_id}"
+        with attendance_state.user_lock(user_id):
             try:
-                checkin_time = datetime.datetime.strptime(
-                    f"{today} {checkin_time_str}", "%Y-%m-%d %H:%M:%S"
-                )
-            except ValueError:
-                checkin_time = time_dt - datetime.timedelta(hours=1)  # Fallback
+                att_data = attendance_state.get(today, user_id)
+            except AttendanceNotLoaded as e:
+                if not replay:
+                    deferred_attendance.defer(mode, key, timestamp)
+                print(f"📮 {mode.upper()} {key} ditangguhkan: {e}")
+                return "deferred"
+
+            print(f"🔍 Checking attendance at: attendance/{today}/{user_id}")
+            print(f"🔍 Existing attendance data: {att_data}")
+
+            if not att_data:
+                # First check-in
+                attendance_record = {
+                    "user_uid": user_id,
+                    "name": name,
+                    "jabatan": jabatan,
+                    "plate": plate,
+                    "checkin_plate": plate if mode == "plate" else "-",
+                    "checkin_method": mode,
+                    "shift": shift_name,
+                    "punctuality": punctuality,
+                    "checkin": time_now,
+                    "checkout": None,
+                    "date": today,
+                    "status": "Checked In",
+                    "workedHours": "0 hour 0 min",
+                    "timestamp": timestamp
+                }
+                write_queue.enqueue("set", att_path, attendance_record)
+                attendance_state.apply(today, user_id, "set", attendance_record)
+                print(f"✅ CHECK-IN: {name} at {time_now} | Plate: {plate} | Method: {mode.upper()}")
             
-            checkout_time = time_dt
+            else:
+                # CHECK-OUT PROCESS - Sentiasa update checkout time
+                checkin_time_str = att_data.get('checkin', '00:00:00')
+                try:
+                    checkin_time = datetime.datetime.strptime(
+                        f"{today} {checkin_time_str}", "%Y-%m-%d %H:%M:%S"
+                    )
+                except ValueError:
+                    checkin_time = time_dt - datetime.timedelta(hours=1)  # Fallback
             
-            # Handle overnight case
-            if checkout_time < checkin_time:
-                checkout_time += datetime.timedelta(days=1)
+                checkout_time = time_dt
             
-            # Calculate worked hours
-            delta = checkout_time - checkin_time
-            hours = delta.seconds // 3600
-            minutes = (delta.seconds % 3600) // 60
-            worked_hours_str = f"{hours} hour {minutes} min"
+                # Handle overnight case
+                if checkout_time < checkin_time:
+                    checkout_time += datetime.timedelta(days=1)
             
-            # Determine status based on shift requirements
-            min_hours = get_minimum_hours(time_dt.weekday())
-            total_hours = delta.total_seconds() / 3600
-            status = "Complete" if total_hours >= min_hours else "Incomplete"
+                # Calculate worked hours
+                delta = checkout_time - checkin_time
+                hours = delta.seconds // 3600
+                minutes = (delta.seconds % 3600) // 60
+                worked_hours_str = f"{hours} hour {minutes} min"
             
-            # Check if vehicle/method changed
-            checkin_plate = att_data.get('checkin_plate', 'Unknown')
-            checkin_method = att_data.get('checkin_method', 'unknown')
-            change_info = ""
+                # Determine status based on shift requirements
+                min_hours = get_minimum_hours(time_dt.weekday())
+                total_hours = delta.total_seconds() / 3600
+                status = "Complete" if total_hours >= min_hours else "Incomplete"
             
-            if mode == "plate" and checkin_plate != plate:
-                change_info = f" | Vehicle: {checkin_plate} → {plate}"
-            elif mode != checkin_method:
-                change_info = f" | Method: {checkin_method} → {mode}"
+                # Check if vehicle/method changed
+                checkin_plate = att_data.get('checkin_plate', 'Unknown')
+                checkin_method = att_data.get('checkin_method', 'unknown')
+                change_info = ""
             
-            # Untuk RFID, gunakan RFID ID sebagai checkout_plate
-            if mode == "rfid":
-                checkout_plate_value = identifier  # "E4F77C05"
-            else:
-                checkout_plate_value = plate       # "PBL666"
+                if mode == "plate" and checkin_plate != plate:
+                    change_info = f" | Vehicle: {checkin_plate} → {plate}"
+                elif mode != checkin_method:
+                    change_info = f" | Method: {checkin_method} → {mode}"
             
-            update_data = {
-                "checkout": time_now,
-                "checkout_method": mode,
-                "checkout_plate": checkout_plate_value,
-                "workedHours": worked_hours_str,
-                "status": status,
-                "punctuality": att_data.get("punctuality", punctuality),
-                "plate": plate,
-                "timestamp": timestamp
-            }
+                # Untuk RFID, gunakan RFID ID sebagai checkout_plate
+                if mode == "rfid":
+                    checkout_plate_value = identifier  # "E4F77C05"
+                else:
+                    checkout_plate_value = plate       # "PBL666"
+            
+                update_data = {
+                    "checkout": time_now,
+                    "checkout_method": mode,
+                    "checkout_plate": checkout_plate_value,
+                    "workedHours": worked_hours_str,
+                    "status": status,
+                    "punctuality": att_data.get("punctuality", punctuality),
+                    "plate": plate,
+                    "timestamp": timestamp
+                }
             
-            att_ref.update(update_data)
-            print(f"✅ CHECK-OUT: {name} at {time_now} | Worked: {worked_hours_str} | Status: {status}{change_info}")
+                write_queue.enqueue("update", att_path, update_data)
+                attendance_state.apply(today, user_id, "update", update_data)
+                print(f"✅ CHECK-OUT: {name} at {time_now} | Worked: {worked_hours_str} | Status: {status}{change_info}")
 
         # Update latest reference
-        latest_ref = db.reference("/latestPlate" if mode == "plate" else "/LatestRFID")
+        latest_path = "/latestPlate" if mode == "plate" else "/LatestRFID"
         latest_data = {
             "uid": identifier,
             "name": name,
@@ -820,11 +2844,13 @@ def save_attendance(mode, key, timestamp):
         else:
             latest_data["rfid"] = identifier
             
-        latest_ref.set(latest_data)
+        write_queue.enqueue("set", latest_path, latest_data)
+        return "saved"
 
     except Exception as e:
         print(f"❌ ERROR saving attendance: {e}")
         traceback.print_exc()
+        return "error"
 
 # ==== NEW: Function untuk check Firebase connection ====
 def check_firebase_connection():
@@ -834,9 +2860,8 @@ def check_firebase_connection():
         print("🔍 FIREBASE CONNECTION CHECK")
         print("="*60)
         
-        # Test root access
-        root_ref = db.reference("/")
-        root_data = root_ref.get()
+        # Test root access - shallow: nama node sahaja, bukan seluruh database
+        root_data = db.reference("/").get(shallow=True)
         
         if root_data is None:
             print("❌ Firebase connected but NO DATA at root")
@@ -849,22 +2874,24 @@ def check_firebase_connection():
         print(f"✅ Firebase CONNECTED SUCCESSFULLY")
         print(f"📊 Root nodes found: {list(root_data.keys())}")
         
-        # Check specific nodes
+        # Check specific nodes - bilangan dari mirror jika sedia, jika tidak shallow (kunci sahaja)
+        mirror_sizes = registry_mirror.sizes() if registry_mirror.is_ready() else {}
         nodes_to_check = ["plates", "users", "attendance", "rfid_to_user"]
         for node in nodes_to_check:
-            if node in root_data:
-                if isinstance(root_data[node], dict):
-                    count = len(root_data[node])
-                    print(f"   📁 {node}: {count} records")
+            if node not in root_data:
+                print(f"   📁 {node}: Not found")
+            elif node in mirror_sizes:
+                print(f"   📁 {node}: {mirror_sizes[node]} records")
+            else:
+                keys = db.reference(node).get(shallow=True)
+                if isinstance(keys, dict):
+                    print(f"   📁 {node}: {len(keys)} records")
                 else:
                     print(f"   📁 {node}: Present (not a dict)")
-            else:
-                print(f"   📁 {node}: Not found")
         
         # Test specific plate
         test_plate = "PBL666"
-        plates_ref = db.reference(f"plates/{test_plate}")
-        plate_data = plates_ref.get()
+        plate_data = db.reference(f"plates/{test_plate}").get()
         
         if plate_data:
             print(f"✅ Test plate '{test_plate}' FOUND")
@@ -872,11 +2899,6 @@ def check_firebase_connection():
             print(f"   Jabatan: {plate_data.get('jabatan', 'Unknown')}")
         else:
             print(f"⚠️ Test plate '{test_plate}' NOT FOUND")
-            # List available plates
-            plates_all_ref = db.reference("plates")
-            all_plates = plates_all_ref.get()
-            if all_plates and isinstance(all_plates, dict):
-                print(f"   Available plates: {list(all_plates.keys())}")
         
         print("="*60)
         return True
@@ -1033,13 +3055,8 @@ def debug_plate_search(plate):
                 "message": f"Plate {plate} ditemui dalam database"
             })
         else:
-            # Get all plates for reference
-            root_ref = db.reference("/")
-            all_data = root_ref.get()
-            
-            available_plates = []
-            if "plates" in all_data and isinstance(all_data["plates"], dict):
-                available_plates = list(all_data["plates"].keys())
+            # Get all plates for reference (dari index, bukan muat turun root)
+            available_plates = plate_registry.plates()
             
             return jsonify({
                 "status": "not_found",
@@ -1164,6 +3181,9 @@ def register_test_plate():
         users_ref = db.reference(f"users/{user_id}")
         users_ref.set(user_data)
         
+        # Kemaskini index terus supaya plat boleh dikesan tanpa tunggu refresh
+        plate_registry.put(clean_plate, user_data, user_id, f"plates/{clean_plate}")
+        
         return jsonify({
             "status": "success",
             "plate": plate,
@@ -1269,16 +3289,39 @@ def firebase_status():
             "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }), 500
 
+@app.route("/debug/mirror_event", methods=["POST"])
+def debug_mirror_event():
+    """Hantar event ke stream Firebase palsu (MIRROR_SOURCE = "fake" sahaja)"""
+    if not isinstance(registry_mirror.source, FakeFirebaseEventSource):
+        return jsonify({"error": "Hanya tersedia bila MIRROR_SOURCE = 'fake'"}), 400
+    try:
+        data = request.get_json() or {}
+        node = data.get("node")
+        event_type = data.get("event_type", "put")
+        if node not in MIRROR_NODES or event_type not in ("put", "patch"):
+            return jsonify({"error": f"node mesti salah satu {MIRROR_NODES}, event_type put/patch"}), 400
+        
+        registry_mirror.source.emit(node, event_type, data.get("path", "/"), data.get("data"))
+        
+        return jsonify({
+            "status": "success",
+            "registry_mirror": registry_mirror.stats(),
+            "plate_registry": plate_registry.stats()
+        })
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # ==== Existing endpoints with improvements ====
 
 @app.route("/duplicate_protection", methods=["GET"])
 def get_duplicate_protection():
     """Get information about duplicate protection"""
     try:
-        current_time = datetime.datetime.now()
+        current_time, protected = duplicate_guard.protected()
         protected_plates = []
         
-        for plate, data in recently_processed.items():
+        for plate, data in protected:
             elapsed = (current_time - data["timestamp"]).total_seconds()
             if elapsed < DUPLICATE_REJECT_WINDOW:
                 protected_plates.append({
@@ -1291,8 +3334,7 @@ def get_duplicate_protection():
                     "is_protected": elapsed < DUPLICATE_REJECT_WINDOW
                 })
         
-        # Sort by time (most recent first)
-        protected_plates.sort(key=lambda x: float(x["seconds_ago"].replace('s', '')))
+        # Sudah disusun ikut masa (most recent first)
         
         return jsonify({
             "status": "success",
@@ -1309,9 +3351,8 @@ def get_duplicate_protection():
 @app.route("/debug/clear_protection_cache", methods=["POST"])
 def clear_protection_cache():
     """Debug endpoint to clear protection cache"""
-    global recently_processed
-    cleared_count = len(recently_processed)
-    recently_processed = {}
+    cleared_count = duplicate_guard.clear()
+    early_exit.clear()
     
     return jsonify({
         "status": "success", 
@@ -1319,6 +3360,14 @@ def clear_protection_cache():
         "message": "Protection cache cleared"
     })
 
+@app.route("/debug/rebuild_image_catalog", methods=["POST"])
+def rebuild_image_catalog():
+    """Bina semula indeks katalog gambar dari cakera (jika fail diubah secara manual)"""
+    try:
+        return jsonify({"status": "success", "image_catalog": image_catalog.rebuild()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # ==== Organized images endpoint ====
 @app.route("/organized_images", methods=["GET"])
 def list_organized_images():
@@ -1331,48 +3380,9 @@ def list_organized_images():
                 "message": "No images directory found"
             })
         
-        structure = []
-        total_images = 0
-        
-        # Scan through date directories
-        date_dirs = sorted([d for d in os.listdir(SAVE_DIR) 
-                          if os.path.isdir(os.path.join(SAVE_DIR, d))], reverse=True)
-        
-        for date_dir in date_dirs[:10]:  # Last 10 dates only
-            date_path = os.path.join(SAVE_DIR, date_dir)
-            date_info = {
-                "date": date_dir,
-                "path": date_path,
-                "plates": [],
-                "total_images": 0
-            }
-            
-            # Scan through plate directories for this date
-            plate_dirs = sorted([p for p in os.listdir(date_path) 
-                               if os.path.isdir(os.path.join(date_path, p))])
-            
-            for plate_dir in plate_dirs:
-                plate_path = os.path.join(date_path, plate_dir)
-                
-                # Count images in this plate directory (excluding thumbnails)
-                images = [f for f in os.listdir(plate_path) 
-                         if f.endswith('.jpg') and not f.startswith('thumb_')]
-                
-                if images:
-                    plate_info = {
-                        "plate": plate_dir,
-                        "path": plate_path,
-                        "image_count": len(images),
-                        "latest_image": max(images, key=lambda x: os.path.getctime(os.path.join(plate_path, x))) if images else None,
-                        "images": images[:5]  # First 5 images only
-                    }
-                    
-                    date_info["plates"].append(plate_info)
-                    date_info["total_images"] += len(images)
-                    total_images += len(images)
-            
-            if date_info["plates"]:
-                structure.append(date_info)
+        # Jawapan dari indeks katalog, bukan walk direktori
+        structure = image_catalog.listing(max_dates=5, max_images=5)
+        total_images = image_catalog.recent_total(10)  # Seperti asal: 10 tarikh terbaru sahaja
         
         return jsonify({
             "status": "success",
@@ -1380,7 +3390,7 @@ def list_organized_images():
             "main_directory": os.path.abspath(SAVE_DIR),
             "folder_structure": "captured_plates/YYYY-MM-DD/PLATE_NUMBER/",
             "example": "captured_plates/2025-12-09/MEDU89/MEDU89_11.56_54.jpg",
-            "dates": structure[:5]  # Last 5 dates only
+            "dates": structure  # Last 5 dates only
         })
         
     except Exception as e:
@@ -1409,56 +3419,81 @@ def get_organized_image(date, plate, filename):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# ==== Snapshot endpoints ====
+@app.route("/snapshots", methods=["GET"])
+def list_snapshots():
+    """Senarai snapshot terkini (metadata sahaja)"""
+    return jsonify({"capacity": snapshots.capacity, "snapshots": snapshots.list()})
+
+@app.route("/snapshots/<int:snapshot_id>", methods=["GET"])
+def get_snapshot(snapshot_id):
+    """Bait JPEG satu snapshot"""
+    item = snapshots.get(snapshot_id)
+    if item is None:
+        return jsonify({"error": "Snapshot not found"}), 404
+    return item["jpeg"], 200, {'Content-Type': 'image/jpeg'}
+
+# ==== Readiness endpoint ====
+@app.route("/ready", methods=["GET"])
+def ready():
+    """200 bila semua peringkat startup selesai (degraded = peringkat yang gagal), 503 semasa memuat"""
+    stats = startup.stats()
+    return jsonify(stats), (200 if stats["ready"] else 503)
+
 # ==== Updated status endpoint ====
 @app.route("/status", methods=["GET"])
 def status():
     """Check server status and recent activity"""
-    # Count total images in organized structure
-    total_images = 0
-    date_count = 0
-    
-    if os.path.exists(SAVE_DIR):
-        # Count dates
-        dates = [d for d in os.listdir(SAVE_DIR) 
-                if os.path.isdir(os.path.join(SAVE_DIR, d))]
-        date_count = len(dates)
-        
-        # Count total images
-        for date_dir in dates:
-            date_path = os.path.join(SAVE_DIR, date_dir)
-            if os.path.isdir(date_path):
-                plate_dirs = [p for p in os.listdir(date_path) 
-                            if os.path.isdir(os.path.join(date_path, p))]
-                for plate_dir in plate_dirs:
-                    plate_path = os.path.join(date_path, plate_dir)
-                    if os.path.isdir(plate_path):
-                        images = [f for f in os.listdir(plate_path) 
-                                 if f.endswith('.jpg') and not f.startswith('thumb_')]
-                        total_images += len(images)
+    # Count total images in organized structure (dari indeks katalog)
+    catalog_stats = image_catalog.stats()
+    total_images = catalog_stats["total_images"]
+    date_count = catalog_stats["dates"]
     
-    # Count protected plates (within 30 seconds)
-    protected_plates = 0
-    current_time = datetime.datetime.now()
-    for plate, data in recently_processed.items():
-        elapsed = (current_time - data["timestamp"]).total_seconds()
-        if elapsed < DUPLICATE_REJECT_WINDOW:
-            protected_plates += 1
+    # Count protected plates (within 30 seconds) - tanpa scan
+    protected_plates = duplicate_guard.count()
     
     return jsonify({
         "status": "running",
         "last_detection": last_result,
-        "yolo_model": "Loaded" if yolo_model else "Not Loaded",
+        "yolo_model": "Loaded" if yolo_model else ("In OCR workers" if ocr_pool else "Not Loaded"),
+        "detector_backend": yolo_model.name if yolo_model else (DETECTOR_BACKEND if ocr_pool else None),
+        "detector_decode": "reduced + turbojpeg ROI" if REDUCED_DECODE_ACTIVE else "full",
+        "startup": startup.stats(),
+        "server": {
+            "mode": SERVER_MODE,
+            "threads": SERVER_THREADS,
+            "connection_limit": SERVER_CONNECTION_LIMIT
+        },
         "ocr_method": "YOLO+OCR (Fallback to OCR only)",
         "recent_snapshots": len(snapshots),
         "protected_plates": protected_plates,
         "protection_window_seconds": DUPLICATE_REJECT_WINDOW,
+        "plate_registry": plate_registry.stats(),
+        "resolution_stats": get_resolution_stats(),
+        "registry_mirror": registry_mirror.stats(),
+        "rfid_cache": rfid_cache.stats(),
+        "yolo_batching": yolo_batcher.stats(),
+        "ocr_batching": ocr_batcher.stats(),
+        "ocr_paths": get_ocr_path_stats(),
+        "ocr_workers": ocr_pool.stats() if ocr_pool else {"workers": 0, "mode": "in-thread"},
+        "firebase_write_queue": write_queue.stats(),
+        "attendance_state": attendance_state.stats(),
+        "deferred_attendance": deferred_attendance.stats(),
+        "image_catalog": catalog_stats,
+        "image_persist": image_persist.stats(),
+        "prefilter": frame_prefilter.stats(),
+        "fallback_policy": fallback_policy.stats(),
+        "frame_latency": frame_latency.stats(),
+        "plate_tracker": plate_tracker.stats() if PLATE_VOTING_ENABLED else {"enabled": False},
+        "early_exit": early_exit.stats(),
+        "ingest_jobs": ingest_jobs.stats(),
         "organized_images_saved": total_images,
         "dates_available": date_count,
         "main_directory": os.path.abspath(SAVE_DIR),
         "folder_structure": "captured_plates/YYYY-MM-DD/PLATE_NUMBER/",
         "server_time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "protection_message": f"Reject duplicate plates within {DUPLICATE_REJECT_WINDOW} seconds",
-        "processing_flow": "Try YOLO → If fails → Use Full Image OCR",
+        "processing_flow": f"Pre-filter → YOLO → If fails → Full Image OCR (policy: {FALLBACK_POLICY})",
         "debug_endpoints": {
             "yolo_test": "/test_yolo (POST)",
             "firebase_test": "/debug/firebase_test",
@@ -1466,62 +3501,154 @@ def status():
             "plate_search": "/debug/plate_search/<plate>",
             "plate_spacing": "/debug/plate_spacing/<plate>",
             "list_all_plates": "/debug/list_all_plates",
-            "register_test": "/debug/register_test_plate"
+            "register_test": "/debug/register_test_plate",
+            "mirror_event": "/debug/mirror_event (POST, MIRROR_SOURCE fake)",
+            "rebuild_image_catalog": "/debug/rebuild_image_catalog (POST)",
+            "snapshots": "/snapshots, /snapshots/<id>",
+            "async_upload": "/upload?async=1 (POST) -> /jobs/<id>?wait=N"
         }
     })
 
 # ====== SEMUA FUNGSI ASAL YANG LAIN TETAP SAMA ======
 
+def get_rfid_mapping(rfid_uid):
+    """User ID dari rfid_to_user - dari mirror jika sedia, jika tidak baca Firebase"""
+    if registry_mirror.is_ready():
+        return registry_mirror.get("rfid_to_user", rfid_uid)
+    return db.reference(f"rfid_to_user/{rfid_uid}").get()
+
+def get_user_record(user_id):
+    """Data /users/{user_id} - dari mirror jika sedia, jika tidak baca Firebase"""
+    if registry_mirror.is_ready():
+        return registry_mirror.get("users", user_id)
+    return db.reference(f"users/{user_id}").get()
+
+# ==== RFID Resolution Cache ====
+class RfidResolutionCache:
+    """
+    Cache keputusan RFID -> user, kunci UID kad. Simpan user_id dari mapping
+    dan canonical_user_id (selepas case fix) supaya tap seterusnya tiada bacaan Firebase.
+    """
+
+    def __init__(self, ttl, negative_ttl):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # {rfid_uid: (expires_at, context)}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, rfid_uid):
+        with self._lock:
+            cached = self._entries.get(rfid_uid)
+            if cached and cached[0] > time.time():
+                self.hits += 1
+                return cached[1]
+            if cached:
+                del self._entries[rfid_uid]
+            self.misses += 1
+            return None
+
+    def put(self, rfid_uid, context):
+        ttl = self.ttl if context["user_data"] else self.negative_ttl
+        with self._lock:
+            self._entries[rfid_uid] = (time.time() + ttl, context)
+
+    def invalidate(self, rfid_uid=None):
+        """Buang satu UID, atau semua entry jika rfid_uid None"""
+        with self._lock:
+            if rfid_uid is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(rfid_uid, None)
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "ttl_seconds": self.ttl
+            }
+
+rfid_cache = RfidResolutionCache(RFID_CACHE_TTL, RFID_CACHE_NEGATIVE_TTL)
+
+def on_rfid_mirror_change(node):
+    """Mapping atau data user berubah - keputusan RFID dalam cache mungkin basi"""
+    if node in ("rfid_to_user", "rfid_cards", "users"):
+        rfid_cache.invalidate()
+
+registry_mirror.on_change(on_rfid_mirror_change)
+
+def resolve_rfid(rfid_uid):
+    """
+    Resolve RFID -> context {"rfid", "user_id", "canonical_user_id", "user_data"}.
+    Guna cache dahulu; case variation user_id hanya dicuba sekali untuk setiap UID.
+    """
+    context = rfid_cache.get(rfid_uid)
+    if context is not None:
+        print(f"⚡ [RFID CACHE] {rfid_uid} -> {context['canonical_user_id']}")
+        return context
+
+    context = {"rfid": rfid_uid, "user_id": None, "canonical_user_id": None, "user_data": None}
+
+    # First get user_id from rfid_to_user mapping
+    user_id_from_mapping = get_rfid_mapping(rfid_uid)
+
+    print(f"🔍 [RFID DEBUG] RFID: {rfid_uid} -> User ID dari mapping: {user_id_from_mapping}")
+
+    if not user_id_from_mapping:
+        print(f"RFID {rfid_uid} not mapped to any user")
+        rfid_cache.put(rfid_uid, context)
+        return context
+
+    # FIX CASE SENSITIVITY - Cuba berbagai case (case asal dahulu)
+    possible_cases = [
+        user_id_from_mapping,  # original case
+        user_id_from_mapping.lower(),  # semua lowercase
+        user_id_from_mapping.upper(),  # semua uppercase
+        user_id_from_mapping.capitalize(),  # first letter capital
+    ]
+
+    # Remove duplicates (kekalkan susunan)
+    possible_cases = list(dict.fromkeys(possible_cases))
+
+    print(f"🔍 [RFID DEBUG] Mencari user dengan cases: {possible_cases}")
+
+    user_data = None
+    actual_user_id = None
+
+    for test_case in possible_cases:
+        user_data = get_user_record(test_case)
+        if user_data:
+            actual_user_id = test_case
+            print(f"✅ [RFID DEBUG] User ditemui dengan case: {actual_user_id}")
+            break
+
+    if not user_data:
+        print(f"❌ User tidak ditemui untuk semua case variations: {possible_cases}")
+        rfid_cache.put(rfid_uid, context)
+        return context
+
+    # Jika case berbeza, canonical_user_id disimpan dalam cache untuk tap seterusnya
+    if actual_user_id != user_id_from_mapping:
+        print(f"⚠️ Case mismatch: {user_id_from_mapping} -> {actual_user_id}")
+
+    context["user_id"] = user_id_from_mapping
+    context["canonical_user_id"] = actual_user_id
+    context["user_data"] = user_data
+    rfid_cache.put(rfid_uid, context)
+
+    print(f"✅ User data ditemui: {user_data.get('name')}")
+    return context
+
 def get_user_info_from_rfid(rfid_uid):
     """Get user info from RFID with proper mapping"""
     try:
-        # First get user_id from rfid_to_user mapping
-        mapping_ref = db.reference(f"rfid_to_user/{rfid_uid}")
-        user_id_from_mapping = mapping_ref.get()
-        
-        print(f"🔍 [RFID DEBUG] RFID: {rfid_uid} -> User ID dari mapping: {user_id_from_mapping}")
-        
-        if not user_id_from_mapping:
-            print(f"RFID {rfid_uid} not mapped to any user")
-            return None
-        
-        # FIX CASE SENSITIVITY - Cuba berbagai case
-        possible_cases = [
-            user_id_from_mapping,  # original case
-            user_id_from_mapping.lower(),  # semua lowercase
-            user_id_from_mapping.upper(),  # semua uppercase
-            user_id_from_mapping.capitalize(),  # first letter capital
-        ]
-        
-        # Remove duplicates
-        possible_cases = list(set(possible_cases))
-        
-        print(f"🔍 [RFID DEBUG] Mencari user dengan cases: {possible_cases}")
-        
-        user_data = None
-        actual_user_id = None
-        
-        for test_case in possible_cases:
-            user_ref = db.reference(f"users/{test_case}")
-            user_data = user_ref.get()
-            if user_data:
-                actual_user_id = test_case
-                print(f"✅ [RFID DEBUG] User ditemui dengan case: {actual_user_id}")
-                break
-        
-        if not user_data:
-            print(f"❌ User tidak ditemui untuk semua case variations: {possible_cases}")
-            return None
-            
-        # Jika case berbeza, update mapping untuk consistency
-        if actual_user_id != user_id_from_mapping:
-            print(f"⚠️ Case mismatch: {user_id_from_mapping} -> {actual_user_id}")
-            # Optional: Update mapping ke case yang betul
-            # mapping_ref.set(actual_user_id)
-            
-        print(f"✅ User data ditemui: {user_data.get('name')}")
-        return user_data
-        
+        return resolve_rfid(rfid_uid)["user_data"]
     except Exception as e:
         print(f"Error getting user data for RFID {rfid_uid}: {e}")
         return None
@@ -1566,7 +3693,7 @@ def home():
         "status": "running",
         "service": "Smart Attendance API with YOLO Detection",
         "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "yolo_model": "Loaded" if yolo_model else "Not Loaded (Using OCR only)",
+        "yolo_model": "Loaded" if yolo_model else ("In OCR workers" if ocr_pool else "Not Loaded (Using OCR only)"),
         "image_structure": "captured_plates/YYYY-MM-DD/PLATE_NUMBER/image.jpg",
         "duplicate_protection": f"Reject duplicate plates within {DUPLICATE_REJECT_WINDOW} seconds",
         "processing_strategy": "YOLO Detection (if available) → Fallback to Full Image OCR",
@@ -1580,27 +3707,344 @@ def home():
         }
     })
 
+def not_ready_response(*stages):
+    """503 + Retry-After jika peringkat startup yang diperlukan belum selesai, jika tidak None"""
+    if startup.finished(*stages):
+        return None
+    stats = startup.stats()
+    response = jsonify({
+        "status": "starting",
+        "message": "Server sedang memuat model/Firebase - cuba lagi",
+        "waiting_for": [name for name in stages if name in stats["pending"]],
+        "uptime_seconds": stats["uptime_seconds"]
+    })
+    response.headers["Retry-After"] = "2"
+    return response, 503
+
+def process_upload(img_bytes, camera_id):
+    """
+    Pipeline penuh untuk satu frame upload: pre-filter -> decode -> detect_and_ocr.
+    Pulangkan (body JSON, kod HTTP). Dipanggil terus oleh /upload atau oleh ingest_jobs.
+    """
+    motion = None
+    gray = None
+    
+    # Pre-filter murah sebelum decode penuh + YOLO: skip frame kosong/kabur/tiada perubahan
+    if PREFILTER_ENABLED:
+        started = time.perf_counter()
+        gray = prefilter_gray(jpeg_bytes=img_bytes)
+        if gray is not None:
+            keep, reason, info = frame_prefilter.check(camera_id, gray)
+            motion = info["motion"]
+            if not keep:
+                frame_latency.record("prefilter_skip", (time.perf_counter() - started) * 1000.0)
+                return {
+                    "plate": "-",
+                    "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "status": f"Skipped - {reason}",
+                    "prefilter": info
+                }, 200
+    
+    # Early-exit: kamera terkunci pada plat yang sudah di-commit - skip YOLO+OCR selagi scene sama
+    if EARLY_EXIT_ENABLED:
+        started = time.perf_counter()
+        if gray is None:
+            gray = prefilter_gray(jpeg_bytes=img_bytes)
+        if gray is not None:
+            state, locked_plate, change = early_exit.check(camera_id, gray)
+            if state is not None:
+                # Lindungi plat dari masa kenderaan terakhir dilihat (bukan dari commit)
+                duplicate_guard.touch(locked_plate)
+            if state == "scene_change" and PLATE_VOTING_ENABLED:
+                # Kenderaan sudah beredar - bacaan seterusnya mulakan track baru
+                plate_tracker.end_committed(camera_id)
+            if state == "locked":
+                frame_latency.record("early_exit_skip", (time.perf_counter() - started) * 1000.0)
+                return {
+                    "plate": locked_plate,
+                    "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "status": "Skipped - plat sudah di-commit, scene tidak berubah",
+                    "early_exit": {"camera_id": camera_id, "scene_change": round(change, 4)}
+                }, 200
+    
+    frame = None
+    if REDUCED_DECODE_ACTIVE and jpeg_dimensions(img_bytes):
+        # Decode resolusi rendah untuk YOLO; kawasan plat di-decode penuh kemudian
+        frame = UploadFrame(img_bytes, DETECTOR_DECODE_MIN_WIDTH)
+        img = frame.detector_image()
+    else:
+        nparr = np.frombuffer(img_bytes, np.uint8)
+        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    
+    if img is None:
+        return {"error": "Image decode failed"}, 400
+    
+    # Bait asal dihantar sekali (tanpa salinan) supaya gambar disimpan tanpa encode semula
+    return detect_and_ocr(img, jpeg_bytes=img_bytes, frame=frame, camera_id=camera_id, motion=motion), 200
+
+# ==== Async Ingest (/upload?async=1) ====
+class IngestJobQueue:
+    """
+    Queue terhad untuk /upload?async=1. Request hanya simpan bait JPEG dan pulangkan
+    job id (202); thread scheduler (INGEST_WORKERS) jalankan process_upload. Keputusan
+    disimpan dalam jadual job (INGEST_JOB_RETENTION terkini, luput selepas
+    INGEST_JOB_TTL) untuk GET /jobs/<id>. Queue penuh = submit ditolak (503).
+
+    latest_wins: satu slot setiap kamera - frame baru menggantikan frame kamera sama
+    yang belum diproses (job lama jadi "dropped", superseded_by job baru) dan kekal
+    pada giliran asal kamera, jadi kamera diproses secara round-robin dan frame lama
+    tidak menambah latensi bila inferens lebih perlahan dari kadar post kamera.
+
+    Satu kamera hanya ada satu frame dalam pemprosesan pada satu masa (walaupun
+    INGEST_WORKERS > 1): slot kamera yang frame sebelumnya masih diproses dilangkau
+    sehingga frame itu selesai, supaya state setiap kamera (prefilter, tracker plat,
+    early exit) dikemaskini mengikut tertib frame.
+    """
+
+    def __init__(self, max_size, workers, retention, ttl, latest_wins=True):
+        self.max_size = max_size
+        self.workers = workers
+        self.retention = retention
+        self.ttl = ttl
+        self.latest_wins = latest_wins
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        # Slot menunggu: kunci = camera_id (latest_wins) atau job_id (FIFO) -> (job_id, camera_id, bait JPEG)
+        self._slots = collections.OrderedDict()
+        self._in_flight = set()  # camera_id yang frame-nya sedang diproses
+        self._jobs = collections.OrderedDict()  # job_id -> rekod job (tertib submit)
+        self._events = {}  # job_id -> threading.Event, set bila job selesai/digantikan
+        self._cameras = {}  # camera_id -> kiraan submitted/processed/dropped_stale
+        self._threads = []
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped_stale = 0
+        self.queue_ms_total = 0.0
+        self.process_ms_total = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"ingest-{i + 1}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _prune(self, now):
+        # Panggil dengan self._lock; buang job selesai yang luput atau melebihi retention
+        while self._jobs:
+            job_id, job = next(iter(self._jobs.items()))
+            expired = job["finished_at"] is not None and now - job["finished_at"] > self.ttl
+            if not expired and len(self._jobs) <= self.retention:
+                break
+            self._jobs.popitem(last=False)
+            self._events.pop(job_id, None)
+
+    def _camera(self, camera_id):
+        # Panggil dengan self._lock
+        counters = self._cameras.get(camera_id)
+        if counters is None:
+            counters = self._cameras[camera_id] = {"submitted": 0, "processed": 0, "dropped_stale": 0}
+        return counters
+
+    def submit(self, img_bytes, camera_id):
+        """Masukkan frame tanpa menunggu. Pulangkan rekod job, atau None jika queue penuh."""
+        self.start()
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "camera_id": camera_id,
+            "status": "queued",
+            "submitted": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "submitted_at": now,
+            "finished_at": None,
+            "queue_ms": None,
+            "processing_ms": None,
+            "http_status": None,
+            "superseded_by": None,
+            "result": None
+        }
+        key = camera_id if self.latest_wins else job["job_id"]
+        with self._lock:
+            stale = self._slots.get(key)
+            if stale is None and len(self._slots) >= self.max_size:
+                self.rejected += 1
+                return None
+            counters = self._camera(camera_id)
+            if stale is not None:
+                # Frame lama kamera ini belum diproses - digantikan (kekal giliran kamera)
+                stale_job = self._jobs.get(stale[0])
+                if stale_job is not None:
+                    stale_job.update({"status": "dropped", "superseded_by": job["job_id"], "finished_at": now})
+                stale_event = self._events.get(stale[0])
+                if stale_event:
+                    stale_event.set()
+                counters["dropped_stale"] += 1
+                self.dropped_stale += 1
+            self._slots[key] = (job["job_id"], camera_id, img_bytes)
+            self._jobs[job["job_id"]] = job
+            self._events[job["job_id"]] = threading.Event()
+            counters["submitted"] += 1
+            self.submitted += 1
+            self._prune(now)
+            self._ready.notify()
+            return dict(job)
+
+    def _next_slot(self):
+        # Panggil dengan self._lock; slot tertua yang kameranya tiada frame dalam pemprosesan
+        for key, (_, camera_id, _) in self._slots.items():
+            if camera_id not in self._in_flight:
+                return key
+        return None
+
+    def _run(self):
+        while True:
+            with self._ready:
+                key = self._next_slot()
+                while key is None:
+                    self._ready.wait()
+                    key = self._next_slot()
+                job_id, camera_id, img_bytes = self._slots.pop(key)
+                self._in_flight.add(camera_id)
+            try:
+                self._process(job_id, img_bytes)
+            finally:
+                with self._ready:
+                    self._in_flight.discard(camera_id)
+                    self._ready.notify_all()
+
+    def _process(self, job_id, img_bytes):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job["status"] = "processing"
+            job["queue_ms"] = round((time.time() - job["submitted_at"]) * 1000.0, 1)
+            camera_id = job["camera_id"]
+        frame_latency.record("ingest_queue_wait", job["queue_ms"])
+        started = time.perf_counter()
+        try:
+            result, http_status = process_upload(img_bytes, camera_id)
+            status = "done"
+        except Exception as e:
+            print(f"Ingest job {job_id} error: {e}")
+            traceback.print_exc()
+            result, http_status, status = {"error": "Internal server error"}, 500, "error"
+        processing_ms = (time.perf_counter() - started) * 1000.0
+        with self._lock:
+            job.update({
+                "status": status,
+                "result": result,
+                "http_status": http_status,
+                "processing_ms": round(processing_ms, 1),
+                "finished_at": time.time()
+            })
+            self.queue_ms_total += job["queue_ms"]
+            self.process_ms_total += processing_ms
+            self._camera(camera_id)["processed"] += 1
+            if status == "done":
+                self.completed += 1
+            else:
+                self.failed += 1
+            event = self._events.get(job_id)
+        if event:
+            event.set()
+
+    def get(self, job_id, wait=0):
+        """Rekod job (salinan), menunggu sehingga wait saat jika belum selesai. None = tiada/luput."""
+        with self._lock:
+            event = self._events.get(job_id)
+        if event is not None and wait > 0:
+            event.wait(wait)
+        with self._lock:
+            self._prune(time.time())
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self):
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "mode": "latest_frame_wins" if self.latest_wins else "fifo",
+                "queue_depth": len(self._slots),
+                "in_flight_cameras": len(self._in_flight),
+                "max_size": self.max_size,
+                "jobs_tracked": len(self._jobs),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected_queue_full": self.rejected,
+                "dropped_stale": self.dropped_stale,
+                "avg_queue_ms": round(self.queue_ms_total / finished, 1) if finished else 0.0,
+                "avg_processing_ms": round(self.process_ms_total / finished, 1) if finished else 0.0,
+                "cameras": {camera_id: dict(counters) for camera_id, counters in self._cameras.items()}
+            }
+
+ingest_jobs = IngestJobQueue(INGEST_QUEUE_MAX, INGEST_WORKERS, INGEST_JOB_RETENTION, INGEST_JOB_TTL,
+                             latest_wins=INGEST_LATEST_FRAME_WINS)
+
+def public_job(job):
+    """Rekod job untuk JSON (tanpa cap masa dalaman)"""
+    return {k: v for k, v in job.items() if k not in ("submitted_at", "finished_at")}
+
 @app.route("/upload", methods=["POST"])
 def upload():
     try:
         if not request.data:
             return jsonify({"error": "No image data provided"}), 400
+        
+        # "catalog": nama fail gambar diperiksa dengan indeks katalog (elak timpa fail sedia ada)
+        not_ready = not_ready_response("yolo", "ocr", "firebase", "catalog")
+        if not_ready:
+            return not_ready
+        startup.mark_first_upload()
             
         img_bytes = request.get_data()
-        nparr = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        camera_id = get_camera_id()
         
-        if img is None:
-            return jsonify({"error": "Image decode failed"}), 400
+        if request.args.get("async") == "1":
+            # Ack segera: kamera boleh tangkap frame seterusnya, keputusan di /jobs/<id>
+            job = ingest_jobs.submit(img_bytes, camera_id)
+            if job is None:
+                response = jsonify({
+                    "status": "busy",
+                    "message": f"Queue ingest penuh ({INGEST_QUEUE_MAX} frame) - cuba lagi"
+                })
+                response.headers["Retry-After"] = "1"
+                return response, 503
+            response = jsonify({
+                "job_id": job["job_id"],
+                "status": "queued",
+                "camera_id": camera_id,
+                "poll": f"/jobs/{job['job_id']}"
+            })
+            response.headers["Location"] = f"/jobs/{job['job_id']}"
+            return response, 202
         
-        result = detect_and_ocr(img)
-        return jsonify(result)
+        result, http_status = process_upload(img_bytes, camera_id)
+        return jsonify(result), http_status
         
     except Exception as e:
         print(f"Upload error: {e}")
         traceback.print_exc()
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Status job async; ?wait=N tunggu sehingga N saat (maks INGEST_WAIT_MAX) sehingga selesai"""
+    try:
+        wait = min(max(float(request.args.get("wait", 0)), 0.0), INGEST_WAIT_MAX)
+    except ValueError:
+        return jsonify({"error": "wait mesti nombor (saat)"}), 400
+    job = ingest_jobs.get(job_id, wait=wait)
+    if job is None:
+        return jsonify({"error": "Job tidak ditemui atau sudah luput", "job_id": job_id}), 404
+    return jsonify(public_job(job))
+
 @app.route("/rfid", methods=["POST"])
 def rfid():
     try:
@@ -1614,9 +4058,22 @@ def rfid():
         uid = data.get("uid", "").strip().upper()
         if not uid:
             return jsonify({"error": "UID required"}), 400
+        
+        not_ready = not_ready_response("firebase")
+        if not_ready:
+            return not_ready
             
         now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        save_attendance("rfid", uid, now)
+        attendance = save_attendance("rfid", uid, now)
+        if attendance == "deferred":
+            return jsonify({
+                "uid": uid,
+                "time": now,
+                "status": "deferred",
+                "message": "Attendance hari ini belum dimuat dari Firebase - scan disimpan dan akan direkod"
+            }), 202
+        if attendance == "error":
+            return jsonify({"uid": uid, "time": now, "error": "Attendance gagal disimpan"}), 500
         
         return jsonify({
             "uid": uid, 
@@ -1645,10 +4102,15 @@ def test_yolo_endpoint():
         if img is None:
             return jsonify({"error": "Image decode failed"}), 400
         
+        not_ready = not_ready_response("yolo", "ocr")
+        if not_ready:
+            return not_ready
+        
         if yolo_model is None:
             return jsonify({
                 "detected": False,
-                "message": "YOLO model not loaded",
+                "message": "YOLO dimuat dalam OCR worker sahaja (OCR_WORKER_COUNT > 0) - guna /upload"
+                           if ocr_pool else "YOLO model not loaded",
                 "fallback_available": True
             })
         
@@ -1682,19 +4144,46 @@ def test_yolo_endpoint():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# ==== Startup stages ====
+def load_firebase_stage():
+    """Mirror registry + indeks plat + attendance hari ini, kemudian semak sambungan (shallow)"""
+    registry_mirror.start()
+    plate_registry.refresh()
+    attendance_state.ensure_day(datetime.datetime.now().strftime("%Y-%m-%d"))
+    if not check_firebase_connection():
+        raise RuntimeError("Firebase connection check failed")
+
+if IS_OCR_WORKER:
+    # Worker perlu model sebelum menerima frame - muat terus, tanpa Firebase
+    startup.start([("yolo", load_yolo_stage), ("ocr", load_ocr_stage)], background=False)
+elif ocr_pool is not None:
+    # Model dimuat dalam setiap worker sahaja (bukan N+1 salinan) - yolo/ocr sedia bila worker sedia
+    startup.start([
+        ("yolo", ocr_pool.wait_ready),
+        ("ocr", ocr_pool.wait_ready),
+        ("firebase", load_firebase_stage),
+        ("catalog", image_catalog.rebuild),
+    ], background=(STARTUP_MODE == "background"))
+else:
+    startup.start([
+        ("yolo", load_yolo_stage),
+        ("ocr", load_ocr_stage),
+        ("firebase", load_firebase_stage),
+        ("catalog", image_catalog.rebuild),
+    ], background=(STARTUP_MODE == "background"))
+
 # ==== Run Server ====
 if __name__ == "__main__":
-    # Run Firebase connection check on startup
-    check_firebase_connection()
-    
     print(f"""
     🚀 SMART ATTENDANCE SERVER WITH HYBRID DETECTION
     ===============================================
     📅 Server Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
     🌐 Host: {HOST}:{PORT}
+    🧵 Server: {SERVER_MODE} ({SERVER_THREADS} threads, max {SERVER_CONNECTION_LIMIT} sambungan)
     🔧 OCR Language: English
     🛡️ Duplicate Protection: {DUPLICATE_REJECT_WINDOW} seconds
-    🤖 YOLO Model: {'✅ LOADED' if yolo_model else '❌ NOT LOADED (Using OCR only)'}
+    🤖 YOLO Model: {'✅ LOADED' if yolo_model else ('⏳ LOADING (background)' if not startup.finished('yolo') else '❌ NOT LOADED (Using OCR only)')}
+    ⏳ Startup: {STARTUP_MODE} - semak GET /ready
     💾 Save Directory: {os.path.abspath(SAVE_DIR)}
     
     📊 HYBRID PROCESSING STRATEGY:
@@ -1726,6 +4215,14 @@ if __name__ == "__main__":
     🚀 Server starting...
     """)
     
-    app.run(host=HOST, port=PORT, threaded=True, debug=False)
+    run_server(
+        app, HOST, PORT,
+        mode=SERVER_MODE,
+        threads=SERVER_THREADS,
+        connection_limit=SERVER_CONNECTION_LIMIT,
+        backlog=SERVER_BACKLOG,
+        channel_timeout=SERVER_CHANNEL_TIMEOUT,
+        max_body_bytes=SERVER_MAX_BODY_BYTES
+    )
 
     
\ No newline at end of file
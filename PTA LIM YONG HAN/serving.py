@@ -0,0 +1,46 @@
+"""
+Pelancar server untuk serverRUN.py, server.py dan test.py.
+
+Mod "waitress" (default): server WSGI production dengan thread pool terhad,
+had sambungan dan had saiz request - berjalan pada Windows (gunicorn/prefork
+tidak). Mod "dev": app.run() Werkzeug seperti sebelum ini (satu thread setiap
+sambungan, tanpa had) untuk debugging sahaja.
+
+Server kekal satu proses: duplicate protection, cache attendance dan outbox
+SQLite adalah state dalam proses, jadi beberapa proses akan pecahkan semantik
+reject 30 saat. Kerja CPU berat (YOLO + OCR) boleh diagihkan ke proses lain
+melalui OCR_WORKER_COUNT dalam serverRUN.py (model dimuat sekali setiap worker).
+"""
+
+SERVER_MODES = ("waitress", "dev")
+
+def run_server(app, host, port, mode="waitress", threads=16, connection_limit=64,
+               backlog=128, channel_timeout=30, max_body_bytes=16 * 1024 * 1024):
+    """Jalankan app Flask dengan mod yang dipilih (fallback ke dev jika waitress tiada)"""
+    if mode not in SERVER_MODES:
+        raise ValueError(f"SERVER_MODE tidak dikenali: {mode} (pilih {SERVER_MODES})")
+
+    if mode == "waitress":
+        try:
+            from waitress import serve
+        except ImportError:
+            print("⚠️ waitress tidak dipasang (pip install waitress) - guna Werkzeug dev server")
+            mode = "dev"
+        else:
+            print(f"🚀 Waitress: {host}:{port} | threads={threads} | connection_limit={connection_limit} | "
+                  f"backlog={backlog} | channel_timeout={channel_timeout}s")
+            serve(
+                app,
+                host=host,
+                port=port,
+                threads=threads,
+                connection_limit=connection_limit,
+                backlog=backlog,
+                channel_timeout=channel_timeout,
+                max_request_body_size=max_body_bytes,
+                ident="smart-attendance"
+            )
+            return
+
+    print(f"⚠️ Werkzeug dev server: {host}:{port} (tiada had thread/sambungan - bukan untuk production)")
+    app.run(host=host, port=port, threaded=True, debug=False)
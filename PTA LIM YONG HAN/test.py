@@ -5,10 +5,13 @@ from flask import Flask, request, jsonify
 import easyocr
 import firebase_admin
 from firebase_admin import credentials, db
+from serving import run_server
 
 # ==== Config ====
 HOST = "0.0.0.0"
 PORT = 5000
+SERVER_MODE = "waitress"  # "waitress" = server WSGI production, "dev" = Werkzeug app.run
+SERVER_THREADS = 8  # Bilangan thread request waitress
 UPLOAD_COOLDOWN = 25  # cooldown dalam saat
 
 # ==== Firebase Init ====
@@ -463,4 +466,4 @@ if __name__ == "__main__":
     print(f"📅 Server Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"🔧 OCR Language: English")
     print(f"⏰ Upload Cooldown: {UPLOAD_COOLDOWN} seconds")
-    app.run(host=HOST, port=PORT, threaded=True, debug=False)
\ No newline at end of file
+    run_server(app, HOST, PORT, mode=SERVER_MODE, threads=SERVER_THREADS)
\ No newline at end of file